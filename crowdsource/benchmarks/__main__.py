@@ -0,0 +1,50 @@
+import argparse
+import sys
+
+import ujson
+
+from . import handlers, hotpaths
+from .timing import environment
+
+
+def main(argv=None):
+    """Run the hot path and handler benchmarks, writing one json document
+
+    Save the output per commit and diff two of them with
+    `python -m crowdsource.benchmarks.compare`.
+    """
+    parser = argparse.ArgumentParser(prog="python -m crowdsource.benchmarks")
+    parser.add_argument("-o", "--output", help="file to write, default stdout")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(x) for x in hotpaths.SIZES),
+        help="dataset rows for the hot path benchmarks",
+    )
+    parser.add_argument(
+        "--submissions",
+        default=",".join(str(x) for x in handlers.SIZES),
+        help="seeded submissions for the handler benchmarks",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = hotpaths.run(
+        sizes=tuple(int(x) for x in args.sizes.split(",")), repeat=args.repeat
+    ) + handlers.run(
+        sizes=tuple(int(x) for x in args.submissions.split(",")),
+        requests=args.requests,
+        concurrency=args.concurrency,
+    )
+    out = ujson.dumps({"environment": environment(), "results": results}, indent=2)
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import sys
+
+import ujson
+
+# fields naming a measurement, rather than measuring it
+KEYS = ("benchmark", "name", "case", "size", "concurrency")
+
+
+def key(result):
+    return tuple(result.get(k) for k in KEYS)
+
+
+def load(path):
+    with open(path, "r") as fp:
+        data = ujson.load(fp)
+    return data["results"] if isinstance(data, dict) else data
+
+
+def compare(before, after, threshold=0.1):
+    """Median change of every measurement present in both `before` and `after`
+
+    A ratio above 1 + `threshold` is a regression, below 1 - `threshold` an
+    improvement. Measurements that errored on either side are skipped.
+    """
+    previous = {key(r): r for r in before if "median" in r}
+    ret = []
+    for result in after:
+        old = previous.get(key(result))
+        if old is None or "median" not in result:
+            continue
+        ratio = result["median"] / old["median"] if old["median"] else None
+        if ratio is None:
+            status = "unchanged"
+        elif ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 - threshold:
+            status = "improvement"
+        else:
+            status = "unchanged"
+        entry = {k: result.get(k) for k in KEYS if result.get(k) is not None}
+        entry.update(
+            {
+                "before": old["median"],
+                "after": result["median"],
+                "ratio": ratio,
+                "status": status,
+            }
+        )
+        ret.append(entry)
+    return ret
+
+
+def main(argv=None):
+    """compare BEFORE.json AFTER.json [THRESHOLD], exits 1 on any regression"""
+    argv = sys.argv[1:] if argv is None else argv
+    threshold = float(argv[2]) if len(argv) > 2 else 0.1
+    ret = compare(load(argv[0]), load(argv[1]), threshold=threshold)
+    print(ujson.dumps(ret, indent=2))
+    return 1 if any(r["status"] == "regression" for r in ret) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import os.path
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import ujson
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.persistence.engine import SQLITE_PRAGMAS, createEngine
+from crowdsource.persistence.models import Base, Competition, Submission
+from crowdsource.types.competition import CompetitionSpec
+
+PROFILES = {"default": None, "wal": SQLITE_PRAGMAS}
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def _seed(session):
+    spec = CompetitionSpec(
+        title="bench",
+        type=CompetitionType.CLASSIFY,
+        expiration=datetime.now() + timedelta(days=1),
+        prize=1.0,
+        metric=CompetitionMetric.LOGLOSS,
+        dataset="",
+    )
+    competition = Competition.from_spec(1, spec)
+    session.add(competition)
+    session.commit()
+    return competition.competition_id
+
+
+def burst(pragmas, writers=8, inserts=200):
+    """Insert submissions from `writers` threads while timing competition and leaderboard reads
+
+    Each insert is its own commit, like SubmissionHandler. Returns write
+    throughput, read latency percentiles, and how many operations failed on a
+    locked database.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = createEngine(
+            "sqlite:///" + os.path.join(directory, "bench.db"), sqlite_pragmas=pragmas
+        )
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        competition_id = _seed(Session())
+
+        done = threading.Event()
+        latencies, errors = [], {"read": 0, "write": 0}
+
+        def write():
+            session = Session()
+            for i in range(inserts):
+                session.add(
+                    Submission(
+                        user_id=1,
+                        competition_id=competition_id,
+                        score=i,
+                        answer="",
+                        answer_type="none",
+                        timestamp=datetime.now(),
+                    )
+                )
+                try:
+                    session.commit()
+                except OperationalError:
+                    session.rollback()
+                    errors["write"] += 1
+            session.close()
+
+        def read():
+            session = Session()
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    session.query(Competition).all()
+                    session.query(Submission).filter_by(
+                        competition_id=competition_id
+                    ).order_by(Submission.score.desc()).limit(10).all()
+                    session.commit()
+                except OperationalError:
+                    session.rollback()
+                    errors["read"] += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+            session.close()
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        threads = [threading.Thread(target=write) for _ in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        done.set()
+        reader.join()
+        engine.dispose()
+
+    return {
+        "writes_per_second": writers * inserts / elapsed,
+        "reads": len(latencies),
+        "read_p50": _percentile(latencies, 0.5),
+        "read_p99": _percentile(latencies, 0.99),
+        "read_max": max(latencies) if latencies else None,
+        "read_errors": errors["read"],
+        "write_errors": errors["write"],
+    }
+
+
+def run(writers=8, inserts=200):
+    ret = []
+    for name, pragmas in PROFILES.items():
+        result = burst(pragmas, writers=writers, inserts=inserts)
+        result.update(
+            {
+                "benchmark": "db_write",
+                "profile": name,
+                "writers": writers,
+                "inserts": inserts,
+            }
+        )
+        ret.append(result)
+    return ret
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    writers = int(argv[0]) if argv else 8
+    inserts = int(argv[1]) if len(argv) > 1 else 200
+    print(ujson.dumps(run(writers=writers, inserts=inserts), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os.path
+import subprocess
+import sys
+import tempfile
+
+import ujson
+
+from .fixtures import serve, writeFixtures
+
+_SNIPPET = """
+import sys, time, tracemalloc, ujson
+from crowdsource.types.utils import _fetchDataset
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def rss():
+    if resource is None:
+        return None
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+kwargs = ujson.loads(sys.argv[2])
+before = rss()
+tracemalloc.start()
+start = time.perf_counter()
+df = _fetchDataset(sys.argv[1], **kwargs)
+end = time.perf_counter()
+_, traced = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+after = rss()
+print(ujson.dumps({
+    "seconds": end - start,
+    "rows": len(df.index),
+    "result_bytes": int(df.memory_usage(deep=True).sum()),
+    "peak_traced": traced,
+    "peak_rss_delta": None if before is None else after - before,
+}))
+"""
+
+
+def fetchMemory(url, kwargs):
+    """Fetch `url` with _fetchDataset in a fresh interpreter, return time and peak memory
+
+    peak_traced is the peak of python/numpy allocations during the fetch,
+    peak_rss_delta how far the process high water mark moved.
+    """
+    out = subprocess.check_output(
+        [sys.executable, "-c", _SNIPPET, url, ujson.dumps(kwargs)]
+    )
+    return ujson.loads(out.decode("utf8").strip().splitlines()[-1])
+
+
+def run(rows=1000000):
+    ret = []
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = writeFixtures(directory, rows)
+        with serve(directory) as base:
+            for name, kwargs in fixtures.items():
+                size = os.path.getsize(os.path.join(directory, name))
+                result = fetchMemory(base + name, kwargs)
+                result.update(
+                    {
+                        "benchmark": "fetch",
+                        "fixture": name,
+                        "bytes": size,
+                        "peak_over_payload": result["peak_traced"] / size,
+                    }
+                )
+                ret.append(result)
+    return ret
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    rows = int(argv[0]) if argv else 1000000
+    print(ujson.dumps(run(rows=rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import functools
+import gzip
+import os.path
+import threading
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def serve(directory):
+    """Serve `directory` over http on a free local port, yields the base url"""
+    handler = functools.partial(_QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield "http://127.0.0.1:{}/".format(server.server_port)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def frame(rows, columns=8, seed=0):
+    """Deterministic numeric frame with an id column"""
+    rng = np.random.RandomState(seed)
+    df = pd.DataFrame(
+        rng.rand(rows, columns), columns=["c{}".format(i) for i in range(columns)]
+    )
+    df.insert(0, "id", np.arange(rows))
+    return df
+
+
+def writeFixtures(directory, rows):
+    """Write the same frame as csv, csv.gz, json and record json, returns {name: kwargs}"""
+    df = frame(rows)
+    df.to_csv(os.path.join(directory, "data.csv"), index=False)
+    with gzip.open(os.path.join(directory, "data.csv.gz"), "wt") as fp:
+        df.to_csv(fp, index=False)
+    df.to_json(os.path.join(directory, "data.json"))
+    with open(os.path.join(directory, "records.json"), "w") as fp:
+        fp.write('{"records": ')
+        df.to_json(fp, orient="records")
+        fp.write("}")
+
+    return {
+        "data.csv": {"data_type": "csv"},
+        "data.csv.gz": {"data_type": "csv"},
+        "data.json": {"data_type": "json"},
+        "records.json": {"data_type": "json", "record_column": "records"},
+    }
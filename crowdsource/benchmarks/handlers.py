@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os.path
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import tornado.httpserver
+import tornado.web
+import ujson
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.handlers import (
+    CompetitionHandler,
+    LeaderboardHandler,
+    SubmissionHandler,
+)
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client, Competition, Submission
+from crowdsource.persistence.users import UserCache
+from crowdsource.types.competition import CompetitionSpec
+
+from .fixtures import frame
+from .timing import summarize
+
+SIZES = (100, 1000, 10000)
+
+ROWS = 100
+
+
+def _truth():
+    df = frame(ROWS)[["c0"]].rename(columns={"c0": "class"})
+    df["class"] = df["class"].round()
+    return df
+
+
+def seed(url, submissions, competitions=4, users=8):
+    """Fill `url` with `users` clients, `competitions` competitions and `submissions` scored submissions"""
+    engine = createEngine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    session = Session()
+    for i in range(users):
+        session.add(
+            Client(
+                username="bench%d" % i,
+                password="bench",
+                email="bench%d@bench.com" % i,
+            )
+        )
+    session.commit()
+
+    for i in range(competitions):
+        session.add(
+            Competition.from_spec(
+                1 + i % users,
+                CompetitionSpec(
+                    title="bench%d" % i,
+                    type=CompetitionType.CLASSIFY,
+                    expiration=datetime.now() + timedelta(days=1),
+                    prize=1.0,
+                    metric=CompetitionMetric.ABSDIFF,
+                    dataset=_truth(),
+                ),
+            )
+        )
+    session.commit()
+
+    now = datetime.now()
+    session.bulk_insert_mappings(
+        Submission,
+        [
+            {
+                "user_id": 1 + i % users,
+                "competition_id": 1 + i % competitions,
+                "score": float(i % 97),
+                "answer": "",
+                "answer_type": "none",
+                "timestamp": now,
+            }
+            for i in range(submissions)
+        ],
+    )
+    session.commit()
+    session.close()
+    return engine, Session
+
+
+def _context(Session, aio=None):
+    from perspective import Table
+
+    return {
+        "users": UserCache(Session),
+        "submissions": Table({"a": int}),
+        "all_submissions": Table({"submission_id": int, "score": float}),
+        "leaderboards": Table({"submission_id": int, "score": float}),
+        "prototypes": {},
+        "to_score_later": [],
+        "aio": aio,
+    }
+
+
+def _requests():
+    """(name, path, method, body) for each endpoint measured"""
+    answer = _truth().to_json()
+    return [
+        ("competition", "/competition", "GET", None),
+        ("leaderboard", "/leaderboard", "GET", None),
+        ("leaderboard-competition", "/leaderboard?competition_id=1", "GET", None),
+        ("submission", "/submission", "GET", None),
+        (
+            "submission-post",
+            "/submission",
+            "POST",
+            json.dumps(
+                {
+                    "competition_id": 1,
+                    "submission": {
+                        "competition_id": 1,
+                        "answer": answer,
+                        "answer_type": "none",
+                    },
+                }
+            ),
+        ),
+    ]
+
+
+async def _drive(Session, context, requests, concurrency):
+    app = tornado.web.Application(
+        [
+            (r"/competition", CompetitionHandler, context),
+            (r"/leaderboard", LeaderboardHandler, context),
+            (r"/submission", SubmissionHandler, context),
+        ],
+        login_manager=SQLAlchemyLoginManager(Session, SQLAlchemyLoginManagerOptions()),
+        cookie_secret="bench",
+    )
+    sock, port = bind_unused_port()
+    server = tornado.httpserver.HTTPServer(app)
+    server.add_sockets([sock])
+    client = AsyncHTTPClient(max_clients=concurrency)
+    cookie = tornado.web.create_signed_value("bench", "user", "1").decode()
+    base = "http://127.0.0.1:%d" % port
+
+    ret = []
+    try:
+        for name, path, method, body in _requests():
+            latencies, errors = [], 0
+
+            async def worker(n):
+                nonlocal errors
+                for _ in range(n):
+                    start = time.perf_counter()
+                    try:
+                        await client.fetch(
+                            base + path,
+                            method=method,
+                            body=body,
+                            headers={"Cookie": "user=" + cookie},
+                        )
+                    except HTTPClientError:
+                        errors += 1
+                        continue
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(worker(requests // concurrency) for _ in range(concurrency))
+            )
+            elapsed = time.perf_counter() - start
+
+            result = {"name": name, "errors": errors}
+            if latencies:
+                result.update(summarize(latencies))
+                result["requests_per_second"] = len(latencies) / elapsed
+            ret.append(result)
+    finally:
+        server.stop()
+    return ret
+
+
+def _aio(url):
+    try:
+        from sqlalchemy.ext.asyncio import AsyncSession
+
+        from crowdsource.persistence.aio import createAsyncEngine
+
+        engine = createAsyncEngine(url)
+    except (ImportError, ValueError):
+        return None
+    return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+def run(sizes=SIZES, requests=50, concurrency=1):
+    """Time each handler over http against a sqlite database seeded with `sizes` submissions
+
+    Every size is measured with reads on executor threads and, where
+    aiosqlite is installed, on the IOLoop. POSTs run last, so the reads
+    see exactly `size` submissions.
+    """
+    ret = []
+    for size in sizes:
+        for mode in ("executor", "aio"):
+            with tempfile.TemporaryDirectory() as directory:
+                url = "sqlite:///" + os.path.join(directory, "bench.db")
+                engine, Session = seed(url, size)
+                aio = _aio(url) if mode == "aio" else None
+                if mode == "aio" and aio is None:
+                    engine.dispose()
+                    continue
+                results = asyncio.run(
+                    _drive(Session, _context(Session, aio), requests, concurrency)
+                )
+                if aio is not None:
+                    asyncio.run(aio.kw["bind"].dispose())
+                engine.dispose()
+
+            for result in results:
+                result.update(
+                    {
+                        "benchmark": "handlers",
+                        "case": mode,
+                        "size": size,
+                        "concurrency": concurrency,
+                    }
+                )
+                ret.append(result)
+    return ret
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sizes = tuple(int(x) for x in argv[0].split(",")) if argv else SIZES
+    requests = int(argv[1]) if len(argv) > 1 else 50
+    concurrency = int(argv[2]) if len(argv) > 2 else 1
+    print(
+        ujson.dumps(
+            run(sizes=sizes, requests=requests, concurrency=concurrency), indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os.path
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import ujson
+
+from crowdsource.enums import (
+    AnswerType,
+    CompetitionMetric,
+    CompetitionType,
+    DatasetFormat,
+)
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.submission import SubmissionSpec
+from crowdsource.types.utils import _fetchDataset, answerPrototype, checkAnswer
+
+from .fixtures import frame, serve, writeFixtures
+from .timing import measure
+
+SIZES = (1000, 10000, 100000)
+
+# (type, targets, dataset_key, when) reaching each branch of answerPrototype
+PROTOTYPES = {
+    AnswerType.ONE: (CompetitionType.CLASSIFY, None, None, None),
+    AnswerType.TWO: (CompetitionType.PREDICT, {0: ["c0", "c1"]}, "id", True),
+    AnswerType.THREE: (CompetitionType.PREDICT, {0: ["c0", "c1"]}, "id", None),
+    AnswerType.FOUR: (CompetitionType.PREDICT, {0: ["c0", "c1"]}, None, True),
+    AnswerType.FIVE: (CompetitionType.PREDICT, {0: ["c0", "c1"]}, None, None),
+    AnswerType.SIX: (CompetitionType.PREDICT, ["c0", "c1"], "id", True),
+    AnswerType.SEVEN: (CompetitionType.PREDICT, ["c0", "c1"], "id", None),
+    AnswerType.EIGHT: (CompetitionType.PREDICT, ["c0", "c1"], None, True),
+    AnswerType.NINE: (CompetitionType.PREDICT, ["c0", "c1"], None, None),
+    AnswerType.TEN: (CompetitionType.CLUSTER, None, None, None),
+}
+
+# (type, metric, targets, dataset_key) scored by checkAnswer
+SCORING = {
+    "classify-absdiff": (
+        CompetitionType.CLASSIFY,
+        CompetitionMetric.ABSDIFF,
+        None,
+        None,
+    ),
+    "classify-logloss": (
+        CompetitionType.CLASSIFY,
+        CompetitionMetric.LOGLOSS,
+        None,
+        None,
+    ),
+    "predict-list": (
+        CompetitionType.PREDICT,
+        CompetitionMetric.ABSDIFF,
+        ["c0", "c1"],
+        None,
+    ),
+    "predict-dict": (
+        CompetitionType.PREDICT,
+        CompetitionMetric.ABSDIFF,
+        {0: ["c0", "c1"], 1: ["c0", "c1"]},
+        "id",
+    ),
+}
+
+
+def _result(name, case, size, fn, repeat):
+    ret = {"benchmark": "hotpaths", "name": name, "case": case, "size": size}
+    try:
+        ret.update(measure(fn, repeat=repeat))
+    except Exception as e:
+        # a path that can't run here is recorded, not fatal to the suite
+        ret["error"] = "{}: {}".format(type(e).__name__, e)
+    return ret
+
+
+def _competitionSpec(size):
+    df = frame(size)
+    return CompetitionSpec(
+        title="bench",
+        type=CompetitionType.PREDICT,
+        expiration=datetime.now() + timedelta(days=1),
+        prize=1.0,
+        metric=CompetitionMetric.ABSDIFF,
+        dataset=df,
+        targets=["c0", "c1"],
+        dataset_key="id",
+        when=datetime.now(),
+        answer=df,
+    )
+
+
+def specs(sizes=SIZES, repeat=5):
+    """CompetitionSpec and SubmissionSpec round trips with an inline dataset of `sizes` rows"""
+    ret = []
+    for size in sizes:
+        spec = _competitionSpec(size)
+        d = spec.to_dict()
+        submission = {
+            "competition_id": 1,
+            "answer": frame(size).to_json(),
+            "answer_type": DatasetFormat.NONE.value,
+        }
+        ret.append(
+            _result("CompetitionSpec.to_dict", "inline", size, spec.to_dict, repeat)
+        )
+        ret.append(
+            _result(
+                "CompetitionSpec.from_dict",
+                "inline",
+                size,
+                lambda: CompetitionSpec.from_dict(d),
+                repeat,
+            )
+        )
+        ret.append(
+            _result(
+                "SubmissionSpec.from_dict",
+                "inline",
+                size,
+                lambda: SubmissionSpec.from_dict(submission),
+                repeat,
+            )
+        )
+    return ret
+
+
+def prototypes(sizes=SIZES, repeat=5):
+    """answerPrototype for every AnswerType against a dataset of `sizes` rows"""
+    ret = []
+    for size in sizes:
+        dataset = frame(size)
+        for answer_type, (type, targets, key, when) in PROTOTYPES.items():
+            spec = SimpleNamespace(
+                type=type,
+                targets=targets,
+                dataset_key=key,
+                when=datetime.now() if when else None,
+            )
+            ret.append(
+                _result(
+                    "answerPrototype",
+                    answer_type.name,
+                    size,
+                    lambda: answerPrototype(spec, dataset),
+                    repeat,
+                )
+            )
+    return ret
+
+
+def _submission(case, size):
+    type, metric, targets, key = SCORING[case]
+    truth = frame(size)
+    answer = frame(size, seed=1)
+    if type == CompetitionType.CLASSIFY:
+        truth = truth[["c0"]].rename(columns={"c0": "class"})
+        truth["class"] = np.round(truth["class"])
+        answer = answer[["c0"]].rename(columns={"c0": "class"})
+    competition = SimpleNamespace(
+        competition_id=1,
+        type=type,
+        metric=metric,
+        targets=targets,
+        dataset_key=key,
+        dataset="",
+        dataset_type=DatasetFormat.NONE,
+        dataset_kwargs={},
+        answer=truth.to_json(),
+        answer_type=DatasetFormat.NONE,
+        expiration=datetime.now() + timedelta(days=1),
+    )
+    return SimpleNamespace(
+        competition=competition,
+        answer=answer.to_json(),
+        answer_type=DatasetFormat.NONE,
+    )
+
+
+def scoring(sizes=SIZES, repeat=5):
+    """checkAnswer on inline answers of `sizes` rows, CLASSIFY and PREDICT"""
+    ret = []
+    for size in sizes:
+        for case in SCORING:
+            submission = _submission(case, size)
+            ret.append(
+                _result(
+                    "checkAnswer",
+                    case,
+                    size,
+                    lambda: checkAnswer(submission),
+                    repeat,
+                )
+            )
+    return ret
+
+
+def fetching(rows=100000, repeat=3):
+    """_fetchDataset of each fixture format over http from a local server"""
+    ret = []
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = writeFixtures(directory, rows)
+        with serve(directory) as base:
+            for name, kwargs in fixtures.items():
+                result = _result(
+                    "_fetchDataset",
+                    name,
+                    rows,
+                    lambda: _fetchDataset(base + name, **kwargs),
+                    repeat,
+                )
+                result["bytes"] = os.path.getsize(os.path.join(directory, name))
+                ret.append(result)
+    return ret
+
+
+def run(sizes=SIZES, repeat=5):
+    return (
+        specs(sizes, repeat=repeat)
+        + prototypes(sizes, repeat=repeat)
+        + scoring(sizes, repeat=repeat)
+        + fetching(max(sizes))
+    )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sizes = tuple(int(x) for x in argv[0].split(",")) if argv else SIZES
+    print(ujson.dumps(run(sizes=sizes), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import statistics
+import subprocess
+import sys
+
+import ujson
+
+# modules whose cold-start cost we track
+MODULES = ("crowdsource.client", "crowdsource.server")
+
+# optional dependencies that should only be imported on use
+HEAVY = ("cufflinks", "sklearn", "scipy", "plotly", "perspective")
+
+_SNIPPET = """
+import sys, time, ujson
+start = time.perf_counter()
+import {module}
+end = time.perf_counter()
+print(ujson.dumps({{
+    "seconds": end - start,
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def importTime(module, heavy=HEAVY):
+    """Import `module` in a fresh interpreter, return seconds taken and heavy modules loaded"""
+    out = subprocess.check_output(
+        [sys.executable, "-c", _SNIPPET.format(module=module, heavy=tuple(heavy))]
+    )
+    return ujson.loads(out.decode("utf8").strip().splitlines()[-1])
+
+
+def run(modules=MODULES, repeat=5):
+    ret = []
+    for module in modules:
+        runs = [importTime(module) for _ in range(repeat)]
+        times = [r["seconds"] for r in runs]
+        ret.append(
+            {
+                "benchmark": "import_time",
+                "module": module,
+                "repeat": repeat,
+                "min": min(times),
+                "median": statistics.median(times),
+                "max": max(times),
+                "heavy": runs[-1]["heavy"],
+            }
+        )
+    return ret
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repeat = int(argv[0]) if argv else 5
+    print(ujson.dumps(run(repeat=repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
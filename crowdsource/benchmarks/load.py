@@ -0,0 +1,320 @@
+import argparse
+import os.path
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+import ujson
+from sqlalchemy.orm import sessionmaker
+from tornado.testing import bind_unused_port
+
+from crowdsource.client import Client
+from crowdsource.client import samples
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import APIKey, Base, Client as ClientModel
+
+from .timing import percentile
+
+# generator of a competition, and the answer bots submit to it
+SAMPLES = {
+    "classify1": (samples.classify1, samples.answerClassify1),
+    "predict1": (samples.predict1, samples.answerPredict1),
+    "predict2": (samples.predict2, samples.answerPredict1),
+}
+
+
+def seedUsers(url, count):
+    """Create `count` users with an API key each in `url`, returns [(key, secret)]"""
+    engine = createEngine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    users = [
+        ClientModel(username="load%d" % i, password="load", email="load%d@load.com" % i)
+        for i in range(count)
+    ]
+    session.add_all(users)
+    session.commit()
+    keys = [APIKey(user_id=user.id) for user in users]
+    session.add_all(keys)
+    session.commit()
+    session.close()
+    engine.dispose()
+    return [(k.key, k.secret) for k in keys]
+
+
+def rss(pid):
+    """(current, peak) resident bytes of `pid`, None where /proc is unavailable"""
+    try:
+        with open("/proc/%d/status" % pid, "r") as fp:
+            status = dict(line.split(":", 1) for line in fp if ":" in line)
+    except OSError:
+        return None, None
+
+    def kb(field):
+        value = status.get(field)
+        return int(value.split()[0]) * 1024 if value else None
+
+    return kb("VmRSS"), kb("VmHWM")
+
+
+_SERVER = """
+import sys
+from crowdsource.server import Crowdsource
+
+Crowdsource.launch_instance(sys.argv[1:])
+"""
+
+
+@contextmanager
+def server(url, directory, args=(), timeout=60):
+    """Run a Crowdsource server on `url` and a free port, yields (host, process)"""
+    sock, port = bind_unused_port()
+    sock.close()
+    log = open(os.path.join(directory, "server.log"), "w")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            _SERVER,
+            "--Crowdsource.port=%d" % port,
+            "--Crowdsource.sql_url=%s" % url,
+        ]
+        + list(args),
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    host = "http://127.0.0.1:%d/" % port
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(
+                    "server did not start, see %s"
+                    % os.path.join(directory, "server.log")
+                )
+            try:
+                requests.get(host + "api/v1/competition", timeout=1)
+                break
+            except requests.ConnectionError:
+                time.sleep(0.2)
+        yield host, process
+    finally:
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log.close()
+
+
+class Stats(object):
+    def __init__(self):
+        """Latencies and errors by operation, shared by every bot"""
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.lags = []
+
+    def record(self, op, seconds):
+        with self._lock:
+            self.latencies.setdefault(op, []).append(seconds)
+
+    def error(self, op):
+        with self._lock:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def lag(self, seconds):
+        with self._lock:
+            self.lags.append(seconds)
+
+
+def _timed(stats, op, fn, *args, **kwargs):
+    start = time.perf_counter()
+    try:
+        ret = fn(*args, **kwargs)
+    except Exception:
+        stats.error(op)
+        return None
+    stats.record(op, time.perf_counter() - start)
+    return ret
+
+
+def bot(host, key, secret, stats, stop, answers):
+    """Poll for competitions, submit to each in turn and read back the leaderboard
+
+    The loop Client.compete runs on its own thread, driven here so a run
+    can be bounded and timed. Scoring lag is submit to score visible,
+    whether scored in the submit or later by score_laters.
+    """
+    client = _timed(stats, "login", Client, host, key, secret)
+    if client is None:
+        return
+    solved = {}
+    i = 0
+    while not stop.is_set():
+        competitions = _timed(stats, "competitions", client.competitions)
+        if not competitions:
+            time.sleep(0.5)
+            continue
+        competition = competitions[i % len(competitions)]
+        i += 1
+        competition_id = competition["competition_id"]
+        spec = competition["spec"]
+
+        answer = answers.get(competition_id)
+        if answer is None:
+            continue
+        if competition_id not in solved:
+            # solved once per bot, the load under test is the server's
+            try:
+                solved[competition_id] = answer(spec)
+            except Exception:
+                stats.error("answer")
+                solved[competition_id] = None
+        if solved[competition_id] is None:
+            continue
+
+        sent = time.monotonic()
+        resp = _timed(
+            stats, "submit", client.submit, competition_id, solved[competition_id]
+        )
+        if not isinstance(resp, dict) or "submission_id" not in resp:
+            continue
+        if resp.get("status") == "scored":
+            stats.lag(time.monotonic() - sent)
+            waiting = None
+        else:
+            waiting = resp["submission_id"]
+
+        board = _timed(
+            stats, "leaderboards", client.leaderboards, competitionId=[competition_id]
+        )
+        if waiting is not None and board:
+            for s in board:
+                if s.get("submission_id") == waiting and s.get("score", -1) != -1:
+                    stats.lag(time.monotonic() - sent)
+
+
+def _summary(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+
+
+def run(
+    competitions=3, bots=8, duration=30.0, sql_url=None, kinds=tuple(SAMPLES), args=()
+):
+    """Drive a Crowdsource server with `bots` concurrent bots for `duration` seconds
+
+    The server runs in its own process on `sql_url`, a fresh sqlite database
+    by default (pass an empty postgres database to test that), with
+    `competitions` competitions created by the client/samples.py generators
+    named in `kinds`. Sample competitions expire after a minute, keep
+    `duration` below that.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        url = sql_url or "sqlite:///" + os.path.join(directory, "load.db")
+        keys = seedUsers(url, bots + 1)
+
+        with server(url, directory, args=args) as (host, process):
+            host_client = Client(host, *keys[0])
+            answers = {}
+            for i in range(competitions):
+                generate, answer = SAMPLES[kinds[i % len(kinds)]]
+                resp = generate(host, cookies=host_client._cookies)
+                answers[int(resp["competition_id"])] = answer
+
+            stats = Stats()
+            stop = threading.Event()
+            threads = [
+                threading.Thread(
+                    target=bot, args=(host, key, secret, stats, stop, answers)
+                )
+                for key, secret in keys[1:]
+            ]
+            memory = []
+
+            def sample():
+                while not stop.is_set():
+                    memory.append(rss(process.pid)[0])
+                    stop.wait(0.5)
+
+            sampler = threading.Thread(target=sample)
+            start = time.perf_counter()
+            sampler.start()
+            for t in threads:
+                t.start()
+            time.sleep(duration)
+            stop.set()
+            for t in threads:
+                t.join()
+            sampler.join()
+            elapsed = time.perf_counter() - start
+            current, peak = rss(process.pid)
+
+    memory = [m for m in memory if m is not None]
+    submits = len(stats.latencies.get("submit", []))
+    return {
+        "benchmark": "load",
+        "sql_url": "sqlite" if sql_url is None else sql_url.split(":", 1)[0],
+        "competitions": competitions,
+        "bots": bots,
+        "seconds": elapsed,
+        "requests_per_second": sum(len(v) for v in stats.latencies.values()) / elapsed,
+        "submissions_per_second": submits / elapsed,
+        "latency": {op: _summary(v) for op, v in stats.latencies.items()},
+        "errors": stats.errors,
+        "scoring_lag": _summary(stats.lags),
+        "server_rss": {
+            "final": current,
+            "peak": peak,
+            "mean": sum(memory) / len(memory) if memory else None,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m crowdsource.benchmarks.load")
+    parser.add_argument("--competitions", type=int, default=3)
+    parser.add_argument("--bots", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--sql-url", default=None, help="empty database to use, default a temp sqlite"
+    )
+    parser.add_argument(
+        "--samples",
+        default=",".join(SAMPLES),
+        help="client/samples.py generators to create competitions with",
+    )
+    parser.add_argument("-o", "--output", help="file to write, default stdout")
+    args, server_args = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+
+    result = run(
+        competitions=args.competitions,
+        bots=args.bots,
+        duration=args.duration,
+        sql_url=args.sql_url,
+        kinds=tuple(args.samples.split(",")),
+        # anything else, e.g. --Crowdsource.group_commit=False, goes to the server
+        args=server_args,
+    )
+    out = ujson.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as fp:
+            fp.write(out)
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os.path
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(times):
+    """min/median/mean/p99/max of per call `times` in seconds"""
+    return {
+        "calls": len(times),
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "p99": percentile(times, 0.99),
+        "max": max(times),
+    }
+
+
+def measure(fn, repeat=5, number=None, budget=0.2):
+    """Time `fn()`, returning per call seconds over `repeat` rounds of `number` calls
+
+    When `number` is None it is picked so one round takes about `budget`
+    seconds, so fast and slow paths both get a stable figure.
+    """
+    if number is None:
+        start = time.perf_counter()
+        fn()
+        once = time.perf_counter() - start
+        number = max(1, min(10000, int(budget / once))) if once > 0 else 10000
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    ret = summarize(times)
+    ret["number"] = number
+    return ret
+
+
+def gitCommit():
+    try:
+        out = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.decode("utf8").strip()
+
+
+def environment():
+    """What a run was measured on, so results are only compared like for like"""
+    return {
+        "commit": gitCommit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now().isoformat(),
+    }
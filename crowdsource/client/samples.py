@@ -1,10 +1,8 @@
 import time
 from datetime import datetime, timedelta
 
-import cufflinks.datagen as cfdg
 import pandas
 import ujson
-from sklearn.datasets import make_classification
 from tornado_sqlalchemy_login.utils import construct_path, safe_post
 
 from ..enums import CompetitionMetric, CompetitionType, DatasetFormat
@@ -12,6 +10,8 @@ from ..types.competition import CompetitionSpec
 
 
 def classify1(host, cookies=None, proxies=None):
+    from sklearn.datasets import make_classification
+
     dataset = make_classification()
     competition = CompetitionSpec(
         title="Classify this dataset",
@@ -52,6 +52,8 @@ def answerClassify3(competitionSpec, *args, **kwargs):
 
 
 def predict1(host, cookies=None, proxies=None):
+    import cufflinks.datagen as cfdg
+
     dataset = cfdg.ohlcv()
     competition = CompetitionSpec(
         title="Predict next day volume",
@@ -60,7 +62,8 @@ def predict1(host, cookies=None, proxies=None):
         prize=1.0,
         dataset=dataset.iloc[:-1],
         metric=CompetitionMetric.ABSDIFF,
-        targets=dataset.columns[-1],
+        # a list, to_dict() would split a bare column name into characters
+        targets=[dataset.columns[-1]],
         answer=dataset.iloc[-1:],
         when=datetime.utcfromtimestamp(
             dataset[-1:].index.values[0].astype(datetime) / 1000000000
@@ -76,6 +79,8 @@ def predict1(host, cookies=None, proxies=None):
 
 
 def predict2(host, cookies=None, proxies=None):
+    import cufflinks.datagen as cfdg
+
     dataset = cfdg.lines()
     competition = CompetitionSpec(
         title="Predict future value",
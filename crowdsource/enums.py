@@ -11,6 +11,9 @@ class DatasetFormat(Enum):
     NONE = "none"
     CSV = "csv"
     JSON = "json"
+    PARQUET = "parquet"
+    ARROW = "arrow"
+    NUMPY = "npy"
 
 
 class CompetitionType(Enum):
@@ -41,3 +44,14 @@ class AnswerType(Enum):
     EIGHT = 8  # Predict 7
     NINE = 9  # Predict 8
     TEN = 10  # Cluster
+
+
+class ScoringStatus(Enum):
+    """Enumeration of the outcomes of scoring a submission"""
+
+    SCORED = "scored"
+    TIMEOUT = "timeout"
+    MEMORY = "memory"
+    TOO_LARGE = "too_large"
+    UNAVAILABLE = "unavailable"
+    FAILED = "failed"
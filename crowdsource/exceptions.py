@@ -38,3 +38,24 @@ class MalformedDataType(Exception):
         super(MalformedDataType, self).__init__(
             "No handler for datatype - %s" % type, *args, **kwargs
         )
+
+
+class DatasetTooLarge(Exception):
+    def __init__(self, size, *args, **kwargs):
+        super(DatasetTooLarge, self).__init__(
+            "Dataset exceeds maximum download size - %s bytes" % size, *args, **kwargs
+        )
+
+
+class DatasetUnavailable(Exception):
+    def __init__(self, host, *args, **kwargs):
+        super(DatasetUnavailable, self).__init__(
+            "Dataset host unavailable - %s" % host, *args, **kwargs
+        )
+
+
+class MalformedSubmission(Exception):
+    def __init__(self, reason, *args, **kwargs):
+        super(MalformedSubmission, self).__init__(
+            "Malformed submission - %s" % reason, *args, **kwargs
+        )
@@ -1,6 +1,11 @@
 from .admin import AdminHandler  # noqa: F401
+from .apikeys import APIKeyHandler  # noqa: F401
 from .base import HTMLHandler  # noqa: F401
 from .competition import CompetitionHandler  # noqa: F401
 from .leaderboard import LeaderboardHandler  # noqa: F401
+from .login import LoginHandler  # noqa: F401
+from .metrics import MetricsHandler  # noqa: F401
+from .profiler import ProfilerHandler  # noqa: F401
+from .register import RegisterHandler  # noqa: F401
 from .submission import SubmissionHandler  # noqa: F401
 from .user import UserHandler  # noqa: F401
@@ -1,4 +1,3 @@
-import tornado.gen
 import tornado.web
 from tornado.concurrent import run_on_executor
 
@@ -6,14 +5,26 @@ from .base import AuthenticatedHandler
 
 
 class AdminHandler(AuthenticatedHandler):
-    @tornado.gen.coroutine
-    def get(self):
+    async def get(self):
         """Get the current list of user ids"""
-        yield self._get()
-
-    @run_on_executor
-    def _get(self):
-        if self.current_user and self.is_admin():
+        if self._aio:
+            admin = await self.is_admin_async()
+        else:
+            admin = await self._is_admin()
+        if self.current_user and admin:
             self.write("")
             return
         self._set_401("Not admin")
+
+    @run_on_executor
+    def _is_admin(self):
+        return self.is_admin()
+
+    @tornado.web.authenticated
+    def post(self):
+        """Drop `user_id`, or everyone, from the user cache after changing them in the database"""
+        if not self.is_admin():
+            self._set_401("Not admin")
+        if self._users:
+            self._users.invalidate(self.get_argument("user_id", None))
+        self.write("")
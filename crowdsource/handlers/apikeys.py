@@ -0,0 +1,12 @@
+from tornado_sqlalchemy_login.handlers import APIKeyHandler as _APIKeyHandler
+
+from .base import AuthenticatedHandler
+
+
+class APIKeyHandler(AuthenticatedHandler, _APIKeyHandler):
+    def delete_apikey(self, key_id):
+        """Revoke the key, and stop logins with it from the API key cache"""
+        ret = super(APIKeyHandler, self).delete_apikey(key_id)
+        if ret and self._apikeys:
+            self._apikeys.invalidate(ret["key"])
+        return ret
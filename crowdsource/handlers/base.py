@@ -1,13 +1,40 @@
-from tornado_sqlalchemy_login.handlers import AuthenticatedHandler
+from contextlib import contextmanager
+from datetime import datetime
+
+import ujson
+from tornado_sqlalchemy_login.handlers import (
+    AuthenticatedHandler as _AuthenticatedHandler,
+)
 from tornado_sqlalchemy_login.handlers import BaseHandler as _BaseHandler
+from tornado_sqlalchemy_login.sqla.models import User
+
+from .. import metrics
+
+
+def _timestamps(obj):
+    if isinstance(obj, datetime):
+        return obj.timestamp()
+    if isinstance(obj, dict):
+        return {k: _timestamps(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_timestamps(v) for v in obj]
+    return obj
 
-# for lint
-AuthenticatedHandler = AuthenticatedHandler
+
+def dumps(obj):
+    """ujson.dumps, writing datetimes as timestamps like ujson 1.x did
+
+    ujson 2+ refuses datetimes, which the models' to_dict() return, and
+    CompetitionSpec.from_dict reads timestamps back.
+    """
+    return ujson.dumps(_timestamps(obj))
 
 
 class BaseHandler(_BaseHandler):
     def initialize(self, **kwargs):
         for attr in (
+            "users",
+            "all_users",
             "clients",
             "all_clients",
             "competitions",
@@ -17,10 +44,78 @@ class BaseHandler(_BaseHandler):
             "leaderboards",
             "stash",
             "proxies",
+            "sandbox",
+            "prototypes",
+            "to_score_later",
+            "live",
+            "aio",
+            "replicas",
+            "archive",
+            "writer",
+            "apikeys",
+            "profiler",
         ):
             setattr(self, "_{}".format(attr), kwargs.pop(attr, ""))
         super(BaseHandler, self).initialize(**kwargs)
 
+    @contextmanager
+    def session(self):
+        """Transactional session from the login manager, committed on exit"""
+        with self.application.settings.get("login_manager").session() as session:
+            yield session
+
+    def read_session(self):
+        """session() for read-only queries, on a replica unless this user just wrote"""
+        if self._replicas and not self._replicas.pinned(self.current_user):
+            return self._replicas.session()
+        return self.session()
+
+    def read_aio(self):
+        """asyncio sessionmaker for read-only queries, None to read on the executor"""
+        if self._replicas and not self._replicas.pinned(self.current_user):
+            return self._replicas.aio()
+        return self._aio
+
+    def pin_primary(self):
+        """Keep this user's reads on the primary while their write replicates"""
+        if self._replicas:
+            self._replicas.pin(self.current_user)
+
+    def _validate(self, validator):
+        """Parse and check the request with one of the validate_* functions"""
+        return validator(self)
+
+    def on_finish(self):
+        metrics.observeRequest(self)
+        super(BaseHandler, self).on_finish()
+
+
+class AuthenticatedHandler(BaseHandler, _AuthenticatedHandler):
+    def get_user(self):
+        """get_user from the user cache, without a query while the user is cached"""
+        if not self._users:
+            return super(AuthenticatedHandler, self).get_user()
+        if not self.current_user:
+            return None
+        return self._users.get(self.current_user)
+
+    def is_admin(self):
+        """is_admin from the user cache, without a query while the user is cached"""
+        if not self._users:
+            return super(AuthenticatedHandler, self).is_admin()
+        if not self.current_user:
+            return False
+        user = self._users.get(self.current_user)
+        return bool(user and user.admin)
+
+    async def is_admin_async(self):
+        """is_admin, queried from the IOLoop through the asyncio engine"""
+        if not self.current_user:
+            return False
+        async with self._aio() as session:
+            user = await session.get(User, int(self.current_user))
+        return bool(user and user.admin)
+
 
 class HTMLHandler(BaseHandler):
     def initialize(self, template=None, basepath="/", wspath="/", **kwargs):
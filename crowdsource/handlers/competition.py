@@ -2,51 +2,72 @@ from datetime import datetime
 
 import tornado.gen
 import tornado.web
-import ujson
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from tornado.concurrent import run_on_executor
 
 from ..persistence.models import Competition
+from ..profiler import profiled
 from ..types.competition import CompetitionSpec
-from .base import AuthenticatedHandler
+from .base import AuthenticatedHandler, dumps
 from .validate import validate_competition_get, validate_competition_post
 
 
 class CompetitionHandler(AuthenticatedHandler):
-    @tornado.gen.coroutine
-    def get(self, *args, **kwargs):
-        yield self._get()
+    async def get(self, *args, **kwargs):
+        aio = self.read_aio()
+        if aio:
+            await self._aget(aio)
+        else:
+            await self._get()
 
     @run_on_executor
+    @profiled
     def _get(self, *args, **kwargs):
         """Get the current list of competition ids"""
         data = self._validate(validate_competition_get)
+        with self.read_session() as session:
+            res = self._filter(data, session.query(Competition).all())
+
+        self.write(dumps(res))
+
+    @profiled
+    async def _aget(self, aio):
+        """_get, queried from the IOLoop through the asyncio sessionmaker `aio`"""
+        data = self._validate(validate_competition_get)
+        async with aio() as session:
+            result = await session.execute(
+                select(Competition).options(selectinload(Competition.user))
+            )
+            res = self._filter(data, result.scalars().all())
+
+        self.write(dumps(res))
+
+    def _filter(self, data, competitions):
         res = []
-        with self.session() as session:
-            competitions = session.query(Competition).all()
-            for c in competitions:
-                competition_id = data.get("competition_id", ())
-                clid = data.get("user_id", ())
-                user_username = data.get("user_username", ())
-                t = data.get("type", ())
-
-                if competition_id and c.competition_id not in competition_id:
-                    continue
-                if clid and c.user_id not in clid:
-                    continue
-                if t and c.spec.type not in t:
-                    continue
-                if user_username and c.user.username != user_username:
-                    continue
+        for c in competitions:
+            competition_id = data.get("competition_id", ())
+            clid = data.get("user_id", ())
+            user_username = data.get("user_username", ())
+            t = data.get("type", ())
 
-                # check if expired and turn off if necessary
-                if datetime.now() > c.expiration:
-                    c.active = False
+            if competition_id and c.competition_id not in competition_id:
+                continue
+            if clid and c.user_id not in clid:
+                continue
+            if t and c.spec.type not in t:
+                continue
+            if user_username and c.user.username != user_username:
+                continue
 
-                    if self.get_argument("current", False):
-                        continue
-                res.append(c.to_dict())
+            # check if expired and turn off if necessary
+            if datetime.now() > c.expiration:
+                c.active = False
 
-        self.write(ujson.dumps(res))
+                if self.get_argument("current", False):
+                    continue
+            res.append(c.to_dict())
+        return res
 
     @tornado.web.authenticated
     @tornado.gen.coroutine
@@ -55,6 +76,7 @@ class CompetitionHandler(AuthenticatedHandler):
         yield self._post()
 
     @run_on_executor
+    @profiled
     def _post(self):
         data = self._validate(validate_competition_post)
 
@@ -71,13 +93,14 @@ class CompetitionHandler(AuthenticatedHandler):
             session.add(comp)
             session.commit()
             session.refresh(comp)
+            self.pin_primary()
 
             if comp.competition_id:
                 # put in perspective
                 self._competitions.update([comp.to_dict()])
                 self._all_competitions.update([comp.to_dict()])
                 self._writeout(
-                    ujson.dumps({"competition_id": str(comp.competition_id)}),
+                    dumps({"competition_id": str(comp.competition_id)}),
                     "Registering competitiong %s for user %s",
                     comp.competition_id,
                     comp.user_id,
@@ -1,50 +1,112 @@
-import tornado.gen
-import ujson
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
 from tornado.concurrent import run_on_executor
 
 from ..enums import CompetitionType
-from ..persistence.models import Submission
-from .base import AuthenticatedHandler
+from ..persistence.models import ArchivedCompetition, Submission, User
+from ..profiler import profiled
+from .base import AuthenticatedHandler, dumps
 from .validate import validate_leaderboard_get
 
 
 class LeaderboardHandler(AuthenticatedHandler):
-    @tornado.gen.coroutine
-    def get(self):
+    async def get(self):
         """Get the current list of competition ids"""
-        yield self._get()
+        aio = self.read_aio()
+        if aio:
+            await self._aget(aio)
+        else:
+            await self._get()
 
     @run_on_executor
+    @profiled
     def _get(self):
         data = self._validate(validate_leaderboard_get)
+        with self.read_session() as session:
+            res = self._filter(data, session.query(Submission).all())
+            self._page(data, res + self._archived(data, session))
+
+    @profiled
+    async def _aget(self, aio):
+        """_get, queried from the IOLoop through the asyncio sessionmaker `aio`"""
+        data = self._validate(validate_leaderboard_get)
+        async with aio() as session:
+            result = await session.execute(
+                select(Submission).options(
+                    selectinload(Submission.competition),
+                    selectinload(Submission.user),
+                )
+            )
+            res = self._filter(data, result.scalars().all())
+        if self._archive and data.get("competition_id"):
+            # archive files are read on the executor
+            res += await self._aarchived(data)
+        self._page(data, res)
+
+    @run_on_executor
+    def _aarchived(self, data):
+        with self.read_session() as session:
+            return self._archived(data, session)
+
+    def _archived(self, data, session):
+        """Leaderboard rows of requested competitions whose submissions were archived"""
+        cpid = data.get("competition_id", ())
+        if not self._archive or not cpid:
+            return []
+
+        submission_id = set(map(int, data.get("submission_id", ())))
+        clid = set(map(int, data.get("user_id", ())))
+        user_username = data.get("user_username", ())
+        t = data.get("type", ())
 
         res = []
-        with self.session() as session:
-            submissions = session.query(Submission).all()
-            for x in submissions:
-                for c in x:
-                    submission_id = data.get("submission_id", ())
-                    cpid = data.get("competition_id", ())
-                    clid = data.get("user_id", ())
-                    user_username = data.get("user_username", ())
-                    t = data.get("type", "")
-
-                    if submission_id and c.submission_id not in submission_id:
-                        continue
-                    if cpid and c.competition_id not in cpid:
-                        continue
-                    if clid and c.user_id not in clid:
-                        continue
-                    if t and CompetitionType(t) != c.competition.spec.type:
-                        continue
-                    if user_username and c.user.username != user_username:
-                        continue
-
-                    d = c.to_dict(private=True)
-                    d["score"] = round(d["score"], 2)
-                    res.append(d)
-
-            page = int(data.get("page", 0))
-            self.write(
-                ujson.dumps(res[page * 100 : (page + 1) * 100])
-            )  # return top 100
+        for archived in session.query(ArchivedCompetition).filter(
+            ArchivedCompetition.competition_id.in_([int(x) for x in cpid])
+        ):
+            if t and archived.competition.spec.type not in t:
+                continue
+            usernames = {}
+            if user_username:
+                usernames = {
+                    u.id: u.username
+                    for u in session.query(User).filter_by(username=user_username)
+                }
+            for d in self._archive.submissions(archived.competition_id):
+                if submission_id and d["submission_id"] not in submission_id:
+                    continue
+                if clid and d["user_id"] not in clid:
+                    continue
+                if user_username and d["user_id"] not in usernames:
+                    continue
+                d["score"] = round(d["score"], 2)
+                res.append(d)
+        return res
+
+    def _filter(self, data, submissions):
+        res = []
+        for c in submissions:
+            submission_id = data.get("submission_id", ())
+            cpid = data.get("competition_id", ())
+            clid = data.get("user_id", ())
+            user_username = data.get("user_username", ())
+            t = data.get("type", "")
+
+            if submission_id and c.submission_id not in submission_id:
+                continue
+            if cpid and c.competition_id not in cpid:
+                continue
+            if clid and c.user_id not in clid:
+                continue
+            if t and CompetitionType(t) != c.competition.spec.type:
+                continue
+            if user_username and c.user.username != user_username:
+                continue
+
+            d = c.to_dict(private=True)
+            d["score"] = round(d["score"], 2)
+            res.append(d)
+        return res
+
+    def _page(self, data, res):
+        page = int(data.get("page", 0))
+        self.write(dumps(res[page * 100 : (page + 1) * 100]))  # return top 100
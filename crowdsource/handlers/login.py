@@ -0,0 +1,24 @@
+from tornado_sqlalchemy_login.handlers import LoginHandler as _LoginHandler
+from tornado_sqlalchemy_login.utils import parse_body
+
+from .base import AuthenticatedHandler
+
+
+class LoginHandler(AuthenticatedHandler, _LoginHandler):
+    def get_user_from_key(self):
+        """get_user_from_key, from the API key cache if this key logged in recently"""
+        if not self._apikeys:
+            return super(LoginHandler, self).get_user_from_key()
+
+        body = parse_body(self.request)
+        key = self.get_argument("key", body.get("key", ""))
+        secret = self.get_argument("secret", body.get("secret", ""))
+        if not key or not secret:
+            return None
+
+        user = self._apikeys.get(key, secret)
+        if user is None:
+            user = super(LoginHandler, self).get_user_from_key()
+            if user is not None:
+                self._apikeys.put(key, secret, user)
+        return user
@@ -0,0 +1,22 @@
+from .. import metrics
+from .base import BaseHandler
+
+
+class MetricsHandler(BaseHandler):
+    def initialize(self, registry=None, allow=(), **kwargs):
+        """Prometheus scrape endpoint
+
+        Arguments:
+            registry {Registry} -- metrics to render, default metrics.REGISTRY
+            allow {list} -- remote addresses allowed to scrape, empty for any
+        """
+        self._registry = registry or metrics.REGISTRY
+        self._allow = allow
+        super(MetricsHandler, self).initialize(**kwargs)
+
+    def get(self):
+        """Render every metric in the Prometheus text format"""
+        if self._allow and self.request.remote_ip not in self._allow:
+            self._set_403("Metrics scraped from %s", self.request.remote_ip)
+        self.set_header("Content-Type", metrics.CONTENT_TYPE)
+        self.write(self._registry.render())
@@ -0,0 +1,59 @@
+import tornado.web
+import ujson
+
+from .base import AuthenticatedHandler
+
+
+class ProfilerHandler(AuthenticatedHandler):
+    def _check(self):
+        if not self.is_admin():
+            self._set_401("Not admin")
+        if not self._profiler:
+            self._set_400("No profiler")
+
+    @tornado.web.authenticated
+    def get(self):
+        """Profiler status, or with `report` the pstats listing of `handler` or every handler"""
+        self._check()
+        if self.get_argument("report", None) is None:
+            self.write(ujson.dumps(self._profiler.status()))
+            return
+        try:
+            report = self._profiler.report(
+                self.get_argument("handler", None),
+                sort=self.get_argument("sort", "cumulative"),
+                limit=int(self.get_argument("limit", 30)),
+            )
+        except (KeyError, ValueError):
+            self._set_400("Bad sort or limit")
+        self.set_header("Content-Type", "text/plain")
+        self.write(report)
+
+    @tornado.web.authenticated
+    def post(self):
+        """`action` enable (every `every` calls), disable, reset, or dump to disk"""
+        self._check()
+        action = self.get_argument("action", "")
+        ret = {}
+        if action == "enable":
+            every = self.get_argument("every", None)
+            try:
+                every = int(every) if every else None
+            except ValueError:
+                self._set_400("Bad every")
+            if every is not None and every < 1:
+                self._set_400("Bad every")
+            self._profiler.enable(every)
+        elif action == "disable":
+            self._profiler.disable()
+        elif action == "reset":
+            self._profiler.reset()
+        elif action == "dump":
+            try:
+                ret["paths"] = self._profiler.dump()
+            except ValueError:
+                self._set_400("No profile directory")
+        else:
+            self._set_400("Unknown action")
+        ret.update(self._profiler.status())
+        self.write(ujson.dumps(ret))
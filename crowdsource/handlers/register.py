@@ -0,0 +1,13 @@
+from tornado_sqlalchemy_login.handlers import RegisterHandler as _RegisterHandler
+
+from .base import AuthenticatedHandler
+
+
+class RegisterHandler(AuthenticatedHandler, _RegisterHandler):
+    def post(self):
+        """Register a user. user will be assigned a session id"""
+        ret = self.register()
+        if ret and self._users:
+            # a lookup before registering may have cached them as unknown
+            self._users.invalidate(ret["id"])
+        self.finish(ret)
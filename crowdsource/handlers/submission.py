@@ -1,71 +1,137 @@
 import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import six
 import tornado.gen
 import tornado.web
-import ujson
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from tornado.concurrent import run_on_executor
 
-from ..enums import CompetitionType
+from .. import metrics
+from ..enums import CompetitionType, ScoringStatus
+from ..exceptions import DatasetTooLarge, DatasetUnavailable, MalformedSubmission
 from ..persistence.models import Competition, Submission
+from ..profiler import profiled
 from ..types.submission import SubmissionSpec
-from ..types.utils import checkAnswer, fetchDataset
-from .base import AuthenticatedHandler
+from ..types.sandbox import withAnswer
+from ..types.utils import (
+    answerPrototype,
+    checkAnswer,
+    fetchDataset,
+    liveAnswer,
+    validateAnswer,
+)
+from .base import AuthenticatedHandler, dumps
 from .validate import validate_submission_get, validate_submission_post
 
+# a submission waiting for its competition to expire, and for its dataset to
+# grow past the `rows` counted by the first tick after that. `retry` ones
+# failed to score against the competition's own answer and are tried again
+# as they are
+Pending = namedtuple(
+    "Pending",
+    ("submission_id", "competition_id", "expiration", "rows", "retry"),
+    defaults=(False,),
+)
+
+# scoring outcomes that may go away on their own, the rest are final
+TRANSIENT = (ScoringStatus.UNAVAILABLE.value, ScoringStatus.TIMEOUT.value)
+
 
 class SubmissionHandler(AuthenticatedHandler):
+    # submissions fetch remote datasets, keep slow hosts from starving other handlers
+    executor = ThreadPoolExecutor(16)
+    # guards to_score_later, scored from executor threads and the aio path at once
+    pending_lock = threading.Lock()
+
     @tornado.web.authenticated
-    @tornado.gen.coroutine
-    def get(self):
-        yield self._get()
+    async def get(self):
+        # scoring pending submissions writes, read those scores from the primary
+        primary = bool(self._to_score_later)
+        aio = self._aio if primary else self.read_aio()
+        if aio:
+            await self._aget(aio, primary)
+        else:
+            await self._get(primary)
 
     @run_on_executor
-    def _get(self):
+    @profiled
+    def _get(self, primary):
         """Get the current list of competition ids"""
         data = self._validate(validate_submission_get)
 
-        res = []
-        with self.session() as session:
+        with self.session() if primary else self.read_session() as session:
             # first, grade any pending submissions that are now available
-            self.score_laters(session)
-            submissions = session.query(Submission).all()
+            if primary:
+                self.score_laters(session)
+            res = self._filter(data, session.query(Submission).all())
 
-            for c in submissions:
-                submission_id = data.get("submission_id", ())
-                cpid = data.get("competition_id", ())
-                clid = data.get("user_id", ())
-                user_username = data.get("user_username", ())
-                t = data.get("type", "")
+        self.write(dumps(res))
 
-                if submission_id and c.submission_id not in submission_id:
-                    continue
-                if cpid and c.competition_id not in cpid:
-                    continue
-                if clid and c.user_id not in clid:
-                    continue
-                if t and CompetitionType(t) != c.competition.spec.type:
-                    continue
-                if user_username and c.user.username != user_username:
-                    continue
+    @profiled
+    async def _aget(self, aio, primary):
+        """_get, queried from the IOLoop through the asyncio sessionmaker `aio`"""
+        data = self._validate(validate_submission_get)
 
-                # only allow if im the submitter or the competition owner
-                if (int(self.current_user) != c.user_id) and (
-                    int(self.current_user) != c.competition.user_id
-                ):
-                    continue
+        if primary:
+            # scoring fetches datasets, that stays on the executor
+            await self._score_laters()
 
-                # check if expired and turn off if necessary
-                if datetime.now() > c.competition.expiration:
-                    c.competition.active = False
+        async with aio() as session:
+            result = await session.execute(
+                select(Submission).options(
+                    selectinload(Submission.competition),
+                    selectinload(Submission.user),
+                )
+            )
+            res = self._filter(data, result.scalars().all())
 
-                d = c.to_dict(private=True)
+        self.write(dumps(res))
 
-                d["score"] = round(d["score"], 2)
-                res.append(d)
+    @run_on_executor
+    def _score_laters(self):
+        with self.session() as session:
+            self.score_laters(session)
 
-        self.write(ujson.dumps(res))
+    def _filter(self, data, submissions):
+        res = []
+        for c in submissions:
+            submission_id = data.get("submission_id", ())
+            cpid = data.get("competition_id", ())
+            clid = data.get("user_id", ())
+            user_username = data.get("user_username", ())
+            t = data.get("type", "")
+
+            if submission_id and c.submission_id not in submission_id:
+                continue
+            if cpid and c.competition_id not in cpid:
+                continue
+            if clid and c.user_id not in clid:
+                continue
+            if t and CompetitionType(t) != c.competition.spec.type:
+                continue
+            if user_username and c.user.username != user_username:
+                continue
+
+            # only allow if im the submitter or the competition owner
+            if (int(self.current_user) != c.user_id) and (
+                int(self.current_user) != c.competition.user_id
+            ):
+                continue
+
+            # check if expired and turn off if necessary
+            if datetime.now() > c.competition.expiration:
+                c.competition.active = False
+
+            d = c.to_dict(private=True)
+
+            d["score"] = round(d["score"], 2)
+            res.append(d)
+        return res
 
     @tornado.web.authenticated
     @tornado.gen.coroutine
@@ -74,6 +140,7 @@ class SubmissionHandler(AuthenticatedHandler):
         yield self._post()
 
     @run_on_executor
+    @profiled
     def _post(self):
         data = self._validate(validate_submission_post)
 
@@ -98,18 +165,37 @@ class SubmissionHandler(AuthenticatedHandler):
 
             try:
                 spec = SubmissionSpec.from_dict(submission)
+
+                # reject unscoreable answers before they cost a write
+                validateAnswer(
+                    competition.spec, spec.answer, self.prototype(competition)
+                )
+            except MalformedSubmission as e:
+                self._set_400(str(e))
+            except (KeyError, ValueError, AttributeError):
+                self._set_400("Submission malformed")
+
+            try:
                 submission = Submission.from_spec(
                     user_id=user_id,
                     competition_id=competition_id,
-                    competition=competition,
+                    # the writer inserts it from its own session
+                    competition=None if self._writer else competition,
                     spec=spec,
                 )
             except (KeyError, ValueError, AttributeError):
                 self._set_400("Submission malformed")
 
             # persist
-            session.commit()
-            session.refresh(submission)
+            if self._writer:
+                # committed along with concurrent requests' submissions
+                submission = session.merge(
+                    self._writer.add(submission).result(), load=False
+                )
+            else:
+                session.commit()
+                session.refresh(submission)
+            self.pin_primary()
 
             if not submission.submission_id:
                 self._set_400("Submission malformed")
@@ -122,80 +208,197 @@ class SubmissionHandler(AuthenticatedHandler):
             # calculate result if immediate
             if competition.answer_delay <= 0:
                 score = self.score(submission, session)
+                if score["status"] in TRANSIENT:
+                    # keep it from sitting at -1 for good, try again on later requests
+                    self.score_later(submission, datetime.now(), retry=True)
             else:
-                self.score_later(submission)
+                # rows are counted by the tick that fetches the dataset anyway
+                self.score_later(submission, competition.expiration)
                 score = {"submission_id": submission_id}
 
             self._writeout(
-                ujson.dumps(score),
+                dumps(score),
                 "Registering submission %s from %s",
                 submission_id,
                 submission.user_id,
             )
 
-    def score(self, submission, session):
+    def prototype(self, competition):
+        """Cached answer prototype for `competition`, None if unavailable"""
+        competition_id = competition.competition_id
+        if competition_id not in self._prototypes:
+            try:
+                self._prototypes[competition_id] = answerPrototype(competition.spec)
+            except DatasetUnavailable:
+                # try again next time rather than skipping validation for good
+                logging.info("Dataset unavailable for %s", competition_id)
+                return None
+            except Exception:
+                logging.info("No answer prototype for %s", competition_id)
+                self._prototypes[competition_id] = None
+        return self._prototypes[competition_id]
+
+    def score(self, submission, session, answer=None):
+        """Score `submission`, against `answer` instead of the competition's if given"""
         logging.info(
             "SCORING %s FOR %s",
             str(submission.submission_id),
             submission.competition_id,
         )
-        score = checkAnswer(submission)
-        submission.score = score
-        session.commit()
+        target = submission if answer is None else withAnswer(submission, answer)
+        with metrics.scoring("total"):
+            if self._sandbox:
+                status, score = self._sandbox.score(target)
+            else:
+                try:
+                    status, score = ScoringStatus.SCORED, checkAnswer(target)
+                except DatasetTooLarge:
+                    status = ScoringStatus.TOO_LARGE
+                except DatasetUnavailable:
+                    status = ScoringStatus.UNAVAILABLE
+
+        if status != ScoringStatus.SCORED:
+            # only this submission fails, leave it unscored
+            d = submission.to_dict()
+            d["status"] = status.value
+            return d
+
+        if self._writer:
+            submission_id = submission.submission_id
+            self._writer.submit(
+                lambda session: session.query(Submission)
+                .filter_by(submission_id=submission_id)
+                .update({"score": score}, synchronize_session=False)
+            ).result()
+            set_committed_value(submission, "score", score)
+        else:
+            submission.score = score
+            session.commit()
 
         # put in perspective
         d = submission.to_dict()
         self._all_submissions.update([d])
         self._leaderboards.update([d])
 
+        d["status"] = status.value
         return d
 
-    def score_later(self, submission):
+    def dataset(self, competition_id, spec):
+        """Current dataset of a live competition, pulling only new rows if it ingests incrementally"""
+        if self._live and spec.dataset_kwargs.get("incremental"):
+            return self._live.update(competition_id, spec)
+        return fetchDataset(spec)
+
+    def score_later(self, submission, expiration, retry=False):
+        """Score `submission` after `expiration`, once its dataset has grown since
+
+        Submissions are only taken until their competition's expiration, so
+        the rows counted by the first tick after it were all published by
+        the time they were submitted. Counting then rather than here keeps a
+        burst of submissions from fetching the dataset once each.
+
+        With `retry`, score it against the competition's own answer again
+        after `expiration`, for submissions that failed transiently.
+        """
         logging.info(
             "Stashing submission %s for competition %s to score later",
             submission.submission_id,
             submission.competition_id,
         )
-        self._to_score_later.append(submission)
+        with self.pending_lock:
+            self._to_score_later.append(
+                Pending(
+                    submission.submission_id,
+                    submission.competition_id,
+                    expiration,
+                    None,
+                    retry,
+                )
+            )
 
     def score_laters(self, session):
-        to_score_now = [
-            s for s in self._to_score_later if datetime.now() > s.competition.expiration
-        ]
-        logging.info("Scoring %s submissions now", len(to_score_now))
+        now = datetime.now()
+        with self.pending_lock:
+            # take the due ones out, so concurrent requests can't score them twice
+            due = [p for p in self._to_score_later if now > p.expiration]
+            self._to_score_later[:] = [
+                p for p in self._to_score_later if not now > p.expiration
+            ]
+
+        to_score_now = {}
+        for p in due:
+            to_score_now.setdefault(p.competition_id, []).append(p)
+        logging.info(
+            "Scoring %s submissions for %s competitions now",
+            len(due),
+            len(to_score_now),
+        )
 
         ret = []
-
-        for s in to_score_now:
-            competition = s.competition
-            df = fetchDataset(competition)
-
-            # FIXME
-            if isinstance(competition.targets, dict):
-                df = df[
-                    df[competition.dataset_key].isin(
-                        list(
-                            set(
-                                competition.current_state[
-                                    competition.dataset_key
-                                ].values
-                            )
-                        )
+        # whatever isn't settled goes back in the queue, even on errors
+        keep = {p.submission_id: p for p in due}
+
+        try:
+            for competition_id, pending in to_score_now.items():
+                # pending submissions outlive the session they were stashed from
+                submissions = {
+                    s.submission_id: s
+                    for s in session.query(Submission)
+                    .options(selectinload(Submission.competition))
+                    .filter(
+                        Submission.submission_id.in_([p.submission_id for p in pending])
                     )
-                ][competition.current_state.columns]
-            elif isinstance(competition.targets, list):
-                df = df[competition.spec.targets][competition.current_state.columns]
-            elif isinstance(competition.targets, six.string_types):
-                df = df[[competition.spec.targets]][competition.current_state.columns]
-
-            cur = len(competition.current_state.index)
-            if len(df.index) > cur:
-                competition.answer = df[df.index == df.index[-1]]
-                ret.append(self.score(s, session))
-                self._to_score_later.remove(s)
+                }
+                for p in pending:
+                    if p.submission_id not in submissions:
+                        del keep[p.submission_id]
+                    elif p.retry:
+                        d = self.score(submissions[p.submission_id], session)
+                        self._scored(p, d, ret, keep)
+                pending = [
+                    p for p in pending if p.submission_id in keep and not p.retry
+                ]
+                if not pending:
+                    continue
 
-            else:
-                logging.info("SKIPPING %d", s.id)
+                # one fetch and one answer per competition, shared by its submissions
+                try:
+                    spec = next(iter(submissions.values())).competition.spec
+                    dataset = self.dataset(competition_id, spec)
+                    answer = liveAnswer(spec, dataset)
+                except Exception:
+                    logging.exception(
+                        "No answer for %s, retrying later", competition_id
+                    )
+                    continue
+                rows = len(dataset.index)
+
+                for p in pending:
+                    if p.rows is None:
+                        # first tick since it was due, score on the next growth
+                        keep[p.submission_id] = p._replace(rows=rows)
+                        continue
+                    if answer is None or rows <= p.rows:
+                        # nothing published since it was submitted
+                        logging.info("SKIPPING %d", p.submission_id)
+                        continue
+                    d = self.score(submissions[p.submission_id], session, answer=answer)
+                    self._scored(p, d, ret, keep)
+        finally:
+            with self.pending_lock:
+                self._to_score_later.extend(keep.values())
 
         logging.info("%s left to score", len(self._to_score_later))
         return ret
+
+    def _scored(self, pending, d, ret, keep):
+        """Settle `pending` given its score() result `d`, requeued only if transient"""
+        if d["status"] == ScoringStatus.SCORED.value:
+            ret.append(d)
+        elif d["status"] in TRANSIENT:
+            return
+        else:
+            logging.info(
+                "Giving up on submission %s: %s", pending.submission_id, d["status"]
+            )
+        del keep[pending.submission_id]
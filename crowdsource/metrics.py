@@ -0,0 +1,238 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# seconds, from a cached lookup to a slow remote dataset
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, _escape(v)) for k, v in pairs) + "}"
+
+
+def _number(value):
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1 << 53:
+        return str(int(value))
+    return repr(value)
+
+
+class Counter(object):
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        """Monotonic count, one per combination of `labels` values"""
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def get(self, *values):
+        with self._lock:
+            return self._values.get(values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda x: tuple(map(str, x[0])))
+        for key, value in values:
+            yield self.name, _labels(self.labels, key), value
+
+
+class Histogram(object):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        """Distribution of observations over `buckets` upper bounds"""
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *values):
+        with self._lock:
+            entry = self._values.get(values)
+            if entry is None:
+                entry = self._values[values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *values):
+        with self._lock:
+            entry = self._values.get(values)
+            return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            values = sorted(
+                ((k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()),
+                key=lambda x: tuple(map(str, x[0])),
+            )
+        for key, (buckets, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                yield (
+                    self.name + "_bucket",
+                    _labels(self.labels, key, (("le", _number(bound)),)),
+                    cumulative,
+                )
+            yield (
+                self.name + "_bucket",
+                _labels(self.labels, key, (("le", "+Inf"),)),
+                count,
+            )
+            yield self.name + "_sum", _labels(self.labels, key), total
+            yield self.name + "_count", _labels(self.labels, key), count
+
+
+class Gauge(object):
+    def __init__(self, name, help, collect, labels=(), kind="gauge"):
+        """Values read when scraped, `collect()` returns {label values: value}
+
+        `kind` may be "counter" for running totals kept elsewhere, like
+        PoolStats.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self):
+        for key, value in sorted(
+            self._collect().items(), key=lambda x: tuple(map(str, x[0]))
+        ):
+            yield self.name, _labels(self.labels, key), value
+
+
+class Registry(object):
+    def __init__(self):
+        """Metrics rendered together in the Prometheus text format"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add `metric`, replacing any of the same name"""
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # one broken collector shouldn't take the whole scrape down
+                continue
+            lines.append("# HELP %s %s" % (metric.name, _escape(metric.help)))
+            lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+            for name, labels, value in samples:
+                lines.append("%s%s %s" % (name, labels, _number(value)))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# observations scoring() also hands to a recording() in progress
+_recording = contextvars.ContextVar("recording", default=None)
+
+REQUEST_SECONDS = REGISTRY.register(
+    Histogram(
+        "crowdsource_request_seconds",
+        "Request latency by handler",
+        ("handler", "method"),
+    )
+)
+
+REQUESTS = REGISTRY.register(
+    Counter(
+        "crowdsource_requests_total",
+        "Requests finished by handler and status",
+        ("handler", "method", "status"),
+    )
+)
+
+SCORING_SECONDS = REGISTRY.register(
+    Histogram(
+        "crowdsource_scoring_seconds",
+        "Time scoring submissions by stage. fetch and parse count every dataset load, "
+        "total also covers streamed scoring",
+        ("stage",),
+    )
+)
+
+
+def executorStats(executor):
+    """(threads, active, queued) of a ThreadPoolExecutor"""
+    threads = len(getattr(executor, "_threads", ()))
+    idle = getattr(executor, "_idle_semaphore", None)
+    queued = executor._work_queue.qsize() if hasattr(executor, "_work_queue") else 0
+    return threads, threads - (idle._value if idle is not None else 0), queued
+
+
+def observeRequest(handler):
+    """Record a finished request, from BaseHandler.on_finish"""
+    name = type(handler).__name__
+    method = handler.request.method
+    REQUEST_SECONDS.observe(handler.request.request_time(), name, method)
+    REQUESTS.inc(name, method, handler.get_status())
+
+
+@contextmanager
+def scoring(stage):
+    """Time a stage of scoring: fetch, parse, align, metric or total"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        SCORING_SECONDS.observe(seconds, stage)
+        observed = _recording.get()
+        if observed is not None:
+            observed.append((stage, seconds))
+
+
+@contextmanager
+def recording():
+    """Collect the (stage, seconds) of scoring() within, to report them from a subprocess"""
+    observed = []
+    token = _recording.set(observed)
+    try:
+        yield observed
+    finally:
+        _recording.reset(token)
+
+
+def observeScoring(observed):
+    """Record stage timings a scoring subprocess collected with recording()"""
+    for stage, seconds in observed:
+        SCORING_SECONDS.observe(seconds, stage)
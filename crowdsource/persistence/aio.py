@@ -0,0 +1,63 @@
+from sqlalchemy.engine import make_url
+
+from .engine import _applyPragmas, _engineArgs
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+except ImportError:
+    # sqlalchemy < 1.4, or greenlet missing
+    AsyncSession = create_async_engine = None
+
+# asyncio driver per backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def asyncUrl(url):
+    """Swap the driver of `url` for its asyncio counterpart, e.g. sqlite -> sqlite+aiosqlite"""
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError("No asyncio driver for %s" % backend)
+    return u.set(drivername="%s+%s" % (backend, ASYNC_DRIVERS[backend]))
+
+
+def createAsyncEngine(
+    url,
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=False,
+    pool_recycle=-1,
+    statement_timeout=0,
+    sqlite_pragmas=None,
+    stats=None,
+    **kwargs
+):
+    """createEngine for the asyncio driver of `url`, for handlers that query from the IOLoop
+
+    Takes the same arguments as createEngine; a sync url is converted with
+    asyncUrl. Raises ImportError if SQLAlchemy's asyncio extension or the
+    driver (aiosqlite, asyncpg) is not installed.
+    """
+    if create_async_engine is None:
+        raise ImportError("sqlalchemy.ext.asyncio is not available")
+    u = make_url(url)
+    if "+" not in u.drivername or u.get_driver_name() not in ASYNC_DRIVERS.values():
+        u = asyncUrl(u)
+
+    engine = create_async_engine(
+        u,
+        **_engineArgs(
+            u,
+            pool_size,
+            max_overflow,
+            pool_timeout,
+            pool_pre_ping,
+            pool_recycle,
+            statement_timeout,
+            stats,
+            kwargs,
+        )
+    )
+    _applyPragmas(engine.sync_engine, u, sqlite_pragmas)
+    return engine
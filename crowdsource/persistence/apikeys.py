@@ -0,0 +1,55 @@
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+
+class APIKeyCache(object):
+    def __init__(self, max_size=10000, ttl=300):
+        """Recently verified API key logins, so repeat bot logins skip the database
+
+        Holds the secret a key was verified with and the user it belongs to,
+        for `ttl` seconds, evicting the least recently used past `max_size`.
+        Revoking a key through APIKeyHandler drops it straight away.
+
+        Arguments:
+            max_size {int} -- most keys held
+            ttl {float} -- seconds a verified key is trusted without the database
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, secret):
+        """The user `key` and `secret` log in as, None if not cached or they don't match"""
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None or entry[2] <= time.monotonic():
+                self._keys.pop(key, None)
+                self.misses += 1
+                return None
+            if not hmac.compare_digest(entry[0].encode(), secret.encode()):
+                # fall through to the database, which has the final word
+                self.misses += 1
+                return None
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, secret, user):
+        with self._lock:
+            self._keys[key] = (secret, user, time.monotonic() + self._ttl)
+            self._keys.move_to_end(key)
+            while len(self._keys) > self._max_size:
+                self._keys.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Forget `key`, or every key"""
+        with self._lock:
+            if key is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(key, None)
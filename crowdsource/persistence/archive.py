@@ -0,0 +1,153 @@
+import logging
+import os
+import os.path
+from datetime import datetime
+
+import pandas as pd
+import ujson
+
+from .models import ArchivedCompetition, Competition, Submission
+
+# Submission.to_dict(private=True), as archive columns
+ARCHIVE_COLUMNS = (
+    "submission_id",
+    "user_id",
+    "competition_id",
+    "score",
+    "answer",
+    "answer_url",
+    "answer_type",
+    "timestamp",
+)
+
+
+def rankings(submissions):
+    """Final standings: each user's best scored submission, best first
+
+    Both metrics are losses, so lower scores rank higher. Submissions still
+    holding the -1 they were registered with were never scored and are left out.
+    """
+    best = {}
+    for s in submissions:
+        if s.score is None or s.score == -1:
+            continue
+        if s.user_id not in best or s.score < best[s.user_id].score:
+            best[s.user_id] = s
+    ranked = sorted(best.values(), key=lambda s: (s.score, s.timestamp))
+    return [
+        {
+            "rank": i + 1,
+            "user_id": s.user_id,
+            "submission_id": s.submission_id,
+            "score": s.score,
+        }
+        for i, s in enumerate(ranked)
+    ]
+
+
+class SubmissionArchive(object):
+    def __init__(self, root, compression="zstd"):
+        """Cold storage for the submissions of long finished competitions
+
+        Each competition's submissions move into one compressed Parquet file
+        and out of the submissions table, leaving an ArchivedCompetition row
+        with the final rankings behind.
+
+        Arguments:
+            root {str} -- directory to keep archive files in
+            compression {str} -- Parquet codec
+        """
+        try:
+            # pandas writes Parquet through pyarrow, fail here rather than in
+            # every periodic archive job
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Archiving submissions needs pyarrow, install crowdsource[parquet]"
+            )
+        self.root = root
+        self.compression = compression
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, competition_id):
+        return os.path.join(self.root, "%s.parquet" % competition_id)
+
+    def archive(self, session, older_than, now=None):
+        """Archive competitions that expired more than `older_than` ago, returns their ids"""
+        cutoff = (now or datetime.now()) - older_than
+        competitions = (
+            session.query(Competition)
+            .outerjoin(
+                ArchivedCompetition,
+                ArchivedCompetition.competition_id == Competition.competition_id,
+            )
+            .filter(Competition.expiration < cutoff)
+            .filter(ArchivedCompetition.competition_id.is_(None))
+            .all()
+        )
+
+        ret = []
+        for competition in competitions:
+            try:
+                self.archiveCompetition(session, competition)
+            except Exception:
+                session.rollback()
+                logging.exception(
+                    "Archiving competition %s failed, retrying later",
+                    competition.competition_id,
+                )
+                continue
+            ret.append(competition.competition_id)
+        return ret
+
+    def archiveCompetition(self, session, competition):
+        competition_id = competition.competition_id
+        submissions = (
+            session.query(Submission)
+            .filter_by(competition_id=competition_id)
+            .order_by(Submission.submission_id)
+            .all()
+        )
+        records = [s.to_dict(private=True) for s in submissions]
+        for r in records:
+            # mixed JSON answers don't make a column, store them encoded
+            r["answer"] = ujson.dumps(r["answer"])
+        df = pd.DataFrame.from_records(records, columns=ARCHIVE_COLUMNS)
+
+        # write the file before the rows go, a crash in between leaves both
+        path = self.path(competition_id)
+        df.to_parquet(path + ".tmp", compression=self.compression, index=False)
+        os.replace(path + ".tmp", path)
+
+        session.add(
+            ArchivedCompetition(
+                competition_id=competition_id,
+                path=path,
+                submissions=len(submissions),
+                rankings=rankings(submissions),
+                timestamp=datetime.now(),
+            )
+        )
+        session.query(Submission).filter_by(competition_id=competition_id).delete(
+            synchronize_session=False
+        )
+        session.commit()
+        logging.info(
+            "Archived %d submissions of competition %s to %s",
+            len(submissions),
+            competition_id,
+            path,
+        )
+
+    def load(self, competition_id):
+        """DataFrame of the archived submissions of `competition_id`"""
+        df = pd.read_parquet(self.path(competition_id))
+        df["answer"] = df["answer"].map(ujson.loads)
+        return df
+
+    def submissions(self, competition_id):
+        """Archived submissions as Submission.to_dict(private=True) would return them"""
+        records = self.load(competition_id).to_dict(orient="records")
+        for r in records:
+            r["timestamp"] = r["timestamp"].to_pydatetime()
+        return records
@@ -0,0 +1,171 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# concurrent readers alongside one writer, fsync at checkpoints rather than
+# every commit, wait on locks instead of failing, and keep more pages in memory
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 << 20,
+    "cache_size": -64000,
+}
+
+
+def _pragmas(pragmas):
+    def connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute("PRAGMA %s=%s" % (name, value))
+        finally:
+            cursor.close()
+
+    return connect
+
+
+class PoolStats(object):
+    """Running totals of the time spent waiting to check connections out of a pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.waiting = 0
+
+    def start(self):
+        with self._lock:
+            self.waiting += 1
+        return time.perf_counter()
+
+    def stop(self, start):
+        wait = time.perf_counter() - start
+        with self._lock:
+            self.waiting -= 1
+            self.checkouts += 1
+            self.total += wait
+            self.max = max(self.max, wait)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_total": self.total,
+                "wait_mean": self.total / self.checkouts if self.checkouts else 0.0,
+                "wait_max": self.max,
+                "waiting": self.waiting,
+            }
+
+
+def _timed(poolclass, stats):
+    """Subclass `poolclass` to record checkout waits in `stats`, kept across recreate()"""
+
+    def _do_get(self):
+        start = stats.start()
+        try:
+            return poolclass._do_get(self)
+        finally:
+            stats.stop(start)
+
+    return type("Timed" + poolclass.__name__, (poolclass,), {"_do_get": _do_get})
+
+
+def createEngine(
+    url,
+    pool_size=5,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=False,
+    pool_recycle=-1,
+    statement_timeout=0,
+    sqlite_pragmas=None,
+    stats=None,
+    **kwargs
+):
+    """create_engine with pooling and timeouts configured and checkout waits measured
+
+    Pool sizing only applies to dialects that use a QueuePool, e.g. postgres;
+    sqlite keeps its own pool, but its checkouts are still measured.
+
+    Arguments:
+        url {str} -- SQLAlchemy url
+        pool_size {int} -- connections kept open
+        max_overflow {int} -- connections opened on top of pool_size under load
+        pool_timeout {float} -- seconds to wait for a connection before failing
+        pool_pre_ping {bool} -- test connections on checkout, drops dead ones
+        pool_recycle {int} -- seconds before a connection is replaced, -1 to disable
+        statement_timeout {int} -- milliseconds a postgres statement may run, 0 to disable
+        sqlite_pragmas {dict} -- PRAGMAs run on each new sqlite connection, e.g. SQLITE_PRAGMAS
+        stats {PoolStats} -- record checkout waits here
+    """
+    u = make_url(url)
+    engine = create_engine(
+        url,
+        **_engineArgs(
+            u,
+            pool_size,
+            max_overflow,
+            pool_timeout,
+            pool_pre_ping,
+            pool_recycle,
+            statement_timeout,
+            stats,
+            kwargs,
+        )
+    )
+    _applyPragmas(engine, u, sqlite_pragmas)
+    return engine
+
+
+def _engineArgs(
+    u,
+    pool_size,
+    max_overflow,
+    pool_timeout,
+    pool_pre_ping,
+    pool_recycle,
+    statement_timeout,
+    stats,
+    kwargs,
+):
+    poolclass = kwargs.pop("poolclass", None) or u.get_dialect().get_pool_class(u)
+
+    if issubclass(poolclass, QueuePool):
+        kwargs.update(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+        )
+    kwargs.update(pool_pre_ping=pool_pre_ping, pool_recycle=pool_recycle)
+
+    if statement_timeout and u.get_backend_name() == "postgresql":
+        connect_args = kwargs.setdefault("connect_args", {})
+        if u.get_driver_name() == "asyncpg":
+            connect_args["server_settings"] = {
+                "statement_timeout": str(statement_timeout)
+            }
+        else:
+            connect_args["options"] = "-c statement_timeout=%d" % statement_timeout
+
+    kwargs["poolclass"] = _timed(poolclass, stats) if stats is not None else poolclass
+    return kwargs
+
+
+def inMemory(url):
+    """Whether `url` is an in-memory sqlite database, private to each engine"""
+    u = make_url(url)
+    return u.get_backend_name() == "sqlite" and u.database in (None, "", ":memory:")
+
+
+def _applyPragmas(engine, u, sqlite_pragmas):
+    if sqlite_pragmas and u.get_backend_name() == "sqlite":
+        pragmas = dict(sqlite_pragmas)
+        if inMemory(u):
+            # in-memory databases can't use a write-ahead log
+            pragmas.pop("journal_mode", None)
+        event.listen(engine, "connect", _pragmas(pragmas))
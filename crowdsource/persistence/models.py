@@ -3,11 +3,14 @@ from datetime import datetime, timedelta
 import pandas as pd
 import six
 import ujson
-import validators
 from sqlalchemy import JSON, Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.orm import relationship
 from tornado_sqlalchemy_login.sqla.models import APIKey, Base, User
 
+from ..enums import CompetitionMetric, CompetitionType, DatasetFormat
+from ..types.competition import CompetitionSpec
+from ..types.fetch import isSource
+
 APIKey = APIKey
 
 
@@ -85,6 +88,32 @@ class Competition(Base):
                 ret[item] = getattr(self, item)
         return ret
 
+    @property
+    def spec(self):
+        """Rebuild the CompetitionSpec this competition was registered from"""
+        try:
+            targets = ujson.loads(self.targets) if self.targets else None
+        except ValueError:
+            targets = self.targets
+
+        return CompetitionSpec(
+            title=self.title,
+            subtitle=self.subtitle,
+            type=CompetitionType(self.type),
+            expiration=self.expiration,
+            prize=self.prize,
+            metric=CompetitionMetric(self.metric),
+            dataset=self.dataset,
+            targets=targets,
+            dataset_type=DatasetFormat(self.dataset_type or "none"),
+            dataset_kwargs=self.dataset_kwargs,
+            dataset_key=self.dataset_key,
+            num_classes=self.num_classes,
+            when=self.when,
+            answer=self.answer,
+            answer_type=DatasetFormat(self.answer_type or "none"),
+        )
+
     @staticmethod
     def from_spec(user_id, spec):
         c = Competition(
@@ -97,8 +126,7 @@ class Competition(Base):
             metric=spec.metric.value,
             dataset=(
                 spec.dataset
-                if isinstance(spec.dataset, six.string_types)
-                and validators.url(spec.dataset)
+                if isSource(spec.dataset)
                 else (
                     spec.dataset.to_dict()
                     if isinstance(spec.dataset, pd.DataFrame)
@@ -117,8 +145,7 @@ class Competition(Base):
             when=spec.when,
             answer=(
                 spec.answer
-                if isinstance(spec.answer, six.string_types)
-                and validators.url(spec.answer)
+                if isSource(spec.answer)
                 else (
                     spec.answer.to_dict()
                     if isinstance(spec.answer, pd.DataFrame)
@@ -194,11 +221,9 @@ class Submission(Base):
             user_id=user_id,
             competition_id=competition_id,
             score=-1,
-            competition=competition,
             answer=(
                 spec.answer
-                if isinstance(spec.answer, six.string_types)
-                and validators.url(spec.answer)
+                if isSource(spec.answer)
                 else (
                     spec.answer.to_json()
                     if isinstance(spec.answer, pd.DataFrame)
@@ -208,4 +233,37 @@ class Submission(Base):
             answer_type=spec.answer_type.value,
             timestamp=datetime.now(),
         )
+        if competition is not None:
+            # joins the competition's session
+            c.competition = competition
         return c
+
+
+class ArchivedCompetition(Base):
+    """What remains in the database of a competition whose submissions were archived"""
+
+    __tablename__ = "archived_competitions"
+    competition_id = Column(
+        Integer,
+        ForeignKey("competitions.competition_id", ondelete="cascade"),
+        primary_key=True,
+    )
+    competition = relationship(Competition)
+
+    path = Column(String(500), nullable=False)
+    submissions = Column(Integer, nullable=False)
+    rankings = Column(JSON, nullable=True)
+
+    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        ret = {}
+        for item in (
+            "competition_id",
+            "path",
+            "submissions",
+            "rankings",
+            "timestamp",
+        ):
+            ret[item] = getattr(self, item)
+        return ret
@@ -0,0 +1,61 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ReadReplicas(object):
+    def __init__(self, sessionmakers, aio=None, pin_seconds=5):
+        """Route read-only queries across read replicas of the primary database
+
+        Sessions are handed out round robin. A user who just wrote is pinned
+        to the primary for `pin_seconds`, long enough for replication to catch
+        up, so they read their own writes.
+
+        Arguments:
+            sessionmakers {list} -- sessionmaker per replica
+            aio {list} -- asyncio sessionmaker per replica, if the driver is installed
+            pin_seconds {float} -- how long a writer reads from the primary
+        """
+        self._sessionmakers = itertools.cycle(sessionmakers)
+        self._aio = itertools.cycle(aio) if aio else None
+        self._pin_seconds = pin_seconds
+        self._pinned = {}
+        self._lock = threading.Lock()
+
+    def pin(self, user_id):
+        """Send `user_id`'s reads to the primary for the next pin_seconds"""
+        if user_id is None:
+            return
+        with self._lock:
+            self._pinned[int(user_id)] = time.monotonic() + self._pin_seconds
+
+    def pinned(self, user_id):
+        if user_id is None:
+            return False
+        with self._lock:
+            deadline = self._pinned.get(int(user_id))
+            if deadline is None:
+                return False
+            if deadline <= time.monotonic():
+                del self._pinned[int(user_id)]
+                return False
+            return True
+
+    @contextmanager
+    def session(self):
+        """Session on the next replica, rolled back and closed on exit"""
+        with self._lock:
+            sessionmaker = next(self._sessionmakers)
+        session = sessionmaker()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def aio(self):
+        """asyncio sessionmaker of the next replica, None without a driver"""
+        if self._aio is None:
+            return None
+        with self._lock:
+            return next(self._aio)
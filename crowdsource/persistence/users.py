@@ -0,0 +1,66 @@
+import threading
+import time
+
+from .models import User
+
+
+class UserCache(object):
+    def __init__(self, sessionmaker, ttl=300, negative_ttl=5):
+        """Users by id, held in memory for `ttl` seconds and loaded on a miss
+
+        Stands in for the dict of users loaded at startup, so `user_id in
+        cache` stays an in-memory check but users registered since are found.
+        Unknown ids are remembered for `negative_ttl` so stale cookies don't
+        cost a query each. Registration and admin changes call invalidate().
+
+        Arguments:
+            sessionmaker {sessionmaker} -- sessions to load users with, expire_on_commit=False
+            ttl {float} -- seconds a loaded user is trusted for
+            negative_ttl {float} -- seconds an unknown id is trusted to stay unknown
+        """
+        self._sessionmaker = sessionmaker
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._users = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def update(self, users):
+        """Cache `users`, e.g. all of them at startup"""
+        expires = time.monotonic() + self._ttl
+        with self._lock:
+            for user in users:
+                self._users[user.id] = (user, expires)
+
+    def invalidate(self, user_id=None):
+        """Forget `user_id`, or everyone, so the next lookup reads the database"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(int(user_id), None)
+
+    def get(self, user_id):
+        """The user with `user_id`, None if there is none"""
+        user_id = int(user_id)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        session = self._sessionmaker()
+        try:
+            user = session.query(User).filter_by(id=user_id).first()
+        finally:
+            session.close()
+
+        ttl = self._ttl if user is not None else self._negative_ttl
+        with self._lock:
+            self._users[user_id] = (user, time.monotonic() + ttl)
+        return user
+
+    def __contains__(self, user_id):
+        return self.get(user_id) is not None
@@ -0,0 +1,112 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter(object):
+    def __init__(self, sessionmaker, interval=0.005, max_batch=256):
+        """Funnel writes from concurrent requests into shared transactions
+
+        Units of work queue up for one writer thread, which runs everything
+        that arrives within `interval` seconds of the first, up to
+        `max_batch`, in a single transaction. Each caller's future resolves
+        once its batch commits, so a burst of submissions costs one commit
+        instead of one apiece. If a batch fails, its work is retried one at
+        a time, so only the offending caller sees the error.
+
+        Arguments:
+            sessionmaker {sessionmaker} -- sessions to write with, expire_on_commit=False
+            interval {float} -- seconds to gather a batch for
+            max_batch {int} -- most units of work per transaction
+        """
+        self._sessionmaker = sessionmaker
+        self._interval = interval
+        self._max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, work):
+        """Run `work(session)` in the next batch, returns a Future of its result"""
+        future = Future()
+        self._queue.put((work, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True
+                )
+                self._thread.start()
+        return future
+
+    def add(self, obj):
+        """Insert `obj`, returns a Future of it, detached and with its ids, once committed"""
+
+        def work(session):
+            session.add(obj)
+            return obj
+
+        return self.submit(work)
+
+    def close(self):
+        """Finish what is queued and stop the writer thread"""
+        self._queue.put(None)
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+
+    def _gather(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self._interval
+        while len(batch) < self._max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                # stop once this batch is written
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._gather()
+            if batch is None:
+                return
+            if not self._write(batch):
+                for item in batch:
+                    self._write([item], alone=True)
+
+    def _write(self, batch, alone=False):
+        session = self._sessionmaker()
+        try:
+            results = [work(session) for work, _ in batch]
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            if not alone:
+                logging.info("Group commit of %d failed, retrying alone", len(batch))
+                return False
+            batch[0][1].set_exception(e)
+            return True
+        finally:
+            session.close()
+
+        with self._lock:
+            self.batches += 1
+            self.writes += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+        return True
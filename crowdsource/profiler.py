@@ -0,0 +1,192 @@
+import cProfile
+import functools
+import inspect
+import io
+import os
+import os.path
+import pstats
+import threading
+import time
+
+
+class RequestProfiler(object):
+    def __init__(self, every=100, max_overhead=0.05, max_samples=1000, directory=""):
+        """Profile 1 in `every` handler calls under cProfile, aggregated by handler
+
+        Off until enable() is called, e.g. by an admin through
+        ProfilerHandler. Sampling pauses while profiled calls have taken more
+        than `max_overhead` of the wall time since enabling, and turns itself
+        off after `max_samples` calls. Only one call per thread is profiled
+        at a time, so overlapping coroutines on the IOLoop don't clobber
+        each other's profiles, though a sampled coroutine's profile includes
+        whatever ran on the IOLoop while it awaited.
+
+        Arguments:
+            every {int} -- profile one call in this many
+            max_overhead {float} -- most of the wall time spent in profiled calls
+            max_samples {int} -- calls profiled before turning off, 0 for no limit
+            directory {str} -- where dump() writes .prof files
+        """
+        self.every = every
+        self.max_overhead = max_overhead
+        self.max_samples = max_samples
+        self.directory = directory
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._threads = set()
+        self._calls = 0
+        self._samples = 0
+        self._enabled_at = 0.0
+        self._profiled_seconds = 0.0
+        self._skipped = 0
+        self._stats = {}
+
+    def enable(self, every=None):
+        with self._lock:
+            if every:
+                self.every = every
+            self.enabled = True
+            self._calls = 0
+            self._samples = 0
+            self._enabled_at = time.perf_counter()
+            self._profiled_seconds = 0.0
+
+    def disable(self):
+        with self._lock:
+            self.enabled = False
+
+    def reset(self):
+        """Drop everything profiled so far"""
+        with self._lock:
+            self._stats = {}
+            self._skipped = 0
+
+    def _start(self):
+        """A running Profile if this call is sampled, else None"""
+        if not self.enabled:
+            return None
+        thread = threading.get_ident()
+        with self._lock:
+            self._calls += 1
+            if self._calls % self.every or thread in self._threads:
+                return None
+            elapsed = time.perf_counter() - self._enabled_at
+            if self._profiled_seconds > self.max_overhead * elapsed:
+                self._skipped += 1
+                return None
+            self._threads.add(thread)
+            self._samples += 1
+            if self.max_samples and self._samples >= self.max_samples:
+                self.enabled = False
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def _stop(self, profile, name, start):
+        profile.disable()
+        seconds = time.perf_counter() - start
+        profile.create_stats()
+        with self._lock:
+            self._threads.discard(threading.get_ident())
+            self._profiled_seconds += seconds
+            entry = self._stats.get(name)
+            if entry is None:
+                self._stats[name] = [pstats.Stats(profile), 1, seconds]
+            else:
+                entry[0].add(profile)
+                entry[1] += 1
+                entry[2] += seconds
+
+    def call(self, name, fn, *args, **kwargs):
+        """Call `fn`, under the profiler if sampled"""
+        profile = self._start()
+        if profile is None:
+            return fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._stop(profile, name, start)
+
+    async def acall(self, name, fn, *args, **kwargs):
+        """call() for coroutine functions"""
+        profile = self._start()
+        if profile is None:
+            return await fn(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self._stop(profile, name, start)
+
+    def status(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "every": self.every,
+                "max_overhead": self.max_overhead,
+                "max_samples": self.max_samples,
+                "samples": self._samples,
+                "skipped": self._skipped,
+                "handlers": {
+                    name: {"samples": count, "seconds": seconds}
+                    for name, (_, count, seconds) in self._stats.items()
+                },
+            }
+
+    def report(self, name=None, sort="cumulative", limit=30):
+        """pstats listing of `name`, or of every handler, as text"""
+        out = io.StringIO()
+        with self._lock:
+            names = sorted(self._stats) if name is None else [name]
+            for n in names:
+                entry = self._stats.get(n)
+                if entry is None:
+                    continue
+                out.write("%s: %d samples, %.3fs\n" % (n, entry[1], entry[2]))
+                stats = pstats.Stats(stream=out)
+                stats.add(entry[0])
+                stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def dump(self, directory=None):
+        """Write each handler's profile to `directory` as .prof files, returns their paths"""
+        directory = directory or self.directory
+        if not directory:
+            raise ValueError("no directory to dump profiles to")
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        with self._lock:
+            for name, (stats, _, _) in self._stats.items():
+                path = os.path.join(directory, "%s-%s.prof" % (name, stamp))
+                stats.dump_stats(path)
+                paths.append(path)
+        return paths
+
+
+def profiled(fn):
+    """Sample calls to the handler method `fn` with the handler's profiler
+
+    Goes under run_on_executor, so the profile covers the executor thread
+    doing the work rather than the IOLoop waiting on it.
+    """
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            if not self._profiler:
+                return await fn(self, *args, **kwargs)
+            name = "%s.%s" % (type(self).__name__, fn.__name__)
+            return await self._profiler.acall(name, fn, self, *args, **kwargs)
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            if not self._profiler:
+                return fn(self, *args, **kwargs)
+            name = "%s.%s" % (type(self).__name__, fn.__name__)
+            return self._profiler.call(name, fn, self, *args, **kwargs)
+
+    return wrapper
@@ -4,29 +4,51 @@ import logging
 import tornado.ioloop
 import tornado.web
 
-# from datetime import datetime
-from perspective import Table, PerspectiveManager, PerspectiveTornadoHandler
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta
+from sqlalchemy import or_
 from sqlalchemy.orm import sessionmaker
 from tornado_sqlalchemy_login import (
     SQLAlchemyLoginManagerOptions,
     SQLAlchemyLoginManager,
-    LoginHandler,
     LogoutHandler,
-    RegisterHandler,
-    APIKeyHandler,
 )
 from traitlets.config.application import Application
-from traitlets import Int, Unicode, List, Bool
+from traitlets import Int, Float, Unicode, List, Bool, Dict, Union
+from . import metrics
+from .handlers.base import BaseHandler
 from .handlers import (
     HTMLHandler,
     AdminHandler,
+    APIKeyHandler,
+    LoginHandler,
+    MetricsHandler,
+    ProfilerHandler,
     UserHandler,
     CompetitionHandler,
     SubmissionHandler,
     LeaderboardHandler,
+    RegisterHandler,
 )
+from .persistence.aio import AsyncSession, createAsyncEngine
+from .persistence.apikeys import APIKeyCache
+from .persistence.archive import SubmissionArchive
+from .persistence.engine import SQLITE_PRAGMAS, PoolStats, createEngine, inMemory
 from .persistence.models import Base, User, Competition, Submission, APIKey
+from .persistence.replicas import ReadReplicas
+from .persistence.users import UserCache
+from .persistence.writer import GroupCommitWriter
+from .profiler import RequestProfiler
+from .types.cache import DatasetCache, setDatasetCache
+from .types import fetch
+from .types.fetch import configure
+from .types.live import LiveSnapshots
+from .types.sandbox import ScoringSandbox
+from .types.snapshot import (
+    DatasetSnapshots,
+    due,
+    groundTruthSource,
+    setDatasetSnapshots,
+)
 
 
 class Crowdsource(Application):
@@ -46,6 +68,184 @@ class Crowdsource(Application):
     sql_url = Unicode(
         default_value="sqlite:///crowdsource.db", help="SQL Alchemy url"
     ).tag(config=True)
+    sqlite_pragmas = Dict(
+        default_value=SQLITE_PRAGMAS,
+        help="PRAGMAs run on each new sqlite connection, empty to leave sqlite's defaults",
+    ).tag(config=True)
+    sql_pool_size = Int(
+        default_value=5, help="Database connections kept open (QueuePool dialects)"
+    ).tag(config=True)
+    sql_max_overflow = Int(
+        default_value=10,
+        help="Database connections opened on top of sql_pool_size under load",
+    ).tag(config=True)
+    sql_pool_timeout = Float(
+        default_value=30, help="Seconds to wait for a database connection"
+    ).tag(config=True)
+    sql_pool_pre_ping = Bool(
+        default_value=False, help="Test database connections before using them"
+    ).tag(config=True)
+    sql_pool_recycle = Int(
+        default_value=-1,
+        help="Seconds before a database connection is replaced, -1 to disable",
+    ).tag(config=True)
+    sql_statement_timeout = Int(
+        default_value=0,
+        help="Milliseconds a postgres statement may run, 0 to disable",
+    ).tag(config=True)
+    user_cache_ttl = Int(
+        default_value=300,
+        help="Seconds a user is served from memory before rereading it",
+    ).tag(config=True)
+    apikey_cache_size = Int(
+        default_value=10000, help="Most verified API keys remembered, 0 to disable"
+    ).tag(config=True)
+    apikey_cache_ttl = Int(
+        default_value=300,
+        help="Seconds an API key login is trusted before checking the database again",
+    ).tag(config=True)
+    group_commit = Bool(
+        default_value=True,
+        help="Commit submissions from concurrent requests together in one transaction",
+    ).tag(config=True)
+    group_commit_interval = Float(
+        default_value=0.005, help="Seconds to gather a group commit for"
+    ).tag(config=True)
+    group_commit_max_batch = Int(
+        default_value=256, help="Most writes committed together"
+    ).tag(config=True)
+    read_sql_url = Union(
+        [Unicode(), List(Unicode())],
+        default_value="",
+        help="SQL Alchemy url, or list of urls, of read replicas for read-only endpoints, empty to read from sql_url",
+    ).tag(config=True)
+    read_pin_seconds = Float(
+        default_value=5,
+        help="Seconds a user reads from the primary after a write, so they see it before it replicates",
+    ).tag(config=True)
+    sql_async = Bool(
+        default_value=True,
+        help="Serve reads from the IOLoop through an asyncio driver (aiosqlite, asyncpg) when installed",
+    ).tag(config=True)
+
+    scoring_sandbox = Bool(
+        default_value=True, help="Score submissions in a resource limited subprocess"
+    ).tag(config=True)
+    scoring_timeout = Int(
+        default_value=60, help="Wall clock seconds allowed per scoring job"
+    ).tag(config=True)
+    scoring_memory = Int(
+        default_value=2 << 30,
+        help="Memory limit in bytes per scoring job (RLIMIT_AS), 0 to disable",
+    ).tag(config=True)
+    scoring_max_download = Int(
+        default_value=256 << 20,
+        help="Maximum bytes downloaded per remote dataset when scoring, 0 to disable",
+    ).tag(config=True)
+
+    scoring_chunksize = Int(
+        default_value=0,
+        help="Score remote answers streaming this many rows at a time, 0 to load them whole",
+    ).tag(config=True)
+
+    answer_store = Unicode(
+        default_value="",
+        help="Directory to keep resolved answers in as memory-mapped arrays, empty to disable",
+    ).tag(config=True)
+
+    dataset_cache = Unicode(
+        default_value="",
+        help="Directory to cache remote datasets in, empty to disable",
+    ).tag(config=True)
+    dataset_cache_size = Int(
+        default_value=1 << 30, help="Maximum bytes of remote datasets to cache"
+    ).tag(config=True)
+    dataset_snapshots = Unicode(
+        default_value="",
+        help="Directory to freeze competitions' remote ground truth in at when/expiration, empty to disable",
+    ).tag(config=True)
+    snapshot_interval = Int(
+        default_value=60,
+        help="Seconds between checks for competitions whose ground truth is due to be frozen",
+    ).tag(config=True)
+    snapshot_retries = Int(
+        default_value=8,
+        help="Failed captures, retried with doubling backoff, before a competition's ground truth is left unfrozen",
+    ).tag(config=True)
+    local_datasets = List(
+        default_value=[],
+        help="Directories competitions may read file:// or plain path datasets from",
+    ).tag(config=True)
+    live_snapshots = Unicode(
+        default_value="",
+        help="Directory to keep incremental snapshots of live datasets in, empty to disable",
+    ).tag(config=True)
+    submission_archive = Unicode(
+        default_value="",
+        help="Directory to archive finished competitions' submissions to as Parquet (needs pyarrow), empty to disable",
+    ).tag(config=True)
+    archive_after = Int(
+        default_value=90,
+        help="Days after expiration before a competition's submissions are archived",
+    ).tag(config=True)
+    archive_interval = Int(
+        default_value=60 * 60,
+        help="Seconds between checks for competitions to archive",
+    ).tag(config=True)
+    fetch_connections_per_host = Int(
+        default_value=4,
+        help="Maximum concurrent connections to any one dataset host",
+    ).tag(config=True)
+    fetch_workers = Int(
+        default_value=8, help="Threads used to fetch remote datasets concurrently"
+    ).tag(config=True)
+    fetch_connect_timeout = Float(
+        default_value=5, help="Seconds allowed to connect to a dataset host"
+    ).tag(config=True)
+    fetch_read_timeout = Float(
+        default_value=30,
+        help="Seconds a dataset host may go without sending data",
+    ).tag(config=True)
+    fetch_max_download = Int(
+        default_value=256 << 20,
+        help="Maximum bytes downloaded per remote dataset, 0 to disable",
+    ).tag(config=True)
+    fetch_breaker_threshold = Int(
+        default_value=5,
+        help="Consecutive failures before a dataset host is skipped",
+    ).tag(config=True)
+    fetch_breaker_cooldown = Float(
+        default_value=30,
+        help="Seconds to skip a failing dataset host before trying it again",
+    ).tag(config=True)
+
+    metrics = Bool(default_value=True, help="Serve Prometheus metrics at /metrics").tag(
+        config=True
+    )
+    metrics_allow = List(
+        default_value=["127.0.0.1", "::1"],
+        help="Addresses allowed to scrape /metrics, empty to allow any",
+    ).tag(config=True)
+
+    profile = Bool(
+        default_value=False,
+        help="Start sampling requests with the profiler, an admin can toggle it at /api/v1/admin/profiler",
+    ).tag(config=True)
+    profile_every = Int(
+        default_value=100, help="Profile one handler call in this many"
+    ).tag(config=True)
+    profile_max_overhead = Float(
+        default_value=0.05,
+        help="Most of the wall time profiled calls may take before sampling pauses",
+    ).tag(config=True)
+    profile_max_samples = Int(
+        default_value=1000,
+        help="Calls profiled before the profiler turns itself off, 0 for no limit",
+    ).tag(config=True)
+    profile_directory = Unicode(
+        default_value="",
+        help="Directory the profiler dumps .prof files to, empty to only serve reports",
+    ).tag(config=True)
 
     proxies = List(default_value=[])
     handlers = List(default_value=[])
@@ -64,6 +264,9 @@ class Crowdsource(Application):
     flags = {"debug": ({"Crowdsource": {"debug": True}}, "run in debug mode")}
 
     def start(self):
+        # perspective is only needed once the server is actually running
+        from perspective import Table, PerspectiveManager, PerspectiveTornadoHandler
+
         if self.debug:
             logging.getLogger().setLevel(logging.DEBUG)
 
@@ -74,15 +277,39 @@ class Crowdsource(Application):
         self.wspath = self.wspath.format(self.port)
 
         # Sqlalchemy
-        engine = create_engine(self.sql_url, echo=False)
+        self._pool_stats = PoolStats()
+        engine = createEngine(self.sql_url, echo=False, **self._engine_options())
         Base.metadata.create_all(engine)
 
+        # reads served from the IOLoop, without a thread per request
+        aio = self._async_sessionmaker(self.sql_url)
+
+        # read-only endpoints query replicas, writers stay on the primary
+        read_urls = self.read_sql_url
+        if isinstance(read_urls, str):
+            read_urls = [read_urls] if read_urls else []
+        replicas = None
+        if read_urls:
+            replica_aio = [self._async_sessionmaker(url) for url in read_urls]
+            replicas = ReadReplicas(
+                [
+                    sessionmaker(
+                        bind=createEngine(url, **self._engine_options()),
+                        expire_on_commit=False,
+                    )
+                    for url in read_urls
+                ],
+                aio=replica_aio if all(replica_aio) else None,
+                pin_seconds=self.read_pin_seconds,
+            )
+
         # fetch users
         self.sessionmaker = sessionmaker(bind=engine, expire_on_commit=False)
         session = self.sessionmaker()
         users = session.query(User).all()
 
-        self._users = {c.id: c for c in users}
+        self._users = UserCache(self.sessionmaker, ttl=self.user_cache_ttl)
+        self._users.update(users)
 
         # Perspective managers
         self._manager = PerspectiveManager()
@@ -119,6 +346,64 @@ class Crowdsource(Application):
         # for offline storage
         self._stash = []
 
+        # remote dataset fetching
+        configure(
+            connections_per_host=self.fetch_connections_per_host,
+            workers=self.fetch_workers,
+            connect_timeout=self.fetch_connect_timeout,
+            read_timeout=self.fetch_read_timeout,
+            max_size=self.fetch_max_download,
+            breaker_threshold=self.fetch_breaker_threshold,
+            breaker_cooldown=self.fetch_breaker_cooldown,
+            local_roots=list(self.local_datasets),
+        )
+        cache = None
+        if self.dataset_cache:
+            cache = (self.dataset_cache, self.dataset_cache_size)
+            setDatasetCache(DatasetCache(*cache))
+
+        # frozen ground truth
+        snapshots = None
+        if self.dataset_snapshots:
+            snapshots = DatasetSnapshots(
+                self.dataset_snapshots,
+                retries=self.snapshot_retries,
+                backoff=self.snapshot_interval,
+            )
+            setDatasetSnapshots(snapshots)
+
+        # isolated scoring
+        self._sandbox = (
+            ScoringSandbox(
+                timeout=self.scoring_timeout,
+                memory=self.scoring_memory,
+                max_download=self.scoring_max_download,
+                chunksize=self.scoring_chunksize,
+                store=self.answer_store,
+                cache=cache,
+                snapshots=self.dataset_snapshots,
+            )
+            if self.scoring_sandbox
+            else None
+        )
+
+        # cold storage for long finished competitions
+        archive = (
+            SubmissionArchive(self.submission_archive)
+            if self.submission_archive
+            else None
+        )
+
+        # sampled cProfile of handlers, toggled by admins at runtime
+        profiler = RequestProfiler(
+            every=self.profile_every,
+            max_overhead=self.profile_max_overhead,
+            max_samples=self.profile_max_samples,
+            directory=self.profile_directory,
+        )
+        if self.profile:
+            profiler.enable()
+
         root = os.path.join(os.path.dirname(__file__), "assets")
         static = os.path.join(root, "static")
 
@@ -131,6 +416,28 @@ class Crowdsource(Application):
             "all_submissions": self._all_submissions,
             "leaderboards": self._leaderboards,
             "stash": self._stash,
+            "sandbox": self._sandbox,
+            "prototypes": {},
+            "to_score_later": [],
+            "live": LiveSnapshots(self.live_snapshots) if self.live_snapshots else None,
+            "aio": aio,
+            "replicas": replicas,
+            "archive": archive,
+            "apikeys": (
+                APIKeyCache(self.apikey_cache_size, self.apikey_cache_ttl)
+                if self.apikey_cache_size
+                else None
+            ),
+            "writer": (
+                GroupCommitWriter(
+                    self.sessionmaker,
+                    interval=self.group_commit_interval,
+                    max_batch=self.group_commit_max_batch,
+                )
+                if self.group_commit
+                else None
+            ),
+            "profiler": profiler,
             "basepath": self.basepath,
             "wspath": self.wspath,
             "proxies": "test",
@@ -168,6 +475,7 @@ class Crowdsource(Application):
             (r"/api/v1/logout", LogoutHandler, context),
             (r"/api/v1/register", RegisterHandler, context),
             (r"/api/v1/admin", AdminHandler, context),
+            (r"/api/v1/admin/profiler", ProfilerHandler, context),
             (r"/api/v1/apikeys", APIKeyHandler, context),
             (r"/api/v1/users", UserHandler, context),
             (r"/api/v1/competition", CompetitionHandler, context),
@@ -179,6 +487,13 @@ class Crowdsource(Application):
             (r"/api/v1/submission", SubmissionHandler, context),
             (r"/api/v1/leaderboard", LeaderboardHandler, context),
             (r"/static/(.*)", tornado.web.StaticFileHandler, {"path": static}),
+        ]
+        if self.metrics:
+            self.register_metrics(context)
+            default_handlers.append(
+                (r"/metrics", MetricsHandler, {"allow": list(self.metrics_allow)})
+            )
+        default_handlers += [
             (
                 r"/(.*)",
                 HTMLHandler,
@@ -223,10 +538,216 @@ class Crowdsource(Application):
             **settings
         )
 
+        if snapshots is not None:
+            tornado.ioloop.PeriodicCallback(
+                lambda: tornado.ioloop.IOLoop.current().run_in_executor(
+                    None, self.capture_snapshots, snapshots
+                ),
+                self.snapshot_interval * 1000,
+            ).start()
+
+        if archive is not None:
+            tornado.ioloop.PeriodicCallback(
+                lambda: tornado.ioloop.IOLoop.current().run_in_executor(
+                    None, self.archive_submissions, archive
+                ),
+                self.archive_interval * 1000,
+            ).start()
+
+        tornado.ioloop.PeriodicCallback(self.log_pool_stats, 60 * 1000).start()
+
         logging.critical("LISTENING: %d", self.port)
         application.listen(self.port)
         tornado.ioloop.IOLoop.current().start()
 
+    def _engine_options(self):
+        return dict(
+            pool_size=self.sql_pool_size,
+            max_overflow=self.sql_max_overflow,
+            pool_timeout=self.sql_pool_timeout,
+            pool_pre_ping=self.sql_pool_pre_ping,
+            pool_recycle=self.sql_pool_recycle,
+            statement_timeout=self.sql_statement_timeout,
+            sqlite_pragmas=self.sqlite_pragmas,
+            stats=self._pool_stats,
+        )
+
+    def _async_sessionmaker(self, url):
+        """AsyncSession sessionmaker for `url`, None if disabled or no driver is installed"""
+        if not self.sql_async or inMemory(url):
+            # an in-memory database would be a different, empty one
+            return None
+        try:
+            return sessionmaker(
+                bind=createAsyncEngine(url, **self._engine_options()),
+                class_=AsyncSession,
+                expire_on_commit=False,
+            )
+        except (ImportError, ValueError):
+            logging.warning(
+                "No asyncio driver for %s, reads run on executor threads", url
+            )
+            return None
+
+    def register_metrics(self, context):
+        """Add the gauges read from this server's state at scrape time"""
+        executors = {
+            "handlers": BaseHandler.executor,
+            "submissions": SubmissionHandler.executor,
+            "fetch": fetch.executor(),
+        }
+        for i, (name, help) in enumerate(
+            (
+                ("crowdsource_executor_threads", "Threads started by executor"),
+                ("crowdsource_executor_active", "Tasks running by executor"),
+                (
+                    "crowdsource_executor_queued",
+                    "Tasks waiting for a thread by executor",
+                ),
+            )
+        ):
+            metrics.REGISTRY.register(
+                metrics.Gauge(
+                    name,
+                    help,
+                    lambda i=i: {
+                        (k,): metrics.executorStats(e)[i] for k, e in executors.items()
+                    },
+                    ("executor",),
+                )
+            )
+
+        to_score_later = context["to_score_later"]
+        metrics.REGISTRY.register(
+            metrics.Gauge(
+                "crowdsource_pending_scores",
+                "Submissions waiting to be scored",
+                lambda: {(): len(to_score_later)},
+            )
+        )
+
+        tables = {
+            "competitions": self._competitions,
+            "leaderboards": self._leaderboards,
+            "all_users": self._all_users,
+            "all_competitions": self._all_competitions,
+            "all_submissions": self._all_submissions,
+        }
+        metrics.REGISTRY.register(
+            metrics.Gauge(
+                "crowdsource_perspective_rows",
+                "Rows in each perspective table",
+                lambda: {(k,): t.size() for k, t in tables.items()},
+                ("table",),
+            )
+        )
+
+        stats = self._pool_stats
+        for name, help, field, kind in (
+            (
+                "crowdsource_db_pool_checkouts_total",
+                "Database connections checked out",
+                "checkouts",
+                "counter",
+            ),
+            (
+                "crowdsource_db_pool_wait_seconds_total",
+                "Seconds spent waiting to check out database connections",
+                "wait_total",
+                "counter",
+            ),
+            (
+                "crowdsource_db_pool_wait_max_seconds",
+                "Longest wait to check out a database connection",
+                "wait_max",
+                "gauge",
+            ),
+            (
+                "crowdsource_db_pool_waiting",
+                "Requests waiting for a database connection",
+                "waiting",
+                "gauge",
+            ),
+        ):
+            metrics.REGISTRY.register(
+                metrics.Gauge(
+                    name,
+                    help,
+                    lambda field=field: {(): stats.snapshot()[field]},
+                    kind=kind,
+                )
+            )
+
+    def log_pool_stats(self):
+        stats = self._pool_stats.snapshot()
+        if stats["checkouts"]:
+            logging.info(
+                "DB pool: %d checkouts, mean wait %.4fs, max wait %.4fs, %d waiting",
+                stats["checkouts"],
+                stats["wait_mean"],
+                stats["wait_max"],
+                stats["waiting"],
+            )
+
+    def archive_submissions(self, archive):
+        """Move submissions of competitions expired over archive_after days ago to the archive"""
+        session = self.sessionmaker()
+        try:
+            archived = archive.archive(session, timedelta(days=self.archive_after))
+            if archived:
+                logging.info("Archived competitions %s", archived)
+        finally:
+            session.close()
+
+    def capture_snapshots(self, snapshots):
+        """Freeze the ground truth of competitions that reached when/expiration"""
+        session = self.sessionmaker()
+        try:
+            now = datetime.now()
+            # ids first, only load the rows, inline datasets and all, of those left
+            ids = [
+                competition_id
+                for (competition_id,) in session.query(
+                    Competition.competition_id
+                ).filter(or_(Competition.when <= now, Competition.expiration <= now))
+                if snapshots.wanted(competition_id, now)
+            ]
+            if not ids:
+                return
+            for competition in session.query(Competition).filter(
+                Competition.competition_id.in_(ids)
+            ):
+                if not due(competition, now):
+                    continue
+                if groundTruthSource(competition) is None:
+                    # inline ground truth, nothing to freeze
+                    snapshots.skip(competition.competition_id)
+                    continue
+                try:
+                    version = snapshots.capture(competition)
+                except Exception:
+                    if snapshots.failed(competition.competition_id, now):
+                        logging.warning(
+                            "Snapshot of %s failed, retrying later",
+                            competition.competition_id,
+                            exc_info=True,
+                        )
+                    else:
+                        logging.exception(
+                            "Snapshot of %s failed %d times, giving up",
+                            competition.competition_id,
+                            snapshots.retries,
+                        )
+                    continue
+                if version:
+                    logging.info(
+                        "Froze competition %s at %s",
+                        competition.competition_id,
+                        version["sha256"],
+                    )
+        finally:
+            session.close()
+
 
 if __name__ == "__main__":
     Crowdsource.launch_instance(sys.argv)
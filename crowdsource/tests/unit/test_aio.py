@@ -0,0 +1,130 @@
+import asyncio
+import json
+import os.path
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+import tornado.httpserver
+import tornado.web
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.handlers import CompetitionHandler, LeaderboardHandler
+from crowdsource.persistence.aio import AsyncSession, asyncUrl, createAsyncEngine
+from crowdsource.persistence.engine import SQLITE_PRAGMAS, PoolStats, createEngine
+from crowdsource.persistence.models import Base, Client, Competition, Submission
+from crowdsource.types.competition import CompetitionSpec
+
+pytest.importorskip("aiosqlite")
+
+
+class TestAio:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.url = "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        self.engine = createEngine(self.url)
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        session = self.sessionmaker()
+        session.add(Client(username="test", password="test", email="test@test.com"))
+        session.commit()
+        competition = Competition.from_spec(
+            1,
+            CompetitionSpec(
+                title="test",
+                type=CompetitionType.CLASSIFY,
+                expiration=datetime.now() + timedelta(days=1),
+                prize=1.0,
+                metric=CompetitionMetric.ABSDIFF,
+                dataset="",
+            ),
+        )
+        session.add(competition)
+        session.commit()
+        for score in (1.0, 2.0):
+            session.add(
+                Submission(
+                    user_id=1,
+                    competition_id=competition.competition_id,
+                    score=score,
+                    answer="",
+                    answer_type="none",
+                    timestamp=datetime.now(),
+                )
+            )
+        session.commit()
+        session.close()
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def test_asyncUrl(self):
+        assert str(asyncUrl("sqlite:///test.db")) == "sqlite+aiosqlite:///test.db"
+        assert (
+            str(asyncUrl("postgresql+psycopg2://a@b/c")) == "postgresql+asyncpg://a@b/c"
+        )
+        with pytest.raises(ValueError):
+            asyncUrl("mysql://a@b/c")
+
+    def test_engine(self):
+        async def run():
+            stats = PoolStats()
+            engine = createAsyncEngine(
+                self.url, sqlite_pragmas=SQLITE_PRAGMAS, stats=stats
+            )
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql("PRAGMA busy_timeout")
+                assert result.scalar() == 5000
+            await engine.dispose()
+            return stats.snapshot()
+
+        assert asyncio.run(run())["checkouts"] == 1
+
+    def _get(self, aio, path):
+        async def run():
+            engine = createAsyncEngine(self.url) if aio else None
+            context = {
+                "aio": aio
+                and sessionmaker(
+                    bind=engine, class_=AsyncSession, expire_on_commit=False
+                ),
+            }
+            app = tornado.web.Application(
+                [
+                    (r"/competition", CompetitionHandler, context),
+                    (r"/leaderboard", LeaderboardHandler, context),
+                ],
+                login_manager=SQLAlchemyLoginManager(
+                    self.sessionmaker, SQLAlchemyLoginManagerOptions()
+                ),
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                resp = await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:%d%s" % (port, path)
+                )
+                return json.loads(resp.body)
+            finally:
+                server.stop()
+                if engine is not None:
+                    await engine.dispose()
+
+        return asyncio.run(run())
+
+    def test_handlers(self):
+        for path in ("/competition", "/leaderboard"):
+            # the asyncio path answers exactly like the executor one
+            assert self._get(True, path) == self._get(False, path)
+        assert len(self._get(True, "/competition")) == 1
+        assert [s["score"] for s in self._get(True, "/leaderboard")] == [1.0, 2.0]
@@ -0,0 +1,115 @@
+import asyncio
+import os.path
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import tornado.httpserver
+import tornado.web
+import ujson
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.handlers import APIKeyHandler, LoginHandler
+from crowdsource.persistence.apikeys import APIKeyCache
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import APIKey, Base, Client
+
+
+class TestAPIKeys:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = createEngine(
+            "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        session = self.sessionmaker()
+        user = Client(username="test", password="test", email="test@test.com")
+        session.add(user)
+        session.commit()
+        self.apikey = APIKey(user_id=user.id)
+        session.add(self.apikey)
+        session.commit()
+        session.close()
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def test_cache(self):
+        cache = APIKeyCache(max_size=2, ttl=60)
+        cache.put("a", "secret", 1)
+        assert cache.get("a", "secret") == 1
+        assert cache.get("a", "wrong") is None
+        assert cache.get("b", "secret") is None
+
+        # least recently used goes first
+        cache.put("b", "secret", 2)
+        cache.get("a", "secret")
+        cache.put("c", "secret", 3)
+        assert cache.get("b", "secret") is None
+        assert cache.get("a", "secret") == 1
+
+        cache.invalidate("a")
+        assert cache.get("a", "secret") is None
+
+    def test_ttl(self):
+        cache = APIKeyCache(ttl=0.1)
+        cache.put("a", "secret", 1)
+        time.sleep(0.2)
+        assert cache.get("a", "secret") is None
+
+    def test_login(self):
+        cache = APIKeyCache()
+        context = {"apikeys": cache}
+        key, secret = self.apikey.key, self.apikey.secret
+
+        async def run():
+            app = tornado.web.Application(
+                [
+                    (r"/login", LoginHandler, context),
+                    (r"/apikeys", APIKeyHandler, context),
+                ],
+                login_manager=SQLAlchemyLoginManager(
+                    self.sessionmaker, SQLAlchemyLoginManagerOptions()
+                ),
+                cookie_secret="test",
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            client = AsyncHTTPClient()
+            base = "http://127.0.0.1:%d" % port
+            try:
+                ret = []
+                for _ in range(3):
+                    resp = await client.fetch(
+                        base + "/login",
+                        method="POST",
+                        body=urlencode({"key": key, "secret": secret}),
+                    )
+                    ret.append(ujson.loads(resp.body))
+
+                # revoking the key drops it from the cache
+                cookie = resp.headers["Set-Cookie"].split(";")[0]
+                await client.fetch(
+                    base + "/apikeys?id=%d" % self.apikey.id,
+                    method="POST",
+                    body="",
+                    headers={"Cookie": cookie},
+                )
+                return ret
+            finally:
+                server.stop()
+
+        ret = asyncio.run(run())
+        assert ret == [{"id": "1", "username": "test"}] * 3
+        # only the first login went to the database
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.get(key, secret) is None
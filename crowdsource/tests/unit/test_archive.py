@@ -0,0 +1,152 @@
+import asyncio
+import json
+import os.path
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+import tornado.httpserver
+import tornado.web
+from mock import patch
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.handlers import LeaderboardHandler
+from crowdsource.persistence.archive import SubmissionArchive
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import (
+    ArchivedCompetition,
+    Base,
+    Client,
+    Competition,
+    Submission,
+)
+from crowdsource.types.competition import CompetitionSpec
+
+
+class TestArchive:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = createEngine(
+            "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.archive = SubmissionArchive(os.path.join(self.dir.name, "archive"))
+
+        session = self.sessionmaker()
+        for i in (1, 2):
+            session.add(
+                Client(
+                    username="test%d" % i,
+                    password="test",
+                    email="test%d@test.com" % i,
+                )
+            )
+        session.commit()
+
+        # one competition long finished, one still running
+        for days in (-365, 1):
+            session.add(
+                Competition.from_spec(
+                    1,
+                    CompetitionSpec(
+                        title="test",
+                        type=CompetitionType.CLASSIFY,
+                        expiration=datetime.now() + timedelta(days=days),
+                        prize=1.0,
+                        metric=CompetitionMetric.ABSDIFF,
+                        dataset="",
+                    ),
+                )
+            )
+        session.commit()
+        for competition_id, user_id, score in (
+            (1, 1, 5),
+            (1, 1, 3),
+            (1, 2, 4),
+            (1, 2, -1),
+            (2, 1, 1),
+        ):
+            session.add(
+                Submission(
+                    user_id=user_id,
+                    competition_id=competition_id,
+                    score=score,
+                    answer={"a": [score]},
+                    answer_type="none",
+                    timestamp=datetime.now(),
+                )
+            )
+        session.commit()
+        session.close()
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def test_archive(self):
+        session = self.sessionmaker()
+        assert self.archive.archive(session, timedelta(days=30)) == [1]
+        # nothing left to do
+        assert self.archive.archive(session, timedelta(days=30)) == []
+
+        # the hot table only holds the running competition
+        assert [s.competition_id for s in session.query(Submission)] == [2]
+
+        archived = session.query(ArchivedCompetition).one()
+        assert archived.submissions == 4
+        assert [(r["user_id"], r["score"]) for r in archived.rankings] == [
+            (1, 3),
+            (2, 4),
+        ]
+        session.close()
+
+        df = self.archive.load(1)
+        assert df["score"].tolist() == [5, 3, 4, -1]
+        assert df["answer"].tolist()[0] == {"a": [5]}
+
+    def test_leaderboard(self):
+        session = self.sessionmaker()
+        self.archive.archive(session, timedelta(days=30))
+        session.close()
+
+        cookie = tornado.web.create_signed_value("test", "user", "1").decode()
+
+        async def run(query):
+            app = tornado.web.Application(
+                [(r"/leaderboard", LeaderboardHandler, {"archive": self.archive})],
+                login_manager=SQLAlchemyLoginManager(
+                    self.sessionmaker, SQLAlchemyLoginManagerOptions()
+                ),
+                cookie_secret="test",
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                resp = await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:%d/leaderboard?%s" % (port, query),
+                    headers={"Cookie": "user=" + cookie},
+                )
+                return json.loads(resp.body)
+            finally:
+                server.stop()
+
+        rows = asyncio.run(run("competition_id=1"))
+        assert [r["score"] for r in rows] == [5, 3, 4, -1]
+
+        rows = asyncio.run(run("competition_id=1&user_id=2"))
+        assert [r["score"] for r in rows] == [4, -1]
+
+    def test_no_pyarrow(self):
+        with patch.dict(sys.modules, {"pyarrow": None}):
+            with pytest.raises(ImportError):
+                SubmissionArchive(os.path.join(self.dir.name, "other"))
@@ -0,0 +1,95 @@
+import os.path
+import tempfile
+
+import pandas as pd
+
+from crowdsource.benchmarks.fixtures import serve
+from crowdsource.enums import DatasetFormat
+from crowdsource.exceptions import DatasetTooLarge
+from crowdsource.types.cache import DatasetCache, datasetCache, setDatasetCache
+from crowdsource.types.utils import _fetchDataset
+from mock import patch
+import requests
+
+
+class TestCache:
+    def setup_method(self):
+        self.data = tempfile.TemporaryDirectory()
+        self.dir = tempfile.TemporaryDirectory()
+        pd.DataFrame({"a": range(100)}).to_csv(
+            os.path.join(self.data.name, "a.csv"), index=False
+        )
+        pd.DataFrame({"b": range(100)}).to_csv(
+            os.path.join(self.data.name, "b.csv"), index=False
+        )
+
+    def teardown_method(self):
+        setDatasetCache(None)
+        self.data.cleanup()
+        self.dir.cleanup()
+
+    def test_revalidate(self):
+        cache = DatasetCache(self.dir.name)
+        get = requests.Session.get
+        statuses = []
+
+        def _get(self, *args, **kwargs):
+            resp = get(self, *args, **kwargs)
+            statuses.append(resp.status_code)
+            return resp
+
+        with serve(self.data.name) as base, patch("requests.Session.get", _get):
+            with cache.open(base + "a.csv") as fp:
+                first = fp.read()
+            with cache.open(base + "a.csv") as fp:
+                assert fp.read() == first
+
+        assert statuses == [200, 304]
+        assert cache.size() == len(first)
+
+        try:
+            with serve(self.data.name) as base:
+                cache.open(base + "a.csv", max_size=10)
+            assert False
+        except DatasetTooLarge:
+            pass
+
+    def test_evicted_after_revalidate(self):
+        cache = DatasetCache(self.dir.name)
+        get = requests.Session.get
+        statuses = []
+
+        def _get(self, *args, **kwargs):
+            resp = get(self, *args, **kwargs)
+            if resp.status_code == 304:
+                # evicted between reading the metadata and the 304
+                os.remove(cache._paths(args[0], dict(cookies=None, proxies=None))[0])
+            statuses.append((resp.status_code, bool(kwargs.get("headers"))))
+            return resp
+
+        with serve(self.data.name) as base:
+            with cache.open(base + "a.csv") as fp:
+                first = fp.read()
+            with patch("requests.Session.get", _get):
+                with cache.open(base + "a.csv") as fp:
+                    assert fp.read() == first
+
+        assert statuses == [(304, True), (200, False)]
+
+    def test_evict(self):
+        cache = DatasetCache(self.dir.name, max_size=400)
+        with serve(self.data.name) as base:
+            cache.open(base + "a.csv").close()
+            cache.open(base + "b.csv").close()
+        # only the most recent fits
+        assert cache.size() <= 400
+        assert len([f for f in os.listdir(self.dir.name) if f.endswith(".body")]) == 1
+
+    def test_fetchDataset(self):
+        setDatasetCache(DatasetCache(self.dir.name))
+        assert datasetCache() is not None
+        with serve(self.data.name) as base:
+            df = _fetchDataset(base + "a.csv", DatasetFormat.CSV)
+            df2 = _fetchDataset(base + "a.csv", DatasetFormat.CSV)
+        assert df.equals(df2)
+        assert DatasetCache(self.dir.name).size() > 0
@@ -44,3 +44,21 @@ class TestCompetitionSpec:
 
         for item in ["type", "expiration", "prize", "num_classes", "metric"]:
             assert getattr(s, item) == getattr(s2, item) == getattr(s3, item)
+
+    def test_model_spec(self):
+        from crowdsource.persistence.models import Competition
+
+        s = CompetitionSpec(
+            title="",
+            type=CompetitionType.PREDICT,
+            expiration=datetime(2018, 1, 1),
+            prize=1.0,
+            dataset="http://test.com",
+            metric=CompetitionMetric.ABSDIFF,
+            dataset_key="Name",
+            targets={"ABC Corp": ["Price"]},
+        )
+        spec = Competition.from_spec(1, s).spec
+        assert spec.type == CompetitionType.PREDICT
+        assert spec.metric == CompetitionMetric.ABSDIFF
+        assert spec.targets == {"ABC Corp": ["Price"]}
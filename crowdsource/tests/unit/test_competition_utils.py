@@ -1,3 +1,5 @@
+import gzip
+import io
 from datetime import datetime, timedelta
 
 import cufflinks.datagen as cfdg
@@ -134,21 +136,34 @@ class TestUtils:
         x = _fetchDataset(pd.DataFrame(), None)
         assert x.empty
 
-        with patch("requests.get") as m:
+        with patch("requests.Session.get") as m:
             m.return_value.status_code = 200
-            m.return_value.text = "{}"
-            _fetchDataset("", DatasetFormat.CSV)
-        with patch("requests.get") as m:
+            m.return_value.raw = io.BytesIO(b"a,b\n1,2\n")
+            x = _fetchDataset("", DatasetFormat.CSV)
+            assert list(x.columns) == ["a", "b"]
+        with patch("requests.Session.get") as m:
             m.return_value.status_code = 200
-            m.return_value.text = "{}"
-            m.return_value.json = MagicMock(return_value={"test": [5]})
-            _fetchDataset("", DatasetFormat.JSON)
-        with patch("requests.get") as m:
+            m.return_value.raw = io.BytesIO(b'{"test":[5]}')
+            x = _fetchDataset("", DatasetFormat.JSON)
+            assert x["test"][0] == 5
+        with patch("requests.Session.get") as m:
             m.return_value = MagicMock()
             m.return_value.status_code = 200
-            m.return_value.text = '{"test":[5]}'
-            m.return_value.json = MagicMock(return_value={"test": [5]})
-            _fetchDataset("", DatasetFormat.JSON, "test")
+            m.return_value.raw = io.BytesIO(b'{"test":[{"a":5}]}')
+            x = _fetchDataset("", DatasetFormat.JSON, "test")
+            assert x["a"][0] == 5
+        with patch("requests.Session.get") as m:
+            m.return_value.status_code = 200
+            m.return_value.raw = io.BytesIO(gzip.compress(b"a,b\n1,2\n"))
+            x = _fetchDataset("http://test.com/x.csv.gz", DatasetFormat.CSV)
+            assert list(x.columns) == ["a", "b"]
+        with patch("requests.Session.get") as m:
+            m.return_value.status_code = 404
+            try:
+                _fetchDataset("", DatasetFormat.CSV)
+                assert False
+            except MalformedDataset:
+                pass
         try:
             _fetchDataset("", 3)
             assert False
@@ -0,0 +1,69 @@
+import os.path
+import tempfile
+
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+from crowdsource.persistence.engine import SQLITE_PRAGMAS, PoolStats, createEngine
+
+
+class TestEngine:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.url = "sqlite:///" + os.path.join(self.dir.name, "test.db")
+
+    def teardown_method(self):
+        self.dir.cleanup()
+
+    def test_sqlite(self):
+        stats = PoolStats()
+        engine = createEngine(self.url, pool_size=20, stats=stats)
+        # sqlite files keep their own pool, sizing does not apply
+        assert isinstance(engine.pool, NullPool)
+        with engine.connect() as conn:
+            conn.exec_driver_sql("select 1")
+        assert stats.snapshot()["checkouts"] == 1
+
+        engine.dispose()
+        with engine.connect() as conn:
+            conn.exec_driver_sql("select 1")
+        assert stats.snapshot()["checkouts"] == 2
+
+    def test_queue_pool(self):
+        stats = PoolStats()
+        engine = createEngine(
+            self.url,
+            poolclass=QueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.1,
+            stats=stats,
+        )
+        assert engine.pool.size() == 1
+
+        conn = engine.connect()
+        try:
+            engine.connect()
+            assert False
+        except TimeoutError:
+            pass
+        finally:
+            conn.close()
+
+        snapshot = stats.snapshot()
+        assert snapshot["checkouts"] == 2
+        assert snapshot["wait_max"] >= 0.1
+        assert snapshot["waiting"] == 0
+
+    def test_pragmas(self):
+        engine = createEngine(self.url, sqlite_pragmas=SQLITE_PRAGMAS)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+            assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+        # no write-ahead log in memory, the rest still applies
+        engine = createEngine("sqlite://", sqlite_pragmas=SQLITE_PRAGMAS)
+        with engine.connect() as conn:
+            assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "memory"
+            assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
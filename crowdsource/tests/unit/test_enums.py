@@ -3,6 +3,7 @@ from crowdsource.enums import (
     DatasetFormat,
     CompetitionType,
     CompetitionMetric,
+    ScoringStatus,
 )
 
 
@@ -14,8 +15,14 @@ class TestEnums:
         assert DatasetFormat.NONE.value == "none"
         assert DatasetFormat.JSON.value == "json"
         assert DatasetFormat.CSV.value == "csv"
+        assert DatasetFormat.PARQUET.value == "parquet"
+        assert DatasetFormat.ARROW.value == "arrow"
+        assert DatasetFormat.NUMPY.value == "npy"
         assert CompetitionType.PREDICT.value == "predict"
         assert CompetitionType.CLASSIFY.value == "classify"
         assert CompetitionType.CLUSTER.value == "cluster"
         assert CompetitionMetric.LOGLOSS.value == "logloss"
         assert CompetitionMetric.ABSDIFF.value == "absdiff"
+        assert ScoringStatus.SCORED.value == "scored"
+        assert ScoringStatus.TIMEOUT.value == "timeout"
+        assert ScoringStatus.UNAVAILABLE.value == "unavailable"
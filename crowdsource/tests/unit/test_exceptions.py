@@ -5,6 +5,9 @@ from crowdsource.exceptions import (
     MalformedDataset,
     MalformedTargets,
     MalformedDataType,
+    DatasetTooLarge,
+    DatasetUnavailable,
+    MalformedSubmission,
 )
 
 
@@ -16,3 +19,6 @@ class TestException:
         MalformedDataset()
         MalformedTargets()
         MalformedDataType(int)
+        DatasetTooLarge(10)
+        DatasetUnavailable("test.com")
+        MalformedSubmission("test")
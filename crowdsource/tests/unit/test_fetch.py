@@ -0,0 +1,174 @@
+import os.path
+import socket
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+from mock import patch
+
+from crowdsource.benchmarks.fixtures import serve
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.exceptions import DatasetTooLarge, DatasetUnavailable
+from crowdsource.types import utils
+from crowdsource.types.fetch import (
+    CircuitBreaker,
+    Slot,
+    configure,
+    openStream,
+    options,
+    session,
+)
+from crowdsource.types.utils import checkAnswer
+
+
+class TestFetch:
+    def setup_method(self):
+        self.options = options()
+        self.dir = tempfile.TemporaryDirectory()
+        pd.DataFrame({"a": [0, 1, 1, 0]}).to_csv(
+            os.path.join(self.dir.name, "answer.csv"), index=False
+        )
+        pd.DataFrame({"a": [0.1, 0.9, 0.8, 0.2]}).to_csv(
+            os.path.join(self.dir.name, "user.csv"), index=False
+        )
+
+    def teardown_method(self):
+        configure(**self.options)
+        self.dir.cleanup()
+
+    def test_session(self):
+        assert session() is session()
+        configure(connections_per_host=2)
+        assert options()["connections_per_host"] == 2
+
+    def test_slot(self):
+        configure(connections_per_host=1, pool_timeout=0.1)
+        first = Slot("http://a.com/x.csv")
+        assert first._held
+        # over the limit, fails rather than tying up another thread
+        try:
+            Slot("http://a.com/y.csv")
+            assert False
+        except DatasetUnavailable:
+            pass
+        with Slot("http://b.com/x.csv") as other:
+            assert other._held
+        first.release()
+        with Slot("http://a.com/x.csv") as third:
+            assert third._held
+
+    def test_openStream(self):
+        configure(connections_per_host=1, pool_timeout=0.1)
+        with serve(self.dir.name) as base:
+            with openStream(base + "answer.csv") as fp:
+                assert fp.read().startswith(b"a\n")
+            # the slot was handed back on close
+            with Slot(base) as slot:
+                assert slot._held
+
+    def test_max_size(self):
+        configure(max_size=4)
+        with serve(self.dir.name) as base:
+            try:
+                openStream(base + "answer.csv")
+                assert False
+            except DatasetTooLarge:
+                pass
+            # explicit limits win over the default
+            with openStream(base + "answer.csv", max_size=0) as fp:
+                assert fp.read()
+
+    def test_breaker(self):
+        breaker = CircuitBreaker(threshold=2, cooldown=0.1)
+        breaker.failure()
+        assert breaker.allow()
+        breaker.failure()
+        assert not breaker.allow()
+        time.sleep(0.1)
+        # one probe is let through, then closed again on success
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.success()
+        assert breaker.allow()
+
+    def test_timeout(self):
+        configure(read_timeout=0.2, breaker_threshold=2, breaker_cooldown=60)
+        # accepts connections but never answers
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen(8)
+        url = "http://127.0.0.1:%d/x.csv" % sock.getsockname()[1]
+        try:
+            for _ in range(3):
+                start = time.time()
+                try:
+                    openStream(url)
+                    assert False
+                except DatasetUnavailable:
+                    pass
+                assert time.time() - start < 5
+        finally:
+            sock.close()
+
+    def test_checkAnswer_concurrent(self):
+        barrier = threading.Barrier(2, timeout=5)
+        fetch = utils._fetchDataset
+
+        def _fetchDataset(*args, **kwargs):
+            # both sides must be in flight at once to get past the barrier
+            barrier.wait()
+            return fetch(*args, **kwargs)
+
+        with serve(self.dir.name) as base:
+            competition = SimpleNamespace(
+                competition_id=1,
+                type=CompetitionType.CLASSIFY,
+                metric=CompetitionMetric.ABSDIFF,
+                targets=None,
+                dataset="",
+                dataset_type=DatasetFormat.CSV,
+                dataset_kwargs={},
+                dataset_key=None,
+                answer=base + "answer.csv",
+                answer_type=DatasetFormat.CSV,
+            )
+            submission = SimpleNamespace(
+                submission_id=1,
+                competition=competition,
+                answer=base + "user.csv",
+                answer_type=DatasetFormat.CSV,
+            )
+            with patch.object(utils, "_fetchDataset", _fetchDataset):
+                score = checkAnswer(submission)
+        assert abs(score + 0.1) < 1e-9
+
+    def test_checkAnswer_one_slot(self):
+        # a job needs one slot per host, however many of its fetches go there
+        configure(connections_per_host=1, pool_timeout=0.5)
+        with serve(self.dir.name) as base:
+            competition = SimpleNamespace(
+                competition_id=1,
+                type=CompetitionType.CLASSIFY,
+                metric=CompetitionMetric.ABSDIFF,
+                targets=None,
+                dataset="",
+                dataset_type=DatasetFormat.CSV,
+                dataset_kwargs={},
+                dataset_key=None,
+                answer=base + "answer.csv",
+                answer_type=DatasetFormat.CSV,
+            )
+            submission = SimpleNamespace(
+                submission_id=1,
+                competition=competition,
+                answer=base + "user.csv",
+                answer_type=DatasetFormat.CSV,
+            )
+            for chunksize in (None, 2):
+                score = checkAnswer(submission, chunksize=chunksize)
+                assert abs(score + 0.1) < 1e-9
+            # and hands it back afterwards
+            with Slot(base) as slot:
+                assert slot._held
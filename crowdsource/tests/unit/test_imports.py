@@ -0,0 +1,9 @@
+from crowdsource.benchmarks.import_time import importTime
+
+
+class TestImports:
+    def test_client_lazy(self):
+        assert importTime("crowdsource.client")["heavy"] == []
+
+    def test_server_lazy(self):
+        assert importTime("crowdsource.server")["heavy"] == []
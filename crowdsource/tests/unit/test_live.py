@@ -0,0 +1,95 @@
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+import ujson
+from six.moves.urllib.parse import parse_qs, urlparse
+
+from crowdsource.enums import DatasetFormat
+from crowdsource.types.live import LiveSnapshots
+
+ROWS = []
+SENT = []
+
+
+class _Feed(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/feed.csv":
+            body = ("Time,Price\n" + "".join("%d,%s\n" % r for r in ROWS)).encode()
+            start = 0
+            if self.headers.get("Range"):
+                start = int(self.headers["Range"][len("bytes=") : -1])
+                if start >= len(body):
+                    self.send_response(416)
+                    self.end_headers()
+                    return
+                self.send_response(206)
+            else:
+                self.send_response(200)
+            body = body[start:]
+        else:
+            since = parse_qs(url.query).get("since")
+            rows = [r for r in ROWS if not since or r[0] >= int(since[0])]
+            body = ujson.dumps([{"Time": t, "Price": p} for t, p in rows]).encode()
+            self.send_response(200)
+        SENT.append(len(body))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestLive:
+    def setup_method(self):
+        ROWS[:] = [(i, float(i)) for i in range(100)]
+        SENT[:] = []
+        self.dir = tempfile.TemporaryDirectory()
+        self.server = HTTPServer(("127.0.0.1", 0), _Feed)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = "http://127.0.0.1:%d/" % self.server.server_port
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.dir.cleanup()
+
+    def _spec(self, path, data_type, incremental):
+        return SimpleNamespace(
+            dataset=self.base + path,
+            dataset_type=data_type,
+            dataset_kwargs={"incremental": incremental},
+        )
+
+    def test_since(self):
+        live = LiveSnapshots(self.dir.name)
+        spec = self._spec("feed", DatasetFormat.JSON, {"since": "Time"})
+        df = live.update(1, spec)
+        assert len(df.index) == 100
+
+        ROWS.append((100, 100.0))
+        df = live.update(1, spec)
+        assert len(df.index) == 101
+        assert df["Time"].iloc[-1] == 100
+        # only the boundary and new row came over the wire
+        assert SENT[-1] < SENT[0] / 10
+
+        # picked back up from disk
+        assert len(LiveSnapshots(self.dir.name).load(1).index) == 101
+
+    def test_range(self):
+        live = LiveSnapshots(self.dir.name)
+        spec = self._spec("feed.csv", DatasetFormat.CSV, {"range": True})
+        df = live.update(1, spec)
+        assert len(df.index) == 100
+
+        # nothing new
+        assert len(live.update(1, spec).index) == 100
+
+        ROWS.extend([(100, 100.0), (101, 101.0)])
+        df = live.update(1, spec)
+        assert df["Time"].tolist()[-2:] == [100, 101]
+        assert list(df.index) == list(range(102))
+        assert SENT[-1] == len(b"100,100.0\n101,101.0\n")
@@ -0,0 +1,115 @@
+import os.path
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.exceptions import MalformedDataset, MalformedSubmission
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.fetch import configure, isSource, localPath, options
+from crowdsource.types.streaming import streamingCheckAnswer
+from crowdsource.types.utils import _fetchDataset, validateAnswer
+
+
+class TestLocal:
+    def setup_method(self):
+        self.options = options()
+        self.dir = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({"a": [0.0, 1.0, 2.0], "b": [3.0, 4.0, 5.0]})
+
+    def teardown_method(self):
+        configure(**self.options)
+        self.dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(self.dir.name, name)
+
+    def test_localPath(self):
+        assert localPath("file:///tmp/x.csv") == "/tmp/x.csv"
+        assert localPath("/tmp/x.csv") == "/tmp/x.csv"
+        assert localPath("./x.csv") == "./x.csv"
+        assert localPath("http://test.com/x.csv") is None
+        assert localPath('[{"a": 1}]') is None
+        assert isSource("/tmp/x.csv")
+        assert isSource("http://test.com/x.csv")
+        assert not isSource('[{"a": 1}]')
+        assert not isSource(self.df)
+
+    def test_formats(self):
+        self.df.to_csv(self._path("x.csv"), index=False)
+        self.df.to_csv(self._path("x.csv.gz"), index=False)
+        self.df.to_json(self._path("x.json"))
+        self.df.to_parquet(self._path("x.parquet"))
+        self.df.to_feather(self._path("x.arrow"))
+        np.save(self._path("x.npy"), self.df.to_records(index=False))
+
+        for name, fmt in (
+            ("x.csv", DatasetFormat.CSV),
+            ("x.csv.gz", DatasetFormat.CSV),
+            ("x.json", DatasetFormat.JSON),
+            ("x.parquet", DatasetFormat.PARQUET),
+            ("x.arrow", DatasetFormat.ARROW),
+            ("x.npy", DatasetFormat.NUMPY),
+        ):
+            for source in (self._path(name), "file://" + self._path(name)):
+                df = _fetchDataset(source, fmt)
+                assert df["a"].tolist() == [0.0, 1.0, 2.0], name
+                assert df["b"].tolist() == [3.0, 4.0, 5.0], name
+
+    def test_roots(self):
+        self.df.to_csv(self._path("x.csv"), index=False)
+        configure(local_roots=[self.dir.name])
+        assert len(_fetchDataset(self._path("x.csv"), DatasetFormat.CSV).index) == 3
+
+        for bad in ([], [os.path.join(self.dir.name, "other")]):
+            configure(local_roots=bad)
+            try:
+                _fetchDataset(self._path("x.csv"), DatasetFormat.CSV)
+                assert False
+            except MalformedDataset:
+                pass
+
+        spec = SimpleNamespace(targets=None)
+        try:
+            validateAnswer(spec, self._path("x.csv"))
+            assert False
+        except MalformedSubmission:
+            pass
+
+    def test_spec(self):
+        spec = CompetitionSpec(
+            title="",
+            type=CompetitionType.CLASSIFY,
+            expiration=None,
+            prize=1.0,
+            metric=CompetitionMetric.LOGLOSS,
+            dataset="file://" + self._path("x.csv"),
+            dataset_type=DatasetFormat.CSV,
+        )
+        assert spec.dataset_type == DatasetFormat.CSV
+
+    def test_streaming(self):
+        self.df.to_parquet(self._path("x.parquet"), row_group_size=1)
+        pd.DataFrame({"a": [1.0, 0.0, 0.0], "b": [3.0, 4.0, 5.0]}).to_csv(
+            self._path("y.csv"), index=False
+        )
+        competition = SimpleNamespace(
+            competition_id=1,
+            type=CompetitionType.PREDICT,
+            metric=CompetitionMetric.ABSDIFF,
+            targets=["a", "b"],
+            dataset="",
+            dataset_type=DatasetFormat.PARQUET,
+            dataset_kwargs={},
+            dataset_key=None,
+            answer=self._path("x.parquet"),
+            answer_type=DatasetFormat.PARQUET,
+        )
+        submission = SimpleNamespace(
+            competition=competition,
+            answer=self._path("y.csv"),
+            answer_type=DatasetFormat.CSV,
+        )
+        assert streamingCheckAnswer(submission, chunksize=2) == -1.0
@@ -0,0 +1,127 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+import tornado.httpserver
+import tornado.web
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient, HTTPClientError
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource import metrics
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.handlers import MetricsHandler
+from crowdsource.persistence.engine import createEngine
+from crowdsource.types.sandbox import ScoringSandbox
+from crowdsource.types.utils import checkAnswer
+
+
+class TestMetrics:
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.register(
+            metrics.Counter("test_total", "Test counter", ("status",))
+        )
+        histogram = registry.register(
+            metrics.Histogram("test_seconds", "Test histogram", buckets=(0.1, 1.0))
+        )
+        registry.register(
+            metrics.Gauge("test_rows", "Test gauge", lambda: {("a",): 3}, ("table",))
+        )
+        counter.inc(200)
+        counter.inc(200)
+        counter.inc('4"4')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        assert registry.render().splitlines() == [
+            "# HELP test_total Test counter",
+            "# TYPE test_total counter",
+            'test_total{status="200"} 2',
+            'test_total{status="4\\"4"} 1',
+            "# HELP test_seconds Test histogram",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{le="0.1"} 1',
+            'test_seconds_bucket{le="1"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            "test_seconds_sum 5.55",
+            "test_seconds_count 3",
+            "# HELP test_rows Test gauge",
+            "# TYPE test_rows gauge",
+            'test_rows{table="a"} 3',
+        ]
+
+    def _submission(self):
+        answer = pd.DataFrame({"a": [1.0, 2.0], "b": [3.0, 4.0]})
+        return SimpleNamespace(
+            submission_id=1,
+            competition=SimpleNamespace(
+                competition_id=1,
+                type=CompetitionType.PREDICT,
+                metric=CompetitionMetric.ABSDIFF,
+                targets=["a"],
+                dataset_key=None,
+                dataset="",
+                dataset_type=DatasetFormat.NONE,
+                dataset_kwargs={},
+                answer=answer.to_json(),
+                answer_type=DatasetFormat.NONE,
+                expiration=datetime.now() + timedelta(days=1),
+            ),
+            answer=answer.to_json(),
+            answer_type=DatasetFormat.NONE,
+        )
+
+    def test_scoring(self):
+        for score in (
+            lambda s: checkAnswer(s),
+            # observed in the subprocess and reported back
+            lambda s: ScoringSandbox().score(s)[1],
+        ):
+            before = {
+                stage: metrics.SCORING_SECONDS.count(stage)
+                for stage in ("parse", "align", "metric")
+            }
+            assert score(self._submission()) == 0
+            assert {
+                stage: metrics.SCORING_SECONDS.count(stage) - count
+                for stage, count in before.items()
+            } == {"parse": 2, "align": 1, "metric": 1}
+
+    def test_handler(self):
+        engine = createEngine("sqlite://")
+        manager = SQLAlchemyLoginManager(
+            sessionmaker(bind=engine), SQLAlchemyLoginManagerOptions()
+        )
+        before = metrics.REQUESTS.get("MetricsHandler", "GET", 200)
+
+        async def run(allow):
+            app = tornado.web.Application(
+                [(r"/metrics", MetricsHandler, {"allow": allow})],
+                login_manager=manager,
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                return await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:%d/metrics" % port
+                )
+            except HTTPClientError as e:
+                return e.response
+            finally:
+                server.stop()
+
+        resp = asyncio.run(run(["127.0.0.1"]))
+        assert resp.code == 200
+        assert resp.headers["Content-Type"] == metrics.CONTENT_TYPE
+        assert "# TYPE crowdsource_request_seconds histogram" in resp.body.decode()
+        assert metrics.REQUESTS.get("MetricsHandler", "GET", 200) == before + 1
+
+        assert asyncio.run(run(["10.0.0.1"])).code == 403
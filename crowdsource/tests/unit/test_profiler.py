@@ -0,0 +1,115 @@
+import asyncio
+import json
+import os.path
+import tempfile
+import time
+
+import tornado.httpserver
+import tornado.web
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.handlers import LeaderboardHandler, ProfilerHandler
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client
+from crowdsource.profiler import RequestProfiler
+
+
+def work():
+    return sum(range(1000))
+
+
+class TestProfiler:
+    def test_sampling(self):
+        profiler = RequestProfiler(every=3, max_overhead=1.0, max_samples=2)
+        profiler.call("test", work)
+        assert profiler.status()["samples"] == 0
+
+        profiler.enable()
+        for _ in range(9):
+            assert profiler.call("test", work) == 499500
+        status = profiler.status()
+        # every third call, until max_samples turned it off
+        assert status["samples"] == 2
+        assert not status["enabled"]
+        assert status["handlers"]["test"]["samples"] == 2
+        assert "work" in profiler.report("test")
+
+        with tempfile.TemporaryDirectory() as directory:
+            (path,) = profiler.dump(directory)
+            assert os.path.exists(path)
+
+        profiler.reset()
+        assert profiler.status()["handlers"] == {}
+
+    def test_overhead(self):
+        profiler = RequestProfiler(every=1, max_overhead=0.0, max_samples=0)
+        profiler.enable()
+        for _ in range(3):
+            profiler.call("test", time.sleep, 0.01)
+        # the first call used up the budget
+        status = profiler.status()
+        assert (status["samples"], status["skipped"]) == (1, 2)
+
+    def test_handler(self):
+        with tempfile.TemporaryDirectory() as directory:
+            engine = createEngine("sqlite:///" + os.path.join(directory, "test.db"))
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine, expire_on_commit=False)
+            session = Session()
+            session.add(
+                Client(
+                    username="test", password="test", email="test@test.com", admin=True
+                )
+            )
+            session.commit()
+            session.close()
+
+            context = {"profiler": RequestProfiler(max_overhead=1.0)}
+            cookie = tornado.web.create_signed_value("test", "user", "1").decode()
+
+            async def run():
+                app = tornado.web.Application(
+                    [
+                        (r"/leaderboard", LeaderboardHandler, context),
+                        (r"/profiler", ProfilerHandler, context),
+                    ],
+                    login_manager=SQLAlchemyLoginManager(
+                        Session, SQLAlchemyLoginManagerOptions()
+                    ),
+                    cookie_secret="test",
+                )
+                sock, port = bind_unused_port()
+                server = tornado.httpserver.HTTPServer(app)
+                server.add_sockets([sock])
+                client = AsyncHTTPClient()
+                base = "http://127.0.0.1:%d" % port
+                headers = {"Cookie": "user=" + cookie}
+                try:
+                    await client.fetch(
+                        base + "/profiler",
+                        method="POST",
+                        body="action=enable&every=1",
+                        headers=headers,
+                    )
+                    for _ in range(2):
+                        await client.fetch(base + "/leaderboard", headers=headers)
+                    status = await client.fetch(base + "/profiler", headers=headers)
+                    report = await client.fetch(
+                        base + "/profiler?report=1", headers=headers
+                    )
+                    return json.loads(status.body), report.body.decode()
+                finally:
+                    server.stop()
+
+            status, report = asyncio.run(run())
+            engine.dispose()
+
+        assert status["enabled"]
+        assert status["handlers"]["LeaderboardHandler._get"]["samples"] == 2
+        assert report.startswith("LeaderboardHandler._get: 2 samples")
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os.path
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import tornado.httpserver
+import tornado.web
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.handlers import LeaderboardHandler
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client, Competition, Submission
+from crowdsource.persistence.replicas import ReadReplicas
+from crowdsource.types.competition import CompetitionSpec
+
+
+def _seed(url, scores):
+    engine = createEngine(url)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    session.add(Client(username="test", password="test", email="test@test.com"))
+    session.commit()
+    competition = Competition.from_spec(
+        1,
+        CompetitionSpec(
+            title="test",
+            type=CompetitionType.CLASSIFY,
+            expiration=datetime.now() + timedelta(days=1),
+            prize=1.0,
+            metric=CompetitionMetric.ABSDIFF,
+            dataset="",
+        ),
+    )
+    session.add(competition)
+    session.commit()
+    for score in scores:
+        session.add(
+            Submission(
+                user_id=1,
+                competition_id=competition.competition_id,
+                score=score,
+                answer="",
+                answer_type="none",
+                timestamp=datetime.now(),
+            )
+        )
+    session.commit()
+    session.close()
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+class TestReplicas:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        # the replica lags the primary by one submission
+        self.primary = _seed(
+            "sqlite:///" + os.path.join(self.dir.name, "primary.db"), [1.0, 2.0]
+        )
+        self.replica = _seed(
+            "sqlite:///" + os.path.join(self.dir.name, "replica.db"), [1.0]
+        )
+
+    def teardown_method(self):
+        self.dir.cleanup()
+
+    def test_pin(self):
+        replicas = ReadReplicas([self.replica], pin_seconds=0.1)
+        assert not replicas.pinned(1)
+        assert not replicas.pinned(None)
+        replicas.pin(1)
+        assert replicas.pinned(1)
+        assert not replicas.pinned(2)
+        time.sleep(0.2)
+        assert not replicas.pinned(1)
+
+    def test_round_robin(self):
+        replicas = ReadReplicas([self.primary, self.replica])
+        counts = []
+        for _ in range(4):
+            with replicas.session() as session:
+                counts.append(session.query(Submission).count())
+        assert counts == [2, 1, 2, 1]
+        assert replicas.aio() is None
+
+    def test_leaderboard(self):
+        replicas = ReadReplicas([self.replica])
+        cookie = tornado.web.create_signed_value("test", "user", "1").decode()
+
+        async def run():
+            app = tornado.web.Application(
+                [(r"/leaderboard", LeaderboardHandler, {"replicas": replicas})],
+                login_manager=SQLAlchemyLoginManager(
+                    self.primary, SQLAlchemyLoginManagerOptions()
+                ),
+                cookie_secret="test",
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                resp = await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:%d/leaderboard" % port,
+                    headers={"Cookie": "user=" + cookie},
+                )
+                return json.loads(resp.body)
+            finally:
+                server.stop()
+
+        assert len(asyncio.run(run())) == 1
+
+        # after a write, user 1 reads it back from the primary
+        replicas.pin(1)
+        assert len(asyncio.run(run())) == 2
@@ -1,11 +1,15 @@
+import ujson
+from mock import patch, MagicMock
+
 from crowdsource.client.samples import (
+    answerPredict1,
     classify1,
     predict1,
     predict2,
     predictCorporateBonds,
     predictCitibike,
 )
-from mock import patch, MagicMock
+from crowdsource.types.competition import CompetitionSpec
 
 
 class TestClient:
@@ -24,3 +28,13 @@ class TestClient:
             assert predict2("http://test", "test", None)
             assert predictCorporateBonds("http://test", "test", None)
             assert predictCitibike("http://test", "test", None)
+
+    def test_answerPredict1(self):
+        for generate in (predict1, predict2):
+            with patch("crowdsource.client.samples.safe_post") as m:
+                generate("http://test", "test", None)
+            spec = CompetitionSpec.from_dict(
+                ujson.loads(m.call_args[1]["data"])["spec"]
+            )
+            answer = answerPredict1(spec)
+            assert list(answer.columns) == list(spec.targets)
@@ -0,0 +1,132 @@
+import socket
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pandas as pd
+from mock import patch
+from sklearn.datasets import make_classification
+
+from crowdsource.enums import (
+    CompetitionMetric,
+    CompetitionType,
+    DatasetFormat,
+    ScoringStatus,
+)
+from crowdsource.persistence.models import Competition, Submission
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.fetch import Slot, configure, options
+from crowdsource.types.sandbox import ScoringSandbox, withAnswer
+from crowdsource.types.submission import SubmissionSpec
+
+
+class _Big(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"a,b\n" + b"1,2\n" * 100000)
+
+    def log_message(self, *args):
+        pass
+
+
+def _submission(answer, answer_type=DatasetFormat.JSON):
+    dataset = make_classification()
+    competition = CompetitionSpec(
+        title="",
+        type=CompetitionType.CLASSIFY,
+        expiration=datetime.now() + timedelta(minutes=1),
+        prize=1.0,
+        num_classes=2,
+        dataset=pd.DataFrame(dataset[0]),
+        metric=CompetitionMetric.LOGLOSS,
+        answer=pd.DataFrame(dataset[1]),
+    )
+    c = Competition.from_spec(1, competition)
+    s = SubmissionSpec.from_dict(
+        {
+            "competition_id": 2,
+            "answer": (
+                answer if answer is not None else pd.DataFrame(dataset[1]).to_json()
+            ),
+            "answer_type": answer_type,
+        }
+    )
+    return Submission.from_spec(1, 2, c, s)
+
+
+class TestSandbox:
+    def test_scored(self):
+        status, score = ScoringSandbox().score(_submission(None))
+        assert status == ScoringStatus.SCORED
+        assert score is not None
+
+    def test_withAnswer(self):
+        submission = _submission(None)
+        answer = pd.DataFrame(submission.competition.answer)
+        detached = withAnswer(submission, answer)
+        assert detached.competition.answer is answer
+        assert detached.submission_id == submission.submission_id
+        # the original is untouched
+        assert submission.competition.answer is not answer
+
+        status, score = ScoringSandbox().score(detached)
+        assert status == ScoringStatus.SCORED
+
+    def test_timeout(self):
+        status, score = ScoringSandbox(timeout=0).score(_submission(None))
+        assert status == ScoringStatus.TIMEOUT
+        assert score is None
+
+    def test_too_large(self):
+        server = HTTPServer(("127.0.0.1", 0), _Big)
+        t = threading.Thread(target=server.serve_forever, daemon=True)
+        t.start()
+        try:
+            url = "http://127.0.0.1:{}/big.csv".format(server.server_port)
+            status, score = ScoringSandbox(max_download=1024).score(
+                _submission(url, DatasetFormat.CSV)
+            )
+            assert status == ScoringStatus.TOO_LARGE
+            assert score is None
+        finally:
+            server.shutdown()
+
+    def test_slots(self):
+        server = HTTPServer(("127.0.0.1", 0), _Big)
+        t = threading.Thread(target=server.serve_forever, daemon=True)
+        t.start()
+        before = options()
+        configure(connections_per_host=1, pool_timeout=0.1)
+        try:
+            url = "http://127.0.0.1:{}/big.csv".format(server.server_port)
+            submission = _submission(url, DatasetFormat.CSV)
+            # the limit is kept by this process, not by each scoring process
+            with Slot(url):
+                status, _ = ScoringSandbox().score(submission)
+            assert status == ScoringStatus.UNAVAILABLE
+            status, _ = ScoringSandbox(max_download=1024).score(submission)
+            assert status == ScoringStatus.TOO_LARGE
+        finally:
+            configure(**before)
+            server.shutdown()
+
+    def test_breaker(self):
+        # nothing listening, connections are refused
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        url = "http://127.0.0.1:{}/x.csv".format(sock.getsockname()[1])
+        sock.close()
+
+        before = options()
+        configure(breaker_threshold=2, breaker_cooldown=60)
+        sandbox = ScoringSandbox()
+        try:
+            with patch.object(sandbox, "_run", wraps=sandbox._run) as run:
+                for _ in range(4):
+                    status, _ = sandbox.score(_submission(url, DatasetFormat.CSV))
+                    assert status == ScoringStatus.UNAVAILABLE
+            # the breaker opened after two failed jobs, later ones never started
+            assert run.call_count == 2
+        finally:
+            configure(**before)
@@ -0,0 +1,162 @@
+import os
+import os.path
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pandas as pd
+from mock import patch
+from sqlalchemy.orm import sessionmaker
+
+from crowdsource.benchmarks.fixtures import serve
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client, Competition
+from crowdsource.server import Crowdsource
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.snapshot import (
+    DatasetSnapshots,
+    due,
+    groundTruthSource,
+    setDatasetSnapshots,
+)
+from crowdsource.types.utils import checkAnswer
+
+
+class TestSnapshot:
+    def setup_method(self):
+        self.data = tempfile.TemporaryDirectory()
+        self.dir = tempfile.TemporaryDirectory()
+        self._write([0.0, 1.0, 2.0])
+
+    def teardown_method(self):
+        setDatasetSnapshots(None)
+        self.data.cleanup()
+        self.dir.cleanup()
+
+    def _write(self, values):
+        pd.DataFrame({"a": values}).to_csv(
+            os.path.join(self.data.name, "answer.csv"), index=False
+        )
+
+    def _competition(self, base, **kwargs):
+        return SimpleNamespace(
+            competition_id=1,
+            type=CompetitionType.PREDICT,
+            metric=CompetitionMetric.ABSDIFF,
+            targets="a",
+            dataset=base + "answer.csv",
+            dataset_type=DatasetFormat.CSV,
+            dataset_kwargs={},
+            dataset_key=None,
+            answer="",
+            answer_type=DatasetFormat.NONE,
+            when=kwargs.get("when"),
+            expiration=kwargs.get("expiration", datetime.now()),
+        )
+
+    def test_source(self):
+        competition = self._competition("http://test.com/")
+        assert groundTruthSource(competition) == ("http://test.com/answer.csv", "csv")
+        competition.dataset = '{"a": [1]}'
+        assert groundTruthSource(competition) is None
+
+    def test_due(self):
+        later = datetime.now() + timedelta(hours=1)
+        assert not due(self._competition("", expiration=later))
+        assert due(self._competition("", when=datetime.now(), expiration=later))
+
+    def test_capture(self):
+        snapshots = DatasetSnapshots(self.dir.name)
+        with serve(self.data.name) as base:
+            competition = self._competition(base)
+            first = snapshots.capture(competition)
+            # first capture wins
+            assert snapshots.capture(competition) == first
+
+            self._write([5.0, 6.0, 7.0])
+            second = snapshots.capture(competition, force=True)
+
+        assert first["sha256"] != second["sha256"]
+        assert snapshots.current(1) == second
+        assert len(snapshots.manifest(1)["versions"]) == 2
+        assert len(os.listdir(os.path.join(self.dir.name, "objects"))) == 2
+        assert snapshots.load(1)["a"].tolist() == [5.0, 6.0, 7.0]
+
+    def test_checkAnswer(self):
+        snapshots = DatasetSnapshots(self.dir.name)
+        setDatasetSnapshots(snapshots)
+        with serve(self.data.name) as base:
+            competition = self._competition(base)
+            snapshots.capture(competition)
+        # the remote changed and is gone, scoring still sees the frozen copy
+        self._write([5.0, 6.0, 7.0])
+        submission = SimpleNamespace(
+            submission_id=1,
+            competition=competition,
+            answer='{"a": [1.0, 1.0, 1.0]}',
+            answer_type=DatasetFormat.NONE,
+        )
+        assert checkAnswer(submission) == -1.0
+
+    def test_backoff(self):
+        snapshots = DatasetSnapshots(self.dir.name, retries=3, backoff=60)
+        now = datetime.now()
+        assert snapshots.wanted(1, now)
+        assert snapshots.failed(1, now)
+        assert not snapshots.wanted(1, now + timedelta(seconds=59))
+        assert snapshots.wanted(1, now + timedelta(seconds=60))
+        # doubling
+        assert snapshots.failed(1, now)
+        assert not snapshots.wanted(1, now + timedelta(seconds=119))
+        assert snapshots.wanted(1, now + timedelta(seconds=120))
+        # given up on
+        assert not snapshots.failed(1, now)
+        assert not snapshots.wanted(1, now + timedelta(days=1))
+
+        snapshots.skip(2)
+        assert not snapshots.wanted(2, now)
+
+    def test_capture_snapshots(self):
+        engine = createEngine("sqlite:///" + os.path.join(self.data.name, "test.db"))
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        session = Session()
+        session.add(Client(username="test", password="test", email="test@test.com"))
+        session.commit()
+        for dataset in (
+            pd.DataFrame({"a": [1.0]}),
+            # nothing listens on port 1
+            "http://127.0.0.1:1/answer.csv",
+        ):
+            session.add(
+                Competition.from_spec(
+                    1,
+                    CompetitionSpec(
+                        title="test",
+                        type=CompetitionType.PREDICT,
+                        expiration=datetime.now() - timedelta(days=1),
+                        prize=1.0,
+                        metric=CompetitionMetric.ABSDIFF,
+                        dataset=dataset,
+                        dataset_type=DatasetFormat.CSV,
+                        targets=["a"],
+                    ),
+                )
+            )
+        session.commit()
+        session.close()
+
+        server = Crowdsource()
+        server.sessionmaker = Session
+        snapshots = DatasetSnapshots(self.dir.name, backoff=60)
+        with patch.object(snapshots, "capture", wraps=snapshots.capture) as capture:
+            server.capture_snapshots(snapshots)
+            # the inline competition is never tried
+            assert [c[0][0].competition_id for c in capture.call_args_list] == [2]
+            assert not snapshots.wanted(1)
+
+            # the failed one waits out its backoff
+            server.capture_snapshots(snapshots)
+            assert capture.call_count == 1
+        engine.dispose()
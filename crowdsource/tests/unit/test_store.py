@@ -0,0 +1,99 @@
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_classification
+
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.persistence.models import Competition, Submission
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.sandbox import withAnswer
+from crowdsource.types.store import AnswerStore
+from crowdsource.types.submission import SubmissionSpec
+from crowdsource.types.utils import checkAnswer
+
+
+class TestStore:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.store = AnswerStore(self.dir.name)
+
+    def teardown_method(self):
+        self.dir.cleanup()
+
+    def test_roundtrip(self):
+        df = pd.DataFrame(
+            {"a": np.arange(10.0), "b": ["x"] * 10}, index=pd.Index(range(10), name="i")
+        )
+        assert 1 not in self.store
+        assert self.store.load(1) is None
+
+        self.store.save(1, df)
+        assert 1 in self.store
+        loaded = self.store.load(1)
+        assert isinstance(loaded["a"].values, np.memmap)
+        assert (loaded["a"].values == df["a"].values).all()
+        assert (loaded["b"].values == df["b"].values).all()
+        assert loaded.index.name == "i"
+
+        # first writer wins
+        self.store.save(1, df.iloc[:1])
+        assert len(self.store.load(1).index) == 10
+
+        self.store.remove(1)
+        assert 1 not in self.store
+
+    def test_checkAnswer(self):
+        dataset = make_classification()
+        competition = CompetitionSpec(
+            title="",
+            type=CompetitionType.CLASSIFY,
+            expiration=datetime.now() + timedelta(minutes=1),
+            prize=1.0,
+            num_classes=2,
+            dataset=pd.DataFrame(dataset[0]),
+            metric=CompetitionMetric.LOGLOSS,
+            answer=pd.DataFrame(dataset[1]),
+        )
+        c = Competition.from_spec(1, competition)
+        c.competition_id = 5
+        s = SubmissionSpec.from_dict(
+            {
+                "competition_id": 5,
+                "answer": pd.DataFrame(dataset[1]).to_json(),
+                "answer_type": DatasetFormat.JSON,
+            }
+        )
+        s = Submission.from_spec(1, 5, c, s)
+
+        first = checkAnswer(s, store=self.store)
+        assert 5 in self.store
+        assert checkAnswer(s, store=self.store) == first
+
+    def test_withAnswer(self):
+        truth = pd.DataFrame({"a": [1.0, 2.0]})
+        s = SimpleNamespace(
+            submission_id=1,
+            competition=SimpleNamespace(
+                competition_id=5,
+                type=CompetitionType.PREDICT,
+                metric=CompetitionMetric.ABSDIFF,
+                targets=["a"],
+                dataset="",
+                dataset_type=DatasetFormat.NONE,
+                dataset_kwargs={},
+                dataset_key=None,
+                answer=truth.to_json(),
+                answer_type=DatasetFormat.NONE,
+                expiration=datetime.now() + timedelta(minutes=1),
+            ),
+            answer=truth.to_json(),
+            answer_type=DatasetFormat.NONE,
+        )
+        assert checkAnswer(s, store=self.store) == 0
+        assert 5 in self.store
+
+        # an answer given explicitly wins over the stored one
+        assert checkAnswer(withAnswer(s, truth + 9), store=self.store) == 9
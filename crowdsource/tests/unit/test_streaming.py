@@ -0,0 +1,190 @@
+import functools
+import os
+import tempfile
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import log_loss
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.exceptions import MalformedSubmission
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client, Competition, Submission
+from crowdsource.types.competition import CompetitionSpec
+from crowdsource.types.streaming import RunningAbsDiff, RunningLogLoss, _aligned
+from crowdsource.types.submission import SubmissionSpec
+from crowdsource.types.utils import checkAnswer
+
+
+class _Quiet(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class TestStreaming:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        handler = functools.partial(_Quiet, directory=self.dir.name)
+        self.server = HTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.dir.cleanup()
+
+    def _url(self, name, df):
+        if name.endswith(".parquet"):
+            df.to_parquet(os.path.join(self.dir.name, name), row_group_size=333)
+        else:
+            df.to_csv(os.path.join(self.dir.name, name), index=False)
+        return "http://127.0.0.1:{}/{}".format(self.server.server_port, name)
+
+    def _submission(self, answer, user_answer, fmt, **kwargs):
+        competition = SimpleNamespace(
+            competition_id=1,
+            type=kwargs.get("type", CompetitionType.CLASSIFY),
+            metric=kwargs.get("metric", CompetitionMetric.LOGLOSS),
+            targets=kwargs.get("targets"),
+            dataset="",
+            dataset_type=fmt,
+            dataset_kwargs={},
+            dataset_key=kwargs.get("key"),
+            answer=answer,
+            answer_type=fmt,
+        )
+        return SimpleNamespace(
+            competition=competition, answer=user_answer, answer_type=fmt
+        )
+
+    def test_running_metrics(self):
+        truth = np.random.randint(0, 2, 1000)
+        pred = np.random.rand(1000)
+        metric = RunningLogLoss()
+        for i in range(0, 1000, 128):
+            metric.update(truth[i : i + 128], pred[i : i + 128])
+        assert np.isclose(metric.value(), log_loss(truth, pred))
+
+        metric = RunningAbsDiff()
+        metric.update(np.ones((3, 2)), np.zeros((3, 2)))
+        metric.update(np.ones((1, 2)), np.ones((1, 2)) * 3)
+        # only the first row counts, as when scored in memory
+        assert metric.value() == 2
+
+    def test_aligned(self):
+        left = [pd.DataFrame({"a": range(5)}), pd.DataFrame({"a": range(5, 10)})]
+        right = [pd.DataFrame({"a": range(3)}), pd.DataFrame({"a": range(3, 10)})]
+        pairs = list(_aligned(left, right))
+        assert sum(len(x) for x, _ in pairs) == 10
+        for x, y in pairs:
+            assert (x.values == y.values).all()
+
+        try:
+            list(_aligned(left, right[:1]))
+            assert False
+        except MalformedSubmission:
+            pass
+
+    def test_classify_csv(self):
+        truth = pd.DataFrame({"class": np.random.randint(0, 2, 1000)})
+        pred = pd.DataFrame({"class": np.random.rand(1000)})
+        s = self._submission(
+            self._url("truth.csv", truth),
+            self._url("pred.csv", pred),
+            DatasetFormat.CSV,
+        )
+        score = checkAnswer(s, chunksize=100)
+        assert np.isclose(score, log_loss(truth.values, pred.values))
+
+    def test_predict_parquet(self):
+        truth = pd.DataFrame({"a": np.arange(1000.0), "b": np.arange(1000.0)})
+        pred = truth + 1
+        s = self._submission(
+            self._url("truth.parquet", truth),
+            self._url("pred.parquet", pred),
+            DatasetFormat.PARQUET,
+            type=CompetitionType.PREDICT,
+            metric=CompetitionMetric.ABSDIFF,
+            targets=["a"],
+        )
+        assert checkAnswer(s, chunksize=250) == -1
+
+    def test_chunked_matches_unchunked(self):
+        truth = pd.DataFrame({"class": np.random.randint(0, 2, 1000)})
+        pred = pd.DataFrame({"class": np.random.rand(1000)})
+        for metric in CompetitionMetric:
+            s = self._submission(
+                self._url("truth.csv", truth),
+                self._url("pred.csv", pred),
+                DatasetFormat.CSV,
+                metric=metric,
+            )
+            assert np.isclose(checkAnswer(s, chunksize=100), checkAnswer(s))
+
+    def test_chunked_matches_unchunked_models(self):
+        # models hold type and metric as strings and targets as json
+        engine = createEngine("sqlite:///" + os.path.join(self.dir.name, "test.db"))
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, expire_on_commit=False)
+        session = Session()
+        session.add(Client(username="test", password="test", email="test@test.com"))
+        session.commit()
+
+        truth = pd.DataFrame({"a": [1.0, 0.0, 1.0, 1.0], "b": [3.0, 4.0, 5.0, 6.0]})
+        pred = pd.DataFrame({"a": [0.9, 0.2, 0.6, 0.7], "b": [1.0, 1.0, 1.0, 1.0]})
+        expected = {
+            CompetitionType.CLASSIFY: log_loss(truth[["a"]].values, pred[["a"]].values),
+            CompetitionType.PREDICT: 2.0,
+        }
+        for type, metric, targets in (
+            (CompetitionType.CLASSIFY, CompetitionMetric.LOGLOSS, None),
+            (CompetitionType.PREDICT, CompetitionMetric.ABSDIFF, ["b"]),
+        ):
+            competition = Competition.from_spec(
+                1,
+                CompetitionSpec(
+                    title="test",
+                    type=type,
+                    expiration=datetime.now() + timedelta(days=1),
+                    prize=1.0,
+                    metric=metric,
+                    dataset=self._url(
+                        type.value + "truth.csv", truth[targets or ["a"]]
+                    ),
+                    dataset_type=DatasetFormat.CSV,
+                    targets=targets,
+                ),
+            )
+            session.add(competition)
+            session.commit()
+            session.add(
+                Submission.from_spec(
+                    1,
+                    competition.competition_id,
+                    competition,
+                    SubmissionSpec(
+                        competition.competition_id,
+                        self._url(type.value + "pred.csv", pred[targets or ["a"]]),
+                        DatasetFormat.CSV,
+                    ),
+                )
+            )
+            session.commit()
+
+        scored = []
+        for submission in (
+            Session()
+            .query(Submission)
+            .options(selectinload(Submission.competition))
+            .all()
+        ):
+            score = checkAnswer(submission)
+            assert np.isclose(score, checkAnswer(submission, chunksize=2))
+            scored.append(score)
+        session.close()
+        engine.dispose()
+        assert np.allclose(scored, list(expected.values()))
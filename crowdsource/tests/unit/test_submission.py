@@ -1,4 +1,8 @@
+from types import SimpleNamespace
+
+from crowdsource.exceptions import MalformedSubmission
 from crowdsource.types.submission import SubmissionSpec
+from crowdsource.types.utils import validateAnswer
 
 
 class TestSubmissionSpec:
@@ -16,3 +20,26 @@ class TestSubmissionSpec:
 
         for item in ["competition_id", "answer_type"]:
             assert getattr(s, item) == getattr(s2, item) == getattr(s3, item)
+
+    def test_local_path(self):
+        for answer in ("file:///etc/passwd", "/tmp/answer.csv", "~/answer.csv"):
+            for check in (
+                lambda: SubmissionSpec.from_dict(
+                    {"competition_id": 2, "answer": answer, "answer_type": "csv"}
+                ),
+                lambda: validateAnswer(SimpleNamespace(targets=None), answer),
+            ):
+                try:
+                    check()
+                    assert False
+                except MalformedSubmission:
+                    pass
+
+        spec = SubmissionSpec.from_dict(
+            {
+                "competition_id": 2,
+                "answer": "http://test.com/answer.csv",
+                "answer_type": "csv",
+            }
+        )
+        assert spec.answer == "http://test.com/answer.csv"
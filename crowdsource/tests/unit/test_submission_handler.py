@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os.path
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import tornado.httpserver
+import tornado.web
+from mock import patch
+from perspective import Table
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.enums import CompetitionMetric, CompetitionType, DatasetFormat
+from crowdsource.exceptions import DatasetUnavailable
+from crowdsource.handlers import SubmissionHandler
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client, Competition
+from crowdsource.persistence.users import UserCache
+from crowdsource.types.competition import CompetitionSpec
+
+
+class TestSubmissionHandler:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = createEngine(
+            "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.dataset = os.path.join(self.dir.name, "live.csv")
+        pd.DataFrame({"a": [1.0, 2.0]}).to_csv(self.dataset, index=False)
+
+        session = self.sessionmaker()
+        session.add(Client(username="test", password="test", email="test@test.com"))
+        session.commit()
+        session.add(
+            Competition.from_spec(
+                1,
+                CompetitionSpec(
+                    title="test",
+                    type=CompetitionType.PREDICT,
+                    # open for answer_delay past this
+                    expiration=datetime.now(),
+                    prize=1.0,
+                    metric=CompetitionMetric.ABSDIFF,
+                    dataset=self.dataset,
+                    dataset_type=DatasetFormat.CSV,
+                    targets=["a"],
+                    answer_delay=1,
+                ),
+            )
+        )
+        session.add(
+            Competition.from_spec(
+                1,
+                CompetitionSpec(
+                    title="immediate",
+                    type=CompetitionType.PREDICT,
+                    expiration=datetime.now() + timedelta(days=1),
+                    prize=1.0,
+                    metric=CompetitionMetric.ABSDIFF,
+                    dataset=self.dataset,
+                    dataset_type=DatasetFormat.CSV,
+                    targets=["a"],
+                ),
+            )
+        )
+        session.commit()
+        session.close()
+
+        self.context = {
+            "users": UserCache(self.sessionmaker),
+            "submissions": Table({"a": int}),
+            "all_submissions": Table({"submission_id": int, "score": float}),
+            "leaderboards": Table({"submission_id": int, "score": float}),
+            "prototypes": {},
+            "to_score_later": [],
+        }
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def _run(self, requests):
+        async def run():
+            app = tornado.web.Application(
+                [(r"/submission", SubmissionHandler, self.context)],
+                login_manager=SQLAlchemyLoginManager(
+                    self.sessionmaker, SQLAlchemyLoginManagerOptions()
+                ),
+                cookie_secret="test",
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            cookie = tornado.web.create_signed_value("test", "user", "1").decode()
+            ret = []
+            try:
+                for method, body in requests:
+                    resp = await AsyncHTTPClient().fetch(
+                        "http://127.0.0.1:%d/submission" % port,
+                        method=method,
+                        body=body,
+                        headers={"Cookie": "user=" + cookie},
+                    )
+                    ret.append(json.loads(resp.body))
+            finally:
+                server.stop()
+            return ret
+
+        return asyncio.run(run())
+
+    def _body(self, competition_id):
+        return json.dumps(
+            {
+                "competition_id": competition_id,
+                "submission": {
+                    "competition_id": competition_id,
+                    "answer": pd.DataFrame({"a": [2.0]}).to_json(),
+                    "answer_type": "none",
+                },
+            }
+        )
+
+    def test_score_later(self):
+        body = self._body(1)
+        with patch(
+            "crowdsource.handlers.submission.fetchDataset", side_effect=AssertionError
+        ):
+            # submitting doesn't fetch the dataset
+            (post,) = self._run([("POST", body)])
+        assert post == {"submission_id": 1}
+        assert [p.rows for p in self.context["to_score_later"]] == [None]
+
+        time.sleep(1.1)
+        # expired, but nothing was published since the submission
+        (get,) = self._run([("GET", None)])
+        assert [s["score"] for s in get] == [-1]
+        assert [p.rows for p in self.context["to_score_later"]] == [2]
+
+        pd.DataFrame({"a": [1.0, 2.0, 3.0]}).to_csv(self.dataset, index=False)
+        (get,) = self._run([("GET", None)])
+        # 2.0 scored against the newly published 3.0
+        assert [s["score"] for s in get] == [1.0]
+        assert self.context["to_score_later"] == []
+
+    def test_retry(self):
+        with patch(
+            "crowdsource.handlers.submission.checkAnswer",
+            side_effect=[DatasetUnavailable("test"), 5.0],
+        ):
+            (post,) = self._run([("POST", self._body(2))])
+            assert (post["score"], post["status"]) == (-1, "unavailable")
+            assert [p.retry for p in self.context["to_score_later"]] == [True]
+
+            # the host is back by the next request
+            (get,) = self._run([("GET", None)])
+        assert [s["score"] for s in get] == [5]
+        assert self.context["to_score_later"] == []
@@ -5,7 +5,15 @@ import pandas as pd
 from datetime import datetime, timedelta
 from sklearn.datasets import make_classification
 
-from crowdsource.types.utils import _metric, checkAnswer, fetchDataset, answerPrototype
+from crowdsource.types.utils import (
+    _metric,
+    checkAnswer,
+    fetchDataset,
+    answerPrototype,
+    liveAnswer,
+    validateAnswer,
+)
+from crowdsource.exceptions import MalformedSubmission
 from crowdsource.persistence.models import Competition, Submission
 from crowdsource.types.competition import CompetitionSpec
 from crowdsource.types.submission import SubmissionSpec
@@ -157,3 +165,91 @@ class TestUtils:
         s = Submission.from_spec(1, 2, c2, s2)
 
         checkAnswer(s)
+
+    def test_validateAnswer(self):
+        dataset = make_classification()
+        competition = CompetitionSpec(
+            title="",
+            type=CompetitionType.CLASSIFY,
+            expiration=datetime.now() + timedelta(minutes=1),
+            prize=1.0,
+            num_classes=2,
+            dataset=pd.DataFrame(dataset[0]),
+            metric=CompetitionMetric.LOGLOSS,
+            answer=pd.DataFrame(dataset[1]),
+        )
+        prototype = answerPrototype(competition, competition.dataset)
+        validateAnswer(competition, pd.DataFrame(dataset[1]), prototype)
+
+        # remote answers are checked when scoring
+        validateAnswer(competition, "http://test.com", prototype)
+
+        for bad in (
+            pd.DataFrame(),
+            pd.DataFrame(dataset[1][:10]),
+            pd.DataFrame(["a"] * 100),
+            pd.DataFrame([None] * 100, dtype=float),
+        ):
+            try:
+                validateAnswer(competition, bad, prototype)
+                assert False
+            except MalformedSubmission:
+                pass
+
+    def test_validateAnswer2(self):
+        competition = CompetitionSpec(
+            title="",
+            type=CompetitionType.PREDICT,
+            expiration=datetime.now() + timedelta(minutes=1),
+            prize=1.0,
+            dataset="http://test.com",
+            dataset_type=DatasetFormat.JSON,
+            dataset_key="Name",
+            metric=CompetitionMetric.ABSDIFF,
+            targets={"ABC Corp": ["Price"]},
+        )
+        validateAnswer(
+            competition, pd.DataFrame({"Name": ["ABC Corp"], "Price": [1.0]})
+        )
+
+        for bad in (
+            pd.DataFrame({"Name": ["ABC Corp"]}),
+            pd.DataFrame({"Name": ["XYZ Corp"], "Price": [1.0]}),
+            pd.DataFrame({"Name": ["ABC Corp"], "Price": ["1.0"]}),
+        ):
+            try:
+                validateAnswer(competition, bad)
+                assert False
+            except MalformedSubmission:
+                pass
+
+    def test_liveAnswer(self):
+        competition = CompetitionSpec(
+            title="",
+            type=CompetitionType.PREDICT,
+            expiration=datetime.now() + timedelta(minutes=1),
+            prize=1.0,
+            dataset="http://test.com",
+            dataset_type=DatasetFormat.JSON,
+            dataset_key="Name",
+            metric=CompetitionMetric.ABSDIFF,
+            targets={"ABC Corp": ["Price"]},
+        )
+        dataset = pd.DataFrame(
+            {
+                "Name": ["ABC Corp", "XYZ Corp", "ABC Corp", "XYZ Corp"],
+                "Price": [1.0, 2.0, 3.0, 4.0],
+                "Volume": [5, 6, 7, 8],
+            },
+            index=[0, 0, 1, 1],
+        )
+        answer = liveAnswer(competition, dataset)
+        assert list(answer.columns) == ["Name", "Price"]
+        assert answer["Price"].tolist() == [3.0]
+
+        assert liveAnswer(competition, dataset[dataset["Name"] == "XYZ Corp"]) is None
+
+        with patch("crowdsource.types.utils.fetchDataset") as m:
+            m.return_value = dataset
+            assert liveAnswer(competition)["Price"].tolist() == [3.0]
+            assert m.call_count == 1
@@ -0,0 +1,102 @@
+import asyncio
+import os.path
+import tempfile
+import time
+from urllib.parse import urlencode
+
+import tornado.httpserver
+import tornado.web
+from sqlalchemy.orm import sessionmaker
+from tornado.httpclient import AsyncHTTPClient
+from tornado.testing import bind_unused_port
+from tornado_sqlalchemy_login import (
+    SQLAlchemyLoginManager,
+    SQLAlchemyLoginManagerOptions,
+)
+
+from crowdsource.handlers import RegisterHandler
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Client
+from crowdsource.persistence.users import UserCache
+
+
+class TestUsers:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = createEngine(
+            "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        session = self.sessionmaker()
+        session.add(Client(username="test", password="test", email="test@test.com"))
+        session.commit()
+        session.close()
+
+    def teardown_method(self):
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def _add(self, username, admin=False):
+        session = self.sessionmaker()
+        user = Client(
+            username=username,
+            password="test",
+            email=username + "@test.com",
+            admin=admin,
+        )
+        session.add(user)
+        session.commit()
+        session.close()
+        return user.id
+
+    def test_cache(self):
+        users = UserCache(self.sessionmaker, ttl=60, negative_ttl=60)
+        assert 1 in users
+        assert 1 in users
+        assert "1" in users
+        assert (users.hits, users.misses) == (2, 1)
+
+        # unknown ids are remembered, until invalidated
+        assert 2 not in users
+        user_id = self._add("new")
+        assert user_id not in users
+        users.invalidate(user_id)
+        assert user_id in users
+
+    def test_ttl(self):
+        users = UserCache(self.sessionmaker, ttl=0.1, negative_ttl=0.1)
+        assert 2 not in users
+        self._add("new")
+        time.sleep(0.2)
+        assert 2 in users
+
+    def test_register(self):
+        users = UserCache(self.sessionmaker, negative_ttl=60)
+        assert 2 not in users
+
+        async def run():
+            app = tornado.web.Application(
+                [(r"/register", RegisterHandler, {"users": users})],
+                login_manager=SQLAlchemyLoginManager(
+                    self.sessionmaker, SQLAlchemyLoginManagerOptions()
+                ),
+                cookie_secret="test",
+            )
+            sock, port = bind_unused_port()
+            server = tornado.httpserver.HTTPServer(app)
+            server.add_sockets([sock])
+            try:
+                await AsyncHTTPClient().fetch(
+                    "http://127.0.0.1:%d/register" % port,
+                    method="POST",
+                    body=urlencode(
+                        {"username": "new", "password": "new", "email": "new@new.com"}
+                    ),
+                )
+            finally:
+                server.stop()
+
+        asyncio.run(run())
+        # registering dropped the cached miss
+        assert 2 in users
@@ -0,0 +1,105 @@
+import os.path
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from crowdsource.enums import CompetitionMetric, CompetitionType
+from crowdsource.persistence.engine import createEngine
+from crowdsource.persistence.models import Base, Competition, Submission
+from crowdsource.persistence.writer import GroupCommitWriter
+from crowdsource.types.competition import CompetitionSpec
+
+
+class TestWriter:
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.engine = createEngine(
+            "sqlite:///" + os.path.join(self.dir.name, "test.db")
+        )
+        Base.metadata.create_all(self.engine)
+        self.sessionmaker = sessionmaker(bind=self.engine, expire_on_commit=False)
+        session = self.sessionmaker()
+        session.add(
+            Competition.from_spec(
+                1,
+                CompetitionSpec(
+                    title="test",
+                    type=CompetitionType.CLASSIFY,
+                    expiration=datetime.now() + timedelta(days=1),
+                    prize=1.0,
+                    metric=CompetitionMetric.ABSDIFF,
+                    dataset="",
+                ),
+            )
+        )
+        session.commit()
+        session.close()
+        self.writer = GroupCommitWriter(self.sessionmaker, interval=0.05)
+
+    def teardown_method(self):
+        self.writer.close()
+        self.engine.dispose()
+        self.dir.cleanup()
+
+    def _submission(self, score=-1):
+        return Submission(
+            user_id=1,
+            competition_id=1,
+            score=score,
+            answer="",
+            answer_type="none",
+            timestamp=datetime.now(),
+        )
+
+    def test_batches(self):
+        barrier = threading.Barrier(20)
+        results = []
+
+        def submit(i):
+            barrier.wait()
+            results.append(self.writer.add(self._submission(i)).result())
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        # everyone got their row back with its id, in fewer commits than rows
+        assert sorted(s.score for s in results) == list(range(20))
+        assert all(s.submission_id for s in results)
+        assert self.writer.writes == 20
+        assert self.writer.batches < 20
+
+        session = self.sessionmaker()
+        assert session.query(Submission).count() == 20
+        session.close()
+
+    def test_failure(self):
+        def fail(session):
+            raise ValueError("bad write")
+
+        good = self.writer.add(self._submission())
+        bad = self.writer.submit(fail)
+        other = self.writer.add(self._submission())
+
+        # only the failing caller sees the error
+        with pytest.raises(ValueError):
+            bad.result()
+        assert good.result().submission_id
+        assert other.result().submission_id
+
+    def test_update(self):
+        submission_id = self.writer.add(self._submission()).result().submission_id
+        self.writer.submit(
+            lambda session: session.query(Submission)
+            .filter_by(submission_id=submission_id)
+            .update({"score": 5})
+        ).result()
+
+        session = self.sessionmaker()
+        assert session.query(Submission).one().score == 5
+        session.close()
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import os.path
+import tempfile
+import threading
+
+import ujson
+
+from ..exceptions import DatasetTooLarge, MalformedDataset
+from .fetch import Slot, chunks, get, maxSize
+
+_default = None
+
+
+def setDatasetCache(cache):
+    """Set the DatasetCache used for all remote dataset fetches, None to disable"""
+    global _default
+    _default = cache
+
+
+def datasetCache():
+    return _default
+
+
+class DatasetCache(object):
+    def __init__(self, root, max_size=1 << 30):
+        """Size bounded, on-disk cache of remote datasets
+
+        Bodies are kept on disk keyed on url and request kwargs, and revalidated
+        with If-None-Match/If-Modified-Since so unchanged datasets are served
+        from disk. Least recently used entries are evicted past `max_size` bytes.
+
+        Arguments:
+            root {str} -- directory to cache datasets in
+            max_size {int} -- total bytes of cached bodies to keep
+        """
+        self.root = root
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url, kwargs):
+        kwargs = {k: str(v) for k, v in sorted(kwargs.items())}
+        key = hashlib.sha256(ujson.dumps([url, kwargs]).encode("utf8")).hexdigest()
+        base = os.path.join(self.root, key)
+        return base + ".body", base + ".json"
+
+    def _meta(self, body, meta):
+        if not os.path.exists(body) or not os.path.exists(meta):
+            return {}
+        try:
+            with open(meta, "r") as fp:
+                return ujson.loads(fp.read())
+        except ValueError:
+            return {}
+
+    def open(self, url, cookies=None, proxies=None, max_size=None, **kwargs):
+        """Open `url` as a binary file, from disk if the cached copy is still valid"""
+        max_size = maxSize(max_size)
+        body, meta = self._paths(url, dict(cookies=cookies, proxies=proxies, **kwargs))
+        cached = self._meta(body, meta)
+
+        headers = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        with Slot(url):
+            resp = get(url, headers=headers, cookies=cookies, proxies=proxies)
+
+            if resp.status_code == 304 and cached:
+                resp.close()
+                try:
+                    fp = open(body, "rb")
+                except FileNotFoundError:
+                    # evicted since we read its metadata, fetch it in full
+                    fp = None
+                    resp = get(url, cookies=cookies, proxies=proxies)
+                if fp is not None:
+                    if max_size and os.fstat(fp.fileno()).st_size > max_size:
+                        fp.close()
+                        raise DatasetTooLarge(max_size)
+                    # mark as recently used
+                    try:
+                        os.utime(body)
+                    except OSError:
+                        pass
+                    return fp
+
+            if resp.status_code != 200:
+                resp.close()
+                raise MalformedDataset()
+
+            if max_size and int(resp.headers.get("Content-Length") or 0) > max_size:
+                resp.close()
+                raise DatasetTooLarge(max_size)
+
+            # write to a scratch file and rename, readers never see partial bodies
+            fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp")
+            try:
+                size = 0
+                with os.fdopen(fd, "wb") as fp:
+                    for chunk in chunks(resp):
+                        size += len(chunk)
+                        if max_size and size > max_size:
+                            raise DatasetTooLarge(max_size)
+                        fp.write(chunk)
+                os.replace(tmp, body)
+            finally:
+                resp.close()
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        with open(meta, "w") as fp:
+            fp.write(
+                ujson.dumps(
+                    {
+                        "url": url,
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                    }
+                )
+            )
+
+        ret = open(body, "rb")
+        self.evict()
+        return ret
+
+    def size(self):
+        return sum(
+            os.path.getsize(os.path.join(self.root, f))
+            for f in os.listdir(self.root)
+            if f.endswith(".body")
+        )
+
+    def evict(self):
+        """Drop least recently used bodies until under max_size"""
+        with self._lock:
+            entries = []
+            for f in os.listdir(self.root):
+                if not f.endswith(".body"):
+                    continue
+                path = os.path.join(self.root, f)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(e[1] for e in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_size:
+                    break
+                for p in (path, path[: -len(".body")] + ".json"):
+                    try:
+                        os.remove(p)
+                    except OSError:
+                        pass
+                total -= size
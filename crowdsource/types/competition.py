@@ -4,7 +4,6 @@ from datetime import datetime
 import pandas
 import six
 import ujson
-import validators
 from traitlets import HasTraits
 
 from ..enums import CompetitionMetric, CompetitionType, DatasetFormat
@@ -14,6 +13,7 @@ from ..exceptions import (
     MalformedMetric,
     MalformedTargets,
 )
+from .fetch import isSource
 
 
 class CompetitionSpec(HasTraits):
@@ -64,7 +64,7 @@ class CompetitionSpec(HasTraits):
         # provide dataset if available
         self.dataset = dataset
 
-        if isinstance(dataset, six.string_types) and validators.url(dataset):
+        if isSource(dataset):
             self.dataset_type = dataset_type
         else:
             self.dataset_type = DatasetFormat.NONE
@@ -82,7 +82,7 @@ class CompetitionSpec(HasTraits):
         self.when = when
 
         self.answer = answer
-        if isinstance(answer, six.string_types) and validators.url(answer):
+        if isSource(answer):
             self.answer_type = (
                 self.dataset_type if answer_type == DatasetFormat.NONE else answer_type
             )
@@ -159,7 +159,7 @@ class CompetitionSpec(HasTraits):
                 d[k] = DatasetFormat(v)
             elif k == "dataset" or k == "answer":
                 if isinstance(v, six.string_types):
-                    if v in ("", "hidden") or validators.url(v):
+                    if v in ("", "hidden") or isSource(v):
                         d[k] = v
                     else:
                         v = ujson.loads(v)
@@ -221,7 +221,7 @@ class CompetitionSpec(HasTraits):
         if not isinstance(metric, CompetitionMetric):
             raise MalformedMetric()
 
-        if isinstance(dataset, six.string_types) and validators.url(dataset):
+        if isSource(dataset):
             if not isinstance(dataset_type, DatasetFormat):
                 raise MalformedDataset()
 
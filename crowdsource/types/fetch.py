@@ -0,0 +1,358 @@
+import contextvars
+import io
+import os
+import os.path
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+import validators
+from six import string_types
+from six.moves.urllib.parse import urlparse
+from six.moves.urllib.request import url2pathname
+from urllib3.exceptions import HTTPError
+
+from ..exceptions import DatasetTooLarge, DatasetUnavailable, MalformedDataset
+
+_lock = threading.Lock()
+_options = {
+    # concurrent connections allowed to any one dataset host
+    "connections_per_host": 4,
+    # seconds to wait for a free connection before failing
+    "pool_timeout": 10,
+    # threads available to fetch datasets in parallel
+    "workers": 8,
+    # seconds to establish a connection, and between bytes received
+    "connect_timeout": 5,
+    "read_timeout": 30,
+    # bytes downloaded per dataset when the caller sets no limit, 0 to disable
+    "max_size": 256 << 20,
+    # consecutive failures before a host is skipped, and for how many seconds
+    "breaker_threshold": 5,
+    "breaker_cooldown": 30,
+    # directories local datasets may be read from, None for anywhere
+    "local_roots": None,
+}
+_session = None
+_executor = None
+_slots = {}
+_breakers = {}
+# hosts whose slot the current scoring job already holds
+_held = contextvars.ContextVar("held", default=frozenset())
+
+
+def configure(**options):
+    """Update fetch options, applies to connections opened afterwards"""
+    global _session, _executor
+    with _lock:
+        _options.update(options)
+        _session = None
+        _executor = None
+        _slots.clear()
+        _breakers.clear()
+
+
+def options():
+    return dict(_options)
+
+
+def session():
+    """Shared requests session so connections to dataset hosts are reused"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=16, pool_maxsize=_options["connections_per_host"]
+            )
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def executor():
+    """Shared pool for fetching datasets concurrently"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(_options["workers"])
+        return _executor
+
+
+def localPath(data):
+    """Filesystem path a file:// url or plain path refers to, None for anything else"""
+    if not isinstance(data, string_types):
+        return None
+    if data.startswith("file://"):
+        return url2pathname(urlparse(data).path)
+    if data.startswith(("/", "./", "../", "~")) or (
+        os.name == "nt" and len(data) > 2 and data[1:3] in (":\\", ":/")
+    ):
+        return os.path.expanduser(data)
+    return None
+
+
+def isSource(data):
+    """Whether `data` points at a dataset, by url or local path, rather than holding one"""
+    return isinstance(data, string_types) and bool(
+        validators.url(data) or localPath(data)
+    )
+
+
+def checkLocal(path):
+    """Resolve `path`, raising MalformedDataset unless it is a file under local_roots"""
+    real = os.path.realpath(path)
+    roots = _options["local_roots"]
+    if roots is not None and not any(
+        real.startswith(os.path.join(os.path.realpath(root), "")) for root in roots
+    ):
+        raise MalformedDataset()
+    if not os.path.isfile(real):
+        raise MalformedDataset()
+    return real
+
+
+def maxSize(max_size=None):
+    """`max_size` if the caller gave one, otherwise the configured default"""
+    return _options["max_size"] if max_size is None else max_size
+
+
+class CircuitBreaker(object):
+    def __init__(self, threshold=5, cooldown=30):
+        """Stop calling a host after `threshold` consecutive failures
+
+        Once open, calls fail fast for `cooldown` seconds, after which a
+        single trial call is let through to probe the host again.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened is None:
+                return True
+            if time.monotonic() - self.opened >= self.cooldown:
+                # half open, rearm so only this caller probes
+                self.opened = time.monotonic()
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened = time.monotonic()
+
+
+def _breaker(host):
+    with _lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(
+                _options["breaker_threshold"], _options["breaker_cooldown"]
+            )
+        return _breakers[host]
+
+
+def allow(hosts):
+    """Raise DatasetUnavailable if the breaker of any of `hosts` is open"""
+    for host in hosts:
+        if not _breaker(host).allow():
+            raise DatasetUnavailable(host)
+
+
+def outcomes():
+    """{host: consecutive failures} as seen by this process's breakers"""
+    with _lock:
+        breakers = dict(_breakers)
+    return {host: breaker.failures for host, breaker in breakers.items()}
+
+
+def record(outcomes):
+    """Apply another process's outcomes() to this process's breakers"""
+    for host, failures in outcomes.items():
+        breaker = _breaker(host)
+        if not failures:
+            breaker.success()
+        for _ in range(failures):
+            breaker.failure()
+
+
+def _semaphore(host):
+    with _lock:
+        if host not in _slots:
+            _slots[host] = threading.BoundedSemaphore(_options["connections_per_host"])
+        return _slots[host]
+
+
+def hosts(*sources):
+    """Sorted hosts of the urls among `sources`, local paths and inline data have none"""
+    return sorted(
+        set(
+            urlparse(s).netloc
+            for s in sources
+            if isinstance(s, string_types) and validators.url(s)
+        )
+    )
+
+
+@contextmanager
+def slots(hosts):
+    """Hold one slot on each of `hosts` for the duration of a scoring job
+
+    Taken in sorted order against a single pool_timeout deadline, so jobs
+    spanning several hosts can't deadlock each other. Slots opened within,
+    in this context, reuse the job's rather than waiting on a second slot
+    of the same host. Used by the sandbox to cap connections per host
+    across all its scoring processes.
+    """
+    already = _held.get()
+    deadline = time.monotonic() + _options["pool_timeout"]
+    held = []
+    try:
+        for host in sorted(set(hosts) - already):
+            semaphore = _semaphore(host)
+            if not semaphore.acquire(timeout=max(0, deadline - time.monotonic())):
+                raise DatasetUnavailable(host)
+            held.append(semaphore)
+        token = _held.set(already | frozenset(hosts))
+        try:
+            yield
+        finally:
+            _held.reset(token)
+    finally:
+        for semaphore in held:
+            semaphore.release()
+
+
+class Slot(object):
+    def __init__(self, url):
+        """One of the connections_per_host slots for the host of `url`
+
+        Fails with DatasetUnavailable if none frees up within pool_timeout, so
+        a slow host can only tie up connections_per_host threads at a time.
+        Within slots(), the job's slot for the host is used instead.
+        """
+        host = urlparse(url).netloc
+        self._semaphore = _semaphore(host)
+        if host in _held.get():
+            self._held = False
+            return
+        self._held = self._semaphore.acquire(timeout=_options["pool_timeout"])
+        if not self._held:
+            raise DatasetUnavailable(host)
+
+    def release(self):
+        if self._held:
+            self._held = False
+            self._semaphore.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+def get(url, **kwargs):
+    """Streaming GET of `url` with timeouts, failing fast while its host is broken"""
+    host = urlparse(url).netloc
+    breaker = _breaker(host)
+    if not breaker.allow():
+        raise DatasetUnavailable(host)
+
+    try:
+        resp = session().get(
+            url,
+            stream=True,
+            timeout=(_options["connect_timeout"], _options["read_timeout"]),
+            **kwargs
+        )
+    except requests.RequestException:
+        breaker.failure()
+        raise DatasetUnavailable(host)
+
+    if resp.status_code >= 500:
+        breaker.failure()
+    else:
+        breaker.success()
+    return resp
+
+
+def _failure(resp):
+    """Record a transfer that broke off mid body, returns the error to raise"""
+    host = urlparse(resp.url).netloc
+    _breaker(host).failure()
+    return DatasetUnavailable(host)
+
+
+def chunks(resp, size=1 << 16):
+    """Iterate over the decoded body of `resp`, failing on stalls like `get` does"""
+    try:
+        for chunk in resp.raw.stream(size, decode_content=True):
+            yield chunk
+    except (HTTPError, OSError):
+        raise _failure(resp)
+
+
+class _Stream(io.RawIOBase):
+    """File-like view of a response body that stops after `max_size` bytes"""
+
+    def __init__(self, resp, slot, max_size=None):
+        self._resp = resp
+        self._slot = slot
+        self._max_size = max_size
+        self._read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        try:
+            data = self._resp.raw.read(len(b))
+        except (HTTPError, OSError):
+            # stalled or dropped mid body
+            raise _failure(self._resp)
+        n = len(data)
+        b[:n] = data
+        self._read += n
+        if self._max_size and self._read > self._max_size:
+            raise DatasetTooLarge(self._max_size)
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._resp.close()
+            self._slot.release()
+        super(_Stream, self).close()
+
+
+def openStream(url, cookies=None, proxies=None, max_size=None):
+    """Open `url` as a buffered binary stream without reading the body up front"""
+    max_size = maxSize(max_size)
+    slot = Slot(url)
+    try:
+        resp = get(url, cookies=cookies, proxies=proxies)
+        if resp.status_code != 200:
+            resp.close()
+            raise MalformedDataset()
+        if max_size and int(resp.headers.get("Content-Length") or 0) > max_size:
+            resp.close()
+            raise DatasetTooLarge(max_size)
+    except BaseException:
+        slot.release()
+        raise
+
+    # undo any content-encoding as we read
+    resp.raw.decode_content = True
+    return io.BufferedReader(_Stream(resp, slot, max_size), 1 << 16)
@@ -0,0 +1,223 @@
+import logging
+import multiprocessing
+from types import SimpleNamespace
+
+from six import string_types
+
+from .. import metrics
+from ..enums import DatasetFormat, ScoringStatus
+from ..exceptions import DatasetTooLarge, DatasetUnavailable
+from .fetch import allow, hosts, options, record, slots
+
+try:
+    import resource
+except ImportError:
+    # not available on windows, memory limits are not enforced there
+    resource = None
+
+
+_COMPETITION_FIELDS = (
+    "competition_id",
+    "expiration",
+    "type",
+    "metric",
+    "targets",
+    "dataset",
+    "dataset_type",
+    "dataset_kwargs",
+    "dataset_key",
+    "answer",
+    "answer_type",
+)
+
+_SUBMISSION_FIELDS = ("submission_id", "answer", "answer_type")
+
+
+def _payload(submission):
+    """Extract the picklable fields checkAnswer needs from a submission"""
+    competition = {f: getattr(submission.competition, f) for f in _COMPETITION_FIELDS}
+    ret = {f: getattr(submission, f) for f in _SUBMISSION_FIELDS}
+    ret["competition"] = competition
+    return ret
+
+
+def _hosts(payload):
+    """Dataset hosts a scoring job for `payload` may fetch from"""
+    competition = payload["competition"]
+    answer = competition["answer"]
+    if isinstance(answer, string_types) and not answer:
+        answer = competition["dataset"]
+    return hosts(answer, payload["answer"])
+
+
+def withAnswer(submission, answer):
+    """Detached copy of `submission` scored against `answer` instead of the competition's
+
+    The copy has no competition_id, so stored answers and snapshots of the
+    competition don't take precedence over `answer`.
+    """
+    payload = _payload(submission)
+    ret = SimpleNamespace(**payload)
+    ret.competition = SimpleNamespace(**payload["competition"])
+    ret.competition.competition_id = None
+    ret.competition.answer = answer
+    ret.competition.answer_type = DatasetFormat.NONE.value
+    return ret
+
+
+def _score(
+    conn, payload, memory, max_download, chunksize, store, cache, snapshots, fetch
+):
+    """Entrypoint of the scoring subprocess, sends (status, score, report) back over `conn`
+
+    The report carries what the parent keeps track of across jobs: how
+    each dataset host behaved for its circuit breakers, and the time spent
+    in each stage of scoring for its metrics.
+    """
+    from .cache import DatasetCache, setDatasetCache
+    from .fetch import configure, outcomes
+    from .snapshot import DatasetSnapshots, setDatasetSnapshots
+    from .store import AnswerStore
+    from .utils import checkAnswer
+
+    configure(**fetch)
+    if cache:
+        setDatasetCache(DatasetCache(*cache))
+    if snapshots:
+        setDatasetSnapshots(DatasetSnapshots(snapshots))
+
+    if memory and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+    submission = SimpleNamespace(**payload)
+    submission.competition = SimpleNamespace(**payload["competition"])
+
+    try:
+        with metrics.recording() as timings:
+            score = checkAnswer(
+                submission,
+                max_size=max_download,
+                chunksize=chunksize,
+                store=AnswerStore(store) if store else None,
+            )
+        ret = (ScoringStatus.SCORED.value, float(score))
+    except MemoryError:
+        ret = (ScoringStatus.MEMORY.value, None)
+    except DatasetTooLarge:
+        ret = (ScoringStatus.TOO_LARGE.value, None)
+    except DatasetUnavailable as e:
+        ret = (ScoringStatus.UNAVAILABLE.value, str(e))
+    except BaseException as e:
+        ret = (ScoringStatus.FAILED.value, repr(e))
+
+    try:
+        conn.send(ret + ({"hosts": outcomes(), "timings": timings},))
+    finally:
+        conn.close()
+
+
+def _context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        # fork from a clean, single threaded server with pandas already imported
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(["crowdsource.types.utils"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+class ScoringSandbox(object):
+    def __init__(
+        self,
+        timeout=60,
+        memory=2 << 30,
+        max_download=256 << 20,
+        chunksize=0,
+        store="",
+        cache=None,
+        snapshots="",
+    ):
+        """Run checkAnswer in a resource limited subprocess
+
+        Arguments:
+            timeout {int} -- wall clock seconds allowed per scoring job
+            memory {int} -- address space limit in bytes (RLIMIT_AS), 0 to disable
+            max_download {int} -- maximum bytes fetched per remote dataset, 0 to disable
+            chunksize {int} -- stream remote answers in chunks of this many rows, 0 to disable
+            store {str} -- directory of an AnswerStore for resolved answers, empty to disable
+            cache {tuple} -- (directory, max_size) of a DatasetCache for remote fetches
+            snapshots {str} -- directory of DatasetSnapshots to score against, empty to disable
+        """
+        self.timeout = timeout
+        self.memory = memory
+        self.max_download = max_download
+        self.chunksize = chunksize
+        self.store = store
+        self.cache = cache
+        self.snapshots = snapshots
+        self._ctx = _context()
+
+    def score(self, submission):
+        """Score `submission`, returning a (ScoringStatus, score or None) tuple
+
+        Each job holds a slot on the hosts it fetches from while it runs, so
+        connections_per_host applies across every scoring process rather
+        than within each. Circuit breakers are kept here too, checked before
+        a job starts and fed with what the job saw of its hosts.
+        """
+        payload = _payload(submission)
+        try:
+            job_hosts = _hosts(payload)
+            allow(job_hosts)
+            with slots(job_hosts):
+                status, value, report = self._run(payload)
+            record(report.get("hosts", {}))
+            metrics.observeScoring(report.get("timings", ()))
+        except DatasetUnavailable as e:
+            status, value = ScoringStatus.UNAVAILABLE.value, str(e)
+
+        status = ScoringStatus(status)
+        if status != ScoringStatus.SCORED:
+            logging.warning(
+                "Scoring submission %s failed: %s %s",
+                submission.submission_id,
+                status.value,
+                value or "",
+            )
+            value = None
+        return status, value
+
+    def _run(self, payload):
+        """Score `payload` in a subprocess, returns the (status, value, report) it sent back"""
+        recv, send = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_score,
+            args=(
+                send,
+                payload,
+                self.memory,
+                self.max_download,
+                self.chunksize,
+                self.store,
+                self.cache,
+                self.snapshots,
+                options(),
+            ),
+            daemon=True,
+        )
+        proc.start()
+        send.close()
+
+        status, value, report = ScoringStatus.TIMEOUT.value, None, {}
+        try:
+            if recv.poll(self.timeout):
+                status, value, report = recv.recv()
+        except EOFError:
+            # child died without reporting, e.g. crashed in native code
+            status = ScoringStatus.FAILED.value
+        finally:
+            recv.close()
+            proc.join(1)
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        return status, value, report
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import os.path
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import ujson
+
+from ..enums import DatasetFormat
+from .fetch import isSource
+
+_default = None
+
+
+def setDatasetSnapshots(snapshots):
+    """Set the DatasetSnapshots scoring resolves ground truth from, None to disable"""
+    global _default
+    _default = snapshots
+
+
+def datasetSnapshots():
+    return _default
+
+
+def groundTruthSource(competition):
+    """The (url or path, format) a competition's ground truth is read from, None if inline"""
+    answer, answer_type = competition.answer, competition.answer_type
+    if not answer:
+        answer, answer_type = competition.dataset, competition.dataset_type
+    if not isSource(answer):
+        return None
+    if isinstance(answer_type, DatasetFormat):
+        answer_type = answer_type.value
+    return answer, answer_type
+
+
+class DatasetSnapshots(object):
+    def __init__(self, root, retries=8, backoff=60):
+        """Content-addressed, versioned snapshots of competitions' remote ground truth
+
+        Bodies are stored once under their sha256, and each competition gets a
+        manifest listing the versions captured for it. Scoring reads the
+        current version, so it never goes back to the network and a rescore
+        sees exactly the data the first one did.
+
+        Competitions whose captures fail are retried after `backoff` seconds,
+        doubling each time, and given up on after `retries` failures.
+
+        Arguments:
+            root {str} -- directory to keep snapshots in
+            retries {int} -- failed captures before giving up on a competition
+            backoff {int} -- seconds before retrying a first failed capture
+        """
+        self.root = root
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        # competition_id -> (failures, next attempt), and those never to capture
+        self._failures = {}
+        self._skip = set()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+    def _manifest(self, competition_id):
+        return os.path.join(self.root, "%s.json" % competition_id)
+
+    def object(self, sha256):
+        return os.path.join(self.root, "objects", sha256)
+
+    def __contains__(self, competition_id):
+        return os.path.exists(self._manifest(competition_id))
+
+    def manifest(self, competition_id):
+        """Versions captured for `competition_id`, empty if none"""
+        if competition_id not in self:
+            return {}
+        with open(self._manifest(competition_id), "r") as fp:
+            return ujson.loads(fp.read())
+
+    def current(self, competition_id):
+        """The version scoring uses, None if nothing was captured"""
+        manifest = self.manifest(competition_id)
+        for version in manifest.get("versions", []):
+            if version["sha256"] == manifest["current"]:
+                return version
+        return None
+
+    def wanted(self, competition_id, now=None):
+        """Whether `competition_id` still needs a capture and may be tried by `now`"""
+        if competition_id in self._skip or competition_id in self:
+            return False
+        failures = self._failures.get(competition_id)
+        return failures is None or failures[1] <= (now or datetime.now())
+
+    def skip(self, competition_id):
+        """Never try to capture `competition_id`, e.g. as its ground truth is inline"""
+        self._skip.add(competition_id)
+
+    def failed(self, competition_id, now=None):
+        """Record a failed capture of `competition_id`, False once given up on"""
+        failures = self._failures.get(competition_id, (0, None))[0] + 1
+        if failures >= self.retries:
+            self._failures.pop(competition_id, None)
+            self.skip(competition_id)
+            return False
+        self._failures[competition_id] = (
+            failures,
+            (now or datetime.now())
+            + timedelta(seconds=self.backoff * 2 ** (failures - 1)),
+        )
+        return True
+
+    def capture(self, competition, force=False):
+        """Snapshot the ground truth of `competition`, first capture wins unless `force`"""
+        from .utils import _open
+
+        competition_id = competition.competition_id
+        source = groundTruthSource(competition)
+        if source is None or (competition_id in self and not force):
+            return self.current(competition_id)
+        url, data_type = source
+
+        # hash while copying to a scratch file, then file under the hash
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as out, _open(url) as fp:
+                for chunk in iter(lambda: fp.read(1 << 20), b""):
+                    digest.update(chunk)
+                    out.write(chunk)
+            sha256 = digest.hexdigest()
+            size = os.path.getsize(tmp)
+            if not os.path.exists(self.object(sha256)):
+                shutil.move(tmp, self.object(sha256))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        version = {
+            "sha256": sha256,
+            "url": url,
+            "format": data_type,
+            "size": size,
+            "captured": datetime.now().isoformat(),
+        }
+        with self._lock:
+            if competition_id in self and not force:
+                # someone else captured it first
+                return self.current(competition_id)
+            manifest = self.manifest(competition_id) or {"versions": []}
+            manifest["versions"].append(version)
+            manifest["current"] = sha256
+            with open(self._manifest(competition_id) + ".tmp", "w") as fp:
+                fp.write(ujson.dumps(manifest))
+            os.replace(
+                self._manifest(competition_id) + ".tmp", self._manifest(competition_id)
+            )
+        return version
+
+    def load(self, competition_id, **kwargs):
+        """DataFrame of the current version for `competition_id`, None if not captured"""
+        from .utils import _decompress, _parse
+
+        version = self.current(competition_id)
+        if version is None:
+            return None
+        with open(self.object(version["sha256"]), "rb") as fp:
+            fp = _decompress(fp, kwargs.get("compression", "infer"), version["url"])
+            return _parse(
+                fp, DatasetFormat(version["format"]), kwargs.get("record_column", "")
+            )
+
+
+def due(competition, now=None):
+    """Whether the ground truth of `competition` should be frozen by now"""
+    now = now or datetime.now()
+    return now >= (competition.when or competition.expiration)
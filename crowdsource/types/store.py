@@ -0,0 +1,96 @@
+import os
+import os.path
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import ujson
+
+_INDEX = "__index__"
+_META = "meta.json"
+
+
+def _array(series):
+    """Typed numpy array for `series`, object columns become fixed width unicode"""
+    values = series.values
+    if values.dtype == object:
+        values = series.astype(str).values.astype("U")
+    return np.ascontiguousarray(values)
+
+
+class AnswerStore(object):
+    def __init__(self, root):
+        """On-disk store of resolved competition answers as memory-mappable .npy files
+
+        Each competition gets a directory holding one array per column plus
+        the index, so scoring processes can np.load(mmap_mode="r") them and
+        share one physical copy through the page cache.
+
+        Arguments:
+            root {str} -- directory to keep answers in
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, competition_id):
+        return os.path.join(self.root, str(competition_id))
+
+    def __contains__(self, competition_id):
+        return os.path.exists(os.path.join(self.path(competition_id), _META))
+
+    def save(self, competition_id, df):
+        """Store `df` as the answer for `competition_id`, first writer wins"""
+        if competition_id in self:
+            return
+
+        # write to a scratch directory and rename, so readers never see partial answers
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp")
+        try:
+            columns = []
+            for i, column in enumerate(df.columns):
+                np.save(os.path.join(tmp, "%d.npy" % i), _array(df.iloc[:, i]))
+                columns.append(column)
+            np.save(
+                os.path.join(tmp, _INDEX + ".npy"),
+                _array(df.index.to_series()),
+            )
+            with open(os.path.join(tmp, _META), "w") as fp:
+                fp.write(
+                    ujson.dumps(
+                        {
+                            "columns": [str(c) for c in columns],
+                            "index_name": df.index.name,
+                            "rows": len(df.index),
+                        }
+                    )
+                )
+            os.rename(tmp, self.path(competition_id))
+        except OSError:
+            # someone else stored it first
+            pass
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def load(self, competition_id):
+        """Memory-mapped DataFrame of the stored answer, None if not stored"""
+        if competition_id not in self:
+            return None
+        path = self.path(competition_id)
+        with open(os.path.join(path, _META), "r") as fp:
+            meta = ujson.loads(fp.read())
+
+        index = np.load(os.path.join(path, _INDEX + ".npy"), mmap_mode="r")
+        data = {
+            column: np.load(os.path.join(path, "%d.npy" % i), mmap_mode="r")
+            for i, column in enumerate(meta["columns"])
+        }
+        return pd.DataFrame(
+            data,
+            index=pd.Index(index, name=meta["index_name"]),
+            columns=meta["columns"],
+            copy=False,
+        )
+
+    def remove(self, competition_id):
+        shutil.rmtree(self.path(competition_id), ignore_errors=True)
@@ -0,0 +1,212 @@
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import ujson
+from six import string_types
+
+from ..enums import CompetitionMetric, CompetitionType, DatasetFormat
+from ..exceptions import MalformedDataType, MalformedSubmission
+from .fetch import checkLocal, isSource, localPath
+from .snapshot import datasetSnapshots
+from .utils import (
+    _absdiff,
+    _answers,
+    _criteria,
+    _decompress,
+    _fetchDataset,
+    _open,
+)
+
+
+def _chunks(
+    data,
+    data_type,
+    chunksize,
+    cookies=None,
+    proxies=None,
+    max_size=None,
+    compression="infer",
+    **kwargs
+):
+    """Yield `data` as DataFrames of at most `chunksize` rows"""
+    if isinstance(data, string_types) and data and not isSource(data):
+        data = ujson.loads(data)
+    if isinstance(data, list) or isinstance(data, dict):
+        data = pd.DataFrame(data)
+    if isinstance(data, pd.DataFrame):
+        for i in range(0, len(data.index), chunksize):
+            yield data.iloc[i : i + chunksize]
+        return
+
+    if isinstance(data_type, string_types):
+        data_type = DatasetFormat(data_type)
+
+    if data_type == DatasetFormat.CSV:
+        with _open(data, cookies=cookies, proxies=proxies, max_size=max_size) as fp:
+            fp = _decompress(fp, compression, data)
+            for chunk in pd.read_csv(fp, chunksize=chunksize):
+                yield chunk
+
+    elif data_type == DatasetFormat.PARQUET and localPath(data):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(checkLocal(localPath(data)), memory_map=True)
+        for batch in parquet.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+    elif data_type == DatasetFormat.PARQUET:
+        import pyarrow.parquet as pq
+
+        # parquet needs to seek to its footer, so spool to disk not memory
+        with tempfile.TemporaryFile() as tmp:
+            with _open(data, cookies=cookies, proxies=proxies, max_size=max_size) as fp:
+                shutil.copyfileobj(fp, tmp, 1 << 20)
+            tmp.seek(0)
+            for batch in pq.ParquetFile(tmp).iter_batches(batch_size=chunksize):
+                yield batch.to_pandas()
+
+    elif data_type in (DatasetFormat.JSON, DatasetFormat.ARROW, DatasetFormat.NUMPY):
+        # load and slice, json can't be parsed incrementally and the rest are mapped
+        df = _fetchDataset(
+            data,
+            data_type,
+            cookies=cookies,
+            proxies=proxies,
+            max_size=max_size,
+            compression=compression,
+            **kwargs
+        )
+        for chunk in _chunks(df, data_type, chunksize):
+            yield chunk
+
+    else:
+        raise MalformedDataType(data_type)
+
+
+def _aligned(left, right):
+    """Re-chunk two iterators of frames into pairs of equal length"""
+    left, right = iter(left), iter(right)
+    lbuf = rbuf = None
+    while True:
+        if lbuf is None or lbuf.empty:
+            lbuf = next(left, None)
+        if rbuf is None or rbuf.empty:
+            rbuf = next(right, None)
+        if lbuf is None or rbuf is None:
+            if any(b is not None and not b.empty for b in (lbuf, rbuf)):
+                raise MalformedSubmission("answer has the wrong number of rows")
+            return
+        n = min(len(lbuf.index), len(rbuf.index))
+        yield lbuf.iloc[:n], rbuf.iloc[:n]
+        lbuf, rbuf = lbuf.iloc[n:], rbuf.iloc[n:]
+
+
+class RunningLogLoss(object):
+    """Log loss accumulated over chunks, matches sklearn.metrics.log_loss"""
+
+    def __init__(self, eps=1e-15):
+        self.eps = eps
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, x, y):
+        truth = np.asarray(x, dtype=float)
+        pred = np.clip(np.asarray(y, dtype=float), self.eps, 1 - self.eps)
+        if pred.ndim == 1 or pred.shape[1] == 1:
+            # probability of the positive class
+            t, p = truth.reshape(-1), pred.reshape(-1)
+            losses = -(t * np.log(p) + (1 - t) * np.log(1 - p))
+        else:
+            # one probability column per class, truth holds class indices
+            pred = pred / pred.sum(axis=1, keepdims=True)
+            idx = truth.reshape(-1).astype(int)
+            losses = -np.log(pred[np.arange(len(idx)), idx])
+        self.total += losses.sum()
+        self.count += len(losses)
+
+    def value(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class RunningAbsDiff(object):
+    """ABSDIFF over chunks, decided by the first row as in utils._metric"""
+
+    def __init__(self):
+        self.total = None
+
+    def update(self, x, y):
+        if self.total is None and len(x):
+            self.total = _absdiff(
+                np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+            )
+
+    def value(self):
+        return 0.0 if self.total is None else self.total
+
+
+def _runningMetric(metric):
+    if metric == CompetitionMetric.LOGLOSS:
+        return RunningLogLoss()
+    return RunningAbsDiff()
+
+
+def streamingCheckAnswer(submission, chunksize=100000, max_size=None, store=None):
+    """Score `submission` reading both answers in aligned chunks of `chunksize` rows.
+
+    Both sides must list their rows in the same order. Memory use is bounded
+    by the chunk size rather than by the size of the answers. If `store` has
+    the competition's answer, it is read memory-mapped from there.
+    """
+    competition = submission.competition
+    dataset_kwargs = competition.dataset_kwargs or {}
+    answer, answer_type, user_answer, user_answer_type = _answers(submission)
+    snapshots = datasetSnapshots()
+    if competition.competition_id is None:
+        # an answer given by withAnswer, nothing to look up
+        pass
+    elif store is not None and competition.competition_id in store:
+        answer = store.load(competition.competition_id)
+    elif snapshots is not None and competition.competition_id in snapshots:
+        answer = snapshots.load(competition.competition_id, **dataset_kwargs)
+
+    type, metric, targets = _criteria(competition)
+    key = competition.dataset_key
+
+    metric = _runningMetric(metric)
+
+    pairs = _aligned(
+        _chunks(answer, answer_type, chunksize, max_size=max_size, **dataset_kwargs),
+        _chunks(
+            user_answer,
+            user_answer_type,
+            chunksize,
+            max_size=max_size,
+            **dataset_kwargs
+        ),
+    )
+
+    for real_answer, real_user_answer in pairs:
+        if type == CompetitionType.PREDICT:
+            if isinstance(targets, dict):
+                keys = list(set(targets.keys()))
+                columns = list(set([v for x in targets.values() for v in x]))
+                mask = real_answer[key].isin(keys).values
+                if (
+                    real_user_answer[key].values[mask] != real_answer[key].values[mask]
+                ).any():
+                    raise MalformedSubmission("answer rows not aligned on %s" % key)
+                real_answer = real_answer[mask][columns]
+                real_user_answer = real_user_answer[mask][columns]
+            else:
+                columns = [targets] if isinstance(targets, string_types) else targets
+                real_answer = real_answer[list(columns)]
+                real_user_answer = real_user_answer[list(columns)]
+
+        elif type == CompetitionType.CLUSTER:
+            raise NotImplementedError()
+
+        metric.update(real_answer.values, real_user_answer.values)
+
+    return metric.value()
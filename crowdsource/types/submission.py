@@ -1,9 +1,10 @@
 import six
 import pandas
 import ujson
-import validators
 from traitlets import HasTraits
 from ..enums import DatasetFormat
+from ..exceptions import MalformedSubmission
+from .fetch import isSource, localPath
 
 
 class SubmissionSpec(HasTraits):
@@ -35,8 +36,11 @@ class SubmissionSpec(HasTraits):
             if k == "answer_type":
                 d[k] = DatasetFormat(v)
             elif k == "answer":
+                if localPath(v) is not None:
+                    # local paths are for admin registered datasets only
+                    raise MalformedSubmission("local path answers are not accepted")
                 if isinstance(v, six.string_types):
-                    if v in ("", "hidden") or validators.url(v):
+                    if v in ("", "hidden") or isSource(v):
                         d[k] = v
                     else:
                         v = ujson.loads(v)
@@ -1,21 +1,87 @@
+import bz2
+import contextvars
+import gzip
+import lzma
+import shutil
+import tempfile
+from datetime import datetime
+
 import numpy as np
 import pandas as pd
-import requests
 import ujson
-import validators
-from sklearn.metrics import log_loss
-from six import StringIO, string_types
+from six import string_types
 from pandas import json_normalize
+from .. import metrics
 from ..enums import CompetitionMetric, CompetitionType, DatasetFormat
-from ..exceptions import MalformedDataType, MalformedDataset
+from ..exceptions import (
+    MalformedDataType,
+    MalformedDataset,
+    MalformedSubmission,
+)
+from .cache import datasetCache
+from .snapshot import datasetSnapshots
+from . import fetch
+from .fetch import checkLocal, isSource, localPath, openStream
+
+
+def _open(url, cookies=None, proxies=None, max_size=None):
+    """Open `url` or local path as a buffered binary stream without reading it up front"""
+    path = localPath(url)
+    if path is not None:
+        return open(checkLocal(path), "rb")
+
+    cache = datasetCache()
+    if cache is not None:
+        return cache.open(url, cookies=cookies, proxies=proxies, max_size=max_size)
+    return openStream(url, cookies=cookies, proxies=proxies, max_size=max_size)
+
+
+_FORMATS = (
+    DatasetFormat.CSV,
+    DatasetFormat.JSON,
+    DatasetFormat.PARQUET,
+    DatasetFormat.ARROW,
+    DatasetFormat.NUMPY,
+)
+
+_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz"}
+
+
+def _decompress(fp, compression, url=""):
+    """Wrap `fp` to decompress on the fly, `compression` may be "infer" from the url"""
+    if compression == "infer":
+        path = url.split("?", 1)[0]
+        compression = next(
+            (c for ext, c in _COMPRESSION.items() if path.endswith(ext)), None
+        )
+    if not compression:
+        return fp
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fp)
+    if compression == "bz2":
+        return bz2.BZ2File(fp)
+    if compression == "xz":
+        return lzma.LZMAFile(fp)
+    raise MalformedDataset()
 
 
 def _fetchDataset(
-    data, data_type, record_column="", cookies=None, proxies=None, **kwargs
+    data,
+    data_type,
+    record_column="",
+    cookies=None,
+    proxies=None,
+    max_size=None,
+    compression="infer",
+    **kwargs
 ):
-    """Must be pandas readable"""
+    """Must be pandas readable
+
+    Remote data is streamed straight from the socket into the parser, so the
+    payload is never held as an intermediate string.
+    """
     if isinstance(data, string_types):
-        if data in ("", "hidden") or validators.url(data):
+        if data in ("", "hidden") or isSource(data):
             pass
         else:
             data = ujson.loads(data)
@@ -25,22 +91,67 @@ def _fetchDataset(
         return data
     if isinstance(data_type, string_types):
         data_type = DatasetFormat(data_type)
+    if data_type not in _FORMATS:
+        raise MalformedDataType(data_type)
+
+    path = localPath(data)
+    if path is not None:
+        with metrics.scoring("parse"):
+            return _readLocal(checkLocal(path), data_type, record_column, compression)
+
+    # the body is read as it is parsed, so parse includes most of the transfer
+    with metrics.scoring("fetch"):
+        raw = _open(data, cookies=cookies, proxies=proxies, max_size=max_size)
+    with raw, metrics.scoring("parse"):
+        return _parse(_decompress(raw, compression, data), data_type, record_column)
+
+
+def _parse(fp, data_type, record_column=""):
+    """Parse the binary file `fp` holding a dataset of `data_type`"""
     if data_type == DatasetFormat.CSV:
-        resp = requests.get(data, cookies=cookies, proxies=proxies)
-        if resp.status_code != 200:
-            raise MalformedDataset()
-        return pd.read_csv(StringIO(resp.text))
+        return pd.read_csv(fp)
+
     elif data_type == DatasetFormat.JSON:
-        resp = requests.get(data, cookies=cookies, proxies=proxies)
-        if resp.status_code != 200:
-            raise MalformedDataset()
         if record_column:
-            df1 = pd.DataFrame(resp.json())
-            df2 = json_normalize(resp.json(), record_column)
+            # parse once, build both frames from the same object
+            parsed = ujson.load(fp)
+            df1 = pd.DataFrame(parsed)
+            df2 = json_normalize(parsed, record_column)
             return pd.concat([df1, df2], axis=1, join="inner")
-        return pd.read_json(StringIO(resp.text))
-    else:
-        raise MalformedDataType(data_type)
+        return pd.read_json(fp)
+
+    # binary formats need to seek, so spool to disk not memory
+    with tempfile.TemporaryFile() as tmp:
+        shutil.copyfileobj(fp, tmp, 1 << 20)
+        tmp.seek(0)
+        return _readBinary(tmp, data_type)
+
+
+def _readLocal(path, data_type, record_column="", compression="infer"):
+    """Read a dataset straight from disk, memory-mapping the formats that allow it"""
+    if data_type == DatasetFormat.CSV:
+        return pd.read_csv(path, compression=compression)
+    if data_type == DatasetFormat.JSON:
+        with open(path, "rb") as fp:
+            return _parse(_decompress(fp, compression, path), data_type, record_column)
+    return _readBinary(path, data_type, memory_map=True)
+
+
+def _readBinary(source, data_type, memory_map=False):
+    """Read a parquet, arrow or numpy dataset from a seekable file or a path"""
+    if data_type == DatasetFormat.PARQUET:
+        return pd.read_parquet(source, memory_map=memory_map)
+
+    if data_type == DatasetFormat.ARROW:
+        import pyarrow.feather as feather
+
+        return feather.read_table(source, memory_map=memory_map).to_pandas()
+
+    values = np.load(source, mmap_mode="r" if memory_map else None)
+    if values.dtype.names:
+        # structured arrays keep their field names as columns
+        return pd.DataFrame({n: values[n] for n in values.dtype.names}, copy=False)
+    return pd.DataFrame(values, copy=False)
 
 
 def fetchDataset(spec):
@@ -225,74 +336,272 @@ def answerPrototype(spec, dataset=None):
     return df
 
 
-def checkAnswer(submission):
+def liveAnswer(spec, dataset=None):
+    """Answer to a live competition as of the latest row of its dataset, None if empty"""
+    if dataset is None or isinstance(dataset, string_types):
+        dataset = fetchDataset(spec)
+
+    targets = spec.targets
+    if targets and isinstance(targets, string_types):
+        try:
+            targets = ujson.loads(targets)
+        except ValueError:
+            pass
+    key = spec.dataset_key
+
+    if isinstance(targets, dict):
+        keys = list(targets.keys())
+        columns = list(set([v for x in targets.values() for v in x]))
+        if key:
+            dataset = dataset[dataset[key].isin(keys)][[key] + columns]
+        else:
+            dataset = dataset[dataset.index.isin(keys)][columns]
+    elif isinstance(targets, string_types):
+        dataset = dataset[[targets]]
+    elif isinstance(targets, list):
+        dataset = dataset[targets]
+
+    if dataset.empty:
+        return None
+    return dataset[dataset.index == dataset.index[-1]]
+
+
+def validateAnswer(spec, answer, prototype=None):
+    """Cheap structural checks of a user answer before it is persisted or scored.
+
+    Raises MalformedSubmission if the answer cannot be scored. Remote answers
+    are not fetched here, they are checked when scoring.
+    """
+    if localPath(answer) is not None:
+        # users could otherwise point at the ground truth or others' answers
+        raise MalformedSubmission("local path answers are not accepted")
+    if not isinstance(answer, pd.DataFrame):
+        return
+    if answer.empty or len(answer.columns) == 0:
+        raise MalformedSubmission("empty answer")
+
+    targets = spec.targets
+    if targets and isinstance(targets, string_types):
+        try:
+            targets = ujson.loads(targets)
+        except ValueError:
+            pass
+    key = spec.dataset_key
+    check_rows = True
+
+    if spec.type == CompetitionType.CLASSIFY:
+        columns = list(answer.columns)
+        required = columns
+
+    elif spec.type == CompetitionType.PREDICT:
+        if isinstance(targets, dict):
+            columns = list(set([v for x in targets.values() for v in x]))
+            required = columns + [key] if key else columns
+        elif isinstance(targets, string_types):
+            columns = required = [targets]
+        else:
+            columns = required = list(targets)
+
+        missing = pd.Index(required).difference(answer.columns)
+        if len(missing):
+            raise MalformedSubmission("missing columns %s" % list(missing))
+
+        if isinstance(targets, dict) and key:
+            # keyed answers are filtered down when scoring, just need coverage
+            check_rows = False
+            covered = pd.Index(list(targets.keys())).isin(answer[key])
+            if not covered.all():
+                raise MalformedSubmission("missing keys for %s" % key)
+
+    else:
+        return
+
+    bad = [c for c in columns if not pd.api.types.is_numeric_dtype(answer[c])]
+    if bad:
+        raise MalformedSubmission("non-numeric columns %s" % bad)
+
+    if answer[columns].isnull().values.any():
+        raise MalformedSubmission("missing values")
+
+    if check_rows and prototype is not None:
+        if len(answer.index) != len(prototype.index):
+            raise MalformedSubmission(
+                "expected %d rows, got %d" % (len(prototype.index), len(answer.index))
+            )
+
+
+def _groundTruth(submission, max_size=None, store=None):
+    """Resolve the competition's answer, via `store` or its snapshot if available"""
     competition = submission.competition
+    if competition.competition_id is None:
+        # an answer given by withAnswer, nothing to look up or keep
+        store = snapshots = None
+    else:
+        snapshots = datasetSnapshots()
 
-    # Competition answer #
-    answer = competition.answer
-    answer_type = competition.answer_type
-    dataset_kwargs = competition.dataset_kwargs
+    if store is not None:
+        real_answer = store.load(competition.competition_id)
+        if real_answer is not None:
+            return real_answer
 
-    # grab answer if possible
-    if isinstance(answer, string_types) and not answer:
-        # look at dataset for answer
-        answer = competition.dataset
-        answer_type = competition.dataset_type
+    answer, answer_type, _, _ = _answers(submission)
+    dataset_kwargs = competition.dataset_kwargs
 
-    if isinstance(answer, string_types) and validators.url(answer):
-        real_answer = _fetchDataset(answer, answer_type, **dataset_kwargs)
+    if snapshots is not None and competition.competition_id in snapshots:
+        # frozen at when/expiration, no network and the same data every time
+        real_answer = snapshots.load(competition.competition_id, **dataset_kwargs)
+        final = store is not None
+    elif isSource(answer):
+        real_answer = _fetchDataset(
+            answer, answer_type, max_size=max_size, **dataset_kwargs
+        )
+        # sourced answers may still change until the competition is over
+        final = store is not None and datetime.now() > competition.expiration
     else:
-        if isinstance(answer, string_types):
-            answer = ujson.loads(answer)
-        real_answer = pd.DataFrame(answer)
-    ####
+        with metrics.scoring("parse"):
+            if isinstance(answer, string_types):
+                answer = ujson.loads(answer)
+            real_answer = pd.DataFrame(answer)
+        final = store is not None
+
+    if final:
+        store.save(competition.competition_id, real_answer)
+    return real_answer
+
 
-    # user answer #
+def _userAnswer(submission, max_size=None):
+    """Resolve the submitted answer, fetching it if it is a url"""
     user_answer = submission.answer
     user_answer_type = submission.answer_type
 
-    # grab user answer if possible
-    if isinstance(user_answer, string_types) and validators.url(user_answer):
-        real_user_answer = _fetchDataset(
-            user_answer, user_answer_type, **dataset_kwargs
+    if isSource(user_answer):
+        return _fetchDataset(
+            user_answer,
+            user_answer_type,
+            max_size=max_size,
+            **submission.competition.dataset_kwargs
         )
-    else:
+    with metrics.scoring("parse"):
         if isinstance(user_answer, string_types):
             user_answer = ujson.loads(user_answer)
-        real_user_answer = pd.DataFrame(user_answer)
-    ####
-
-    if competition.type == CompetitionType.CLASSIFY:
-        return _metric(competition.metric, real_answer, real_user_answer, eps=1e-15)
-
-    elif competition.type == CompetitionType.PREDICT:
-        if isinstance(competition.targets, list):
-            real_answer = real_answer[competition.targets]
-            real_user_answer = real_user_answer[competition.targets]
-        elif isinstance(competition.targets, dict):
-            keyfield = competition.dataset_key
-            keys = list(set(competition.targets.keys()))  # TODO more than 1 key?
-            columns = list(set([v for x in competition.targets.values() for v in x]))
-            real_answer = real_answer[real_answer[keyfield].isin(keys)][columns]
-            real_user_answer = real_user_answer[real_user_answer[keyfield].isin(keys)][
-                columns
-            ]
-        elif isinstance(competition.targets, list):
-            real_answer = real_answer[competition.targets]
-            real_user_answer = real_user_answer[competition.targets]
-        else:
-            real_answer = real_answer[[competition.targets]]
-            real_user_answer = real_user_answer[[competition.targets]]
-        return _metric(competition.metric, real_answer, real_user_answer, eps=1e-15)
+        return pd.DataFrame(user_answer)
+
+
+def checkAnswer(submission, max_size=None, chunksize=None, store=None):
+    answer, _, user_answer, _ = _answers(submission)
+    # one slot per host for the whole job, so its two fetches can't wait on each other
+    with fetch.slots(fetch.hosts(answer, user_answer)):
+        return _checkAnswer(submission, max_size, chunksize, store)
+
+
+def _checkAnswer(submission, max_size=None, chunksize=None, store=None):
+    competition = submission.competition
+
+    if chunksize and _isRemote(submission):
+        # large remote answers are scored without holding them in memory
+        from .streaming import streamingCheckAnswer
+
+        return streamingCheckAnswer(
+            submission, chunksize=chunksize, max_size=max_size, store=store
+        )
+
+    if _isRemote(submission):
+        # fetch and parse both sides at once rather than back to back, the
+        # copied context carries the job's slots over to the pool thread
+        truth = fetch.executor().submit(
+            contextvars.copy_context().run,
+            _groundTruth,
+            submission,
+            max_size=max_size,
+            store=store,
+        )
+        real_user_answer = _userAnswer(submission, max_size=max_size)
+        real_answer = truth.result()
+    else:
+        real_answer = _groundTruth(submission, max_size=max_size, store=store)
+        real_user_answer = _userAnswer(submission, max_size=max_size)
 
-    elif competition.type == CompetitionType.CLUSTER:
-        return _metric(competition.metric, real_answer, real_user_answer, eps=1e-15)
+    type, metric, targets = _criteria(competition)
+    if type == CompetitionType.PREDICT:
+        with metrics.scoring("align"):
+            real_answer, real_user_answer = _align(
+                targets, competition.dataset_key, real_answer, real_user_answer
+            )
 
-    return 0.0
+    elif type not in (CompetitionType.CLASSIFY, CompetitionType.CLUSTER):
+        return 0.0
+
+    with metrics.scoring("metric"):
+        return _metric(metric, real_answer, real_user_answer, eps=1e-15)
+
+
+def _criteria(competition):
+    """(type, metric, targets) to score `competition` by, as enums and decoded targets
+
+    Competition models hold type and metric as strings and targets as json,
+    specs hold them decoded. The in memory and streamed scorers both go
+    through here, so they score either one the same way.
+    """
+    targets = competition.targets
+    if targets and isinstance(targets, string_types):
+        try:
+            targets = ujson.loads(targets)
+        except ValueError:
+            pass
+    return (
+        CompetitionType(competition.type),
+        CompetitionMetric(competition.metric),
+        targets,
+    )
+
+
+def _align(targets, key, real_answer, real_user_answer):
+    """Select the target columns, and for dict targets the `key`ed rows, of both answers"""
+    if isinstance(targets, list):
+        real_answer = real_answer[targets]
+        real_user_answer = real_user_answer[targets]
+    elif isinstance(targets, dict):
+        keys = list(set(targets.keys()))  # TODO more than 1 key?
+        columns = list(set([v for x in targets.values() for v in x]))
+        real_answer = real_answer[real_answer[key].isin(keys)][columns]
+        real_user_answer = real_user_answer[real_user_answer[key].isin(keys)][columns]
+    else:
+        real_answer = real_answer[[targets]]
+        real_user_answer = real_user_answer[[targets]]
+    return real_answer, real_user_answer
+
+
+def _answers(submission):
+    """Resolve the (answer, answer_type, user answer, user answer_type) to compare"""
+    competition = submission.competition
+    answer = competition.answer
+    answer_type = competition.answer_type
+
+    if isinstance(answer, string_types) and not answer:
+        # look at dataset for answer
+        answer = competition.dataset
+        answer_type = competition.dataset_type
+
+    return answer, answer_type, submission.answer, submission.answer_type
+
+
+def _isRemote(submission):
+    answer, _, user_answer, _ = _answers(submission)
+    return any(isSource(x) for x in (answer, user_answer))
 
 
 def _metric(metric, x, y, **kwargs):
     if metric == CompetitionMetric.LOGLOSS:
-        return log_loss(x.values, y.values, **kwargs)
+        # sklearn is heavy to import, only pay for it when scoring
+        from sklearn.metrics import log_loss
+
+        # newer sklearn dropped eps, clip the way older versions did
+        eps = kwargs.pop("eps", 1e-15)
+        return log_loss(x.values, np.clip(y.values, eps, 1 - eps), **kwargs)
     else:
-        return (x.values - y.values).sum(1)[0]
+        return _absdiff(x.values, y.values)
+
+
+def _absdiff(x, y):
+    """ABSDIFF of two arrays, the difference summed over the first row"""
+    return (x - y).sum(1)[0]
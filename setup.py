@@ -39,12 +39,24 @@ requires = [
     "validators>=0.12.4",
 ]
 
+requires_async = [
+    "aiosqlite>=0.17.0",
+    "asyncpg>=0.25.0",
+]
+
+# Parquet and Arrow datasets, and the submission archive
+requires_parquet = [
+    "pyarrow>=5.0.0",
+]
+
 requires_dev = [
+    "aiosqlite>=0.17.0",
     "black>=23",
     "bump2version>=1.0.0",
     "flake8>=3.7.8",
     "flake8-black>=0.2.1",
     "mock",
+    "pyarrow>=5.0.0",
     "pytest",
     "pytest-cov>=2.6.1",
     "Sphinx>=1.8.4",
@@ -74,7 +86,9 @@ setup(
     include_package_data=True,
     install_requires=requires,
     extras_require={
+        "async": requires_async,
         "dev": requires_dev,
+        "parquet": requires_parquet,
     },
     entry_points={
         "console_scripts": [